@@ -0,0 +1,473 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import logging
+from collections.abc import MutableMapping
+
+from partida import Partida
+
+
+class AlmacenMemoria(dict):
+    """Backend en memoria: las partidas viven solo en este proceso.
+
+    Las partidas sin uso durante un tiempo se compactan (`desalojar`): se
+    libera su tablero y se reconstruye desde las jugadas al volver a usarse.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._uso = {}  # partida_id -> último acceso (monotonic)
+        self.compactadas = 0
+
+    def __getitem__(self, partida_id):
+        partida = super().__getitem__(partida_id)
+        self._uso[partida_id] = time.monotonic()
+        return partida
+
+    def get(self, partida_id, defecto=None):
+        try:
+            return self[partida_id]
+        except KeyError:
+            return defecto
+
+    def __setitem__(self, partida_id, partida):
+        super().__setitem__(partida_id, partida)
+        self._uso[partida_id] = time.monotonic()
+
+    def __delitem__(self, partida_id):
+        super().__delitem__(partida_id)
+        self._uso.pop(partida_id, None)
+
+    def registrar_entrada(self, partida_id, n, entrada):
+        """El historial ya está en memoria; nada que persistir"""
+
+    def anular_entrada(self, partida_id, n):
+        """La jugada deshecha ya no está en memoria"""
+
+    def registrar_consumo(self, partida_id, partida, segundos):
+        """El consumo del motor ya está en la partida en memoria"""
+
+    def activas(self):
+        """(partida_id, partida) de las partidas en memoria, sin marcarlas como usadas"""
+        return list(dict.items(self))
+
+    def antiguas(self, limite):
+        """Ids de las partidas creadas antes de `limite` (timestamp)"""
+        return [partida_id for partida_id, partida in self.activas() if partida.creado < limite]
+
+    def desalojar(self, inactividad):
+        """Compacta las partidas sin uso desde hace `inactividad` segundos; devuelve sus ids"""
+        limite = time.monotonic() - inactividad
+        compactadas = []
+        for partida_id, usado in list(self._uso.items()):
+            partida = dict.get(self, partida_id)
+            if usado <= limite and partida is not None and partida.compactar():
+                compactadas.append(partida_id)
+        self.compactadas += len(compactadas)
+        return compactadas
+
+    def estadisticas(self):
+        return {'tipo': 'memoria', 'partidas': len(self), 'compactadas': self.compactadas}
+
+    def cerrar(self):
+        pass
+
+
+class AlmacenSQLite(MutableMapping):
+    """Backend SQLite (modo WAL) compartible entre varios procesos.
+
+    Las jugadas se guardan en una tabla de solo inserción y las escrituras se
+    agrupan en transacciones desde un hilo escritor. Las partidas se cargan
+    de forma perezosa por id y se mantienen en una caché local; en cada
+    acceso se traen las jugadas que otros procesos hayan añadido.
+    """
+
+    def __init__(self, ruta, intervalo_escritura=0.05, max_lote=500):
+        self.ruta = ruta
+        self.intervalo_escritura = intervalo_escritura
+        self.max_lote = max_lote
+
+        self._local = threading.local()
+        self._lock = threading.RLock()
+        self._cache = {}
+        self._uso = {}  # partida_id -> último acceso (monotonic)
+        self._escrituras = queue.Queue()
+        self._activo = True
+
+        conn = self._conexion()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS partidas (
+                id TEXT PRIMARY KEY,
+                creado REAL NOT NULL,
+                jugador_color TEXT NOT NULL,
+                dificultad TEXT NOT NULL DEFAULT 'normal',
+                cliente TEXT,
+                segundos_motor REAL NOT NULL DEFAULT 0,
+                busquedas_motor INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS historial (
+                partida_id TEXT NOT NULL,
+                n INTEGER NOT NULL,
+                entrada TEXT NOT NULL,
+                PRIMARY KEY (partida_id, n)
+            );
+        """)
+        columnas = {fila[1] for fila in conn.execute("PRAGMA table_info(partidas)")}
+        if 'dificultad' not in columnas:
+            # Bases de datos creadas antes de guardar la dificultad
+            conn.execute("ALTER TABLE partidas ADD COLUMN dificultad TEXT NOT NULL DEFAULT 'normal'")
+        if 'cliente' not in columnas:
+            # Ni el cliente ni el consumo del motor (cuentas_motor)
+            conn.execute("ALTER TABLE partidas ADD COLUMN cliente TEXT")
+            conn.execute("ALTER TABLE partidas ADD COLUMN segundos_motor REAL NOT NULL DEFAULT 0")
+            conn.execute("ALTER TABLE partidas ADD COLUMN busquedas_motor INTEGER NOT NULL DEFAULT 0")
+        conn.commit()
+
+        self._escritor = threading.Thread(target=self._escribir_lotes, name="almacen-escritor", daemon=True)
+        self._escritor.start()
+
+    def _conexion(self):
+        """Una conexión por hilo (WAL permite lectores concurrentes)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.ruta, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # --- Escrituras agrupadas ---
+
+    def _escribir_lotes(self):
+        conn = self._conexion()
+        while self._activo or not self._escrituras.empty():
+            try:
+                lote = [self._escrituras.get(timeout=self.intervalo_escritura)]
+            except queue.Empty:
+                continue
+            while len(lote) < self.max_lote:
+                try:
+                    lote.append(self._escrituras.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with conn:
+                    for sql, parametros in lote:
+                        conn.execute(sql, parametros)
+            except Exception as e:
+                logging.error(f"Error escribiendo lote en {self.ruta}: {e}")
+            finally:
+                for _ in lote:
+                    self._escrituras.task_done()
+
+    def _encolar(self, sql, parametros):
+        self._escrituras.put((sql, parametros))
+
+    def vaciar(self):
+        """Espera a que todas las escrituras pendientes lleguen a disco"""
+        self._escrituras.join()
+
+    # --- Carga perezosa ---
+
+    def _leer_cabecera(self, partida_id):
+        return self._conexion().execute(
+            "SELECT creado, jugador_color, dificultad, cliente, segundos_motor, busquedas_motor "
+            "FROM partidas WHERE id = ?", (partida_id,)
+        ).fetchone()
+
+    def _leer_historial(self, partida_id, desde=0):
+        filas = self._conexion().execute(
+            "SELECT entrada FROM historial WHERE partida_id = ? AND n >= ? ORDER BY n",
+            (partida_id, desde)
+        ).fetchall()
+        return [json.loads(fila[0]) for fila in filas]
+
+    @staticmethod
+    def _aplicar(partida, entradas):
+        """Añade entradas al historial (el tablero se reconstruye al usarse)"""
+        for entrada in entradas:
+            partida.aplicar_entrada(entrada)
+
+    def __getitem__(self, partida_id):
+        cabecera = self._leer_cabecera(partida_id)
+        with self._lock:
+            if cabecera is None:
+                # Eliminada (quizá por otro proceso)
+                self._cache.pop(partida_id, None)
+                self._uso.pop(partida_id, None)
+                raise KeyError(partida_id)
+
+            creado, jugador_color, dificultad, cliente, segundos_motor, busquedas_motor = cabecera
+            partida = self._cache.get(partida_id)
+            if partida is None or partida.creado != creado:
+                # No estaba cargada, o fue reiniciada por otro proceso
+                partida = Partida(creado, jugador_color, dificultad, cliente)
+                self._aplicar(partida, self._leer_historial(partida_id))
+                self._cache[partida_id] = partida
+            else:
+                self._aplicar(partida, self._leer_historial(partida_id, partida.num_entradas))
+            # Lo consumido desde otros procesos (lo de este puede estar aún en la cola de escritura)
+            partida.segundos_motor = max(partida.segundos_motor, segundos_motor)
+            partida.busquedas_motor = max(partida.busquedas_motor, busquedas_motor)
+            self._uso[partida_id] = time.monotonic()
+            return partida
+
+    def __contains__(self, partida_id):
+        return self._leer_cabecera(partida_id) is not None
+
+    def __setitem__(self, partida_id, partida):
+        """Crea o reinicia una partida (el historial anterior se descarta).
+
+        Se escribe en el momento, tras vaciar la cola, para que ninguna jugada
+        pendiente de la partida anterior llegue después del reinicio.
+        """
+        self.vaciar()
+        conn = self._conexion()
+        with self._lock, conn:
+            conn.execute("DELETE FROM historial WHERE partida_id = ?", (partida_id,))
+            conn.execute(
+                "INSERT OR REPLACE INTO partidas (id, creado, jugador_color, dificultad, cliente, "
+                "segundos_motor, busquedas_motor) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (partida_id, partida.creado, partida.jugador_color, partida.dificultad, partida.cliente,
+                 partida.segundos_motor, partida.busquedas_motor)
+            )
+            conn.executemany(
+                "INSERT INTO historial (partida_id, n, entrada) VALUES (?, ?, ?)",
+                [(partida_id, n, json.dumps(entrada)) for n, entrada in enumerate(partida.historial())]
+            )
+            self._cache[partida_id] = partida
+            self._uso[partida_id] = time.monotonic()
+
+    def __delitem__(self, partida_id):
+        self.vaciar()
+        conn = self._conexion()
+        with self._lock, conn:
+            conn.execute("DELETE FROM historial WHERE partida_id = ?", (partida_id,))
+            conn.execute("DELETE FROM partidas WHERE id = ?", (partida_id,))
+            self._cache.pop(partida_id, None)
+            self._uso.pop(partida_id, None)
+
+    def __iter__(self):
+        self.vaciar()
+        filas = self._conexion().execute("SELECT id FROM partidas").fetchall()
+        return iter([fila[0] for fila in filas])
+
+    def __len__(self):
+        self.vaciar()
+        return self._conexion().execute("SELECT COUNT(*) FROM partidas").fetchone()[0]
+
+    def activas(self):
+        """(partida_id, partida) de las partidas cargadas en este proceso"""
+        with self._lock:
+            return list(self._cache.items())
+
+    def antiguas(self, limite):
+        """Ids de las partidas creadas antes de `limite` (timestamp)"""
+        self.vaciar()
+        filas = self._conexion().execute("SELECT id FROM partidas WHERE creado < ?", (limite,)).fetchall()
+        return [fila[0] for fila in filas]
+
+    def desalojar(self, inactividad):
+        """Saca de la caché local las partidas sin uso (ya están en la base de datos); devuelve sus ids"""
+        limite = time.monotonic() - inactividad
+        with self._lock:
+            inactivas = [partida_id for partida_id, usado in self._uso.items() if usado <= limite]
+            for partida_id in inactivas:
+                self._cache.pop(partida_id, None)
+                del self._uso[partida_id]
+        return inactivas
+
+    def estadisticas(self):
+        with self._lock:
+            cargadas = len(self._cache)
+        return {'tipo': 'sqlite', 'partidas': len(self), 'cargadas': cargadas}
+
+    def registrar_entrada(self, partida_id, n, entrada):
+        """Persiste (solo inserción) la entrada `n` del historial.
+
+        El índice y la entrada se toman al hacer la jugada
+        (`Partida.ultima_entrada_numerada`): leerlos al escribir podría
+        asignar a la jugada humana el índice de la respuesta del motor.
+        """
+        self._encolar(
+            "INSERT OR IGNORE INTO historial (partida_id, n, entrada) VALUES (?, ?, ?)",
+            (partida_id, n, json.dumps(entrada))
+        )
+
+    def anular_entrada(self, partida_id, n):
+        """Borra la entrada `n` de una jugada deshecha tras persistirla"""
+        self._encolar("DELETE FROM historial WHERE partida_id = ? AND n = ?", (partida_id, n))
+
+    def registrar_consumo(self, partida_id, partida, segundos):
+        """Suma una búsqueda del motor al consumo guardado (incremento: varios procesos pueden cargarla)"""
+        self._encolar(
+            "UPDATE partidas SET segundos_motor = segundos_motor + ?, busquedas_motor = busquedas_motor + 1 "
+            "WHERE id = ? AND creado = ?",
+            (segundos, partida_id, partida.creado)
+        )
+
+    def cerrar(self):
+        """Escribe lo pendiente y detiene el hilo escritor"""
+        self.vaciar()
+        self._activo = False
+        self._escritor.join(timeout=5)
+
+
+class AlmacenNiveles(MutableMapping):
+    """Partidas activas en memoria y las inactivas en disco.
+
+    `desalojar()` pasa a un fichero SQLite las partidas sin uso durante
+    `inactividad` segundos, en el formato compacto de `Partida.a_bytes()`
+    (unos 7 bytes por jugada), y el siguiente acceso las vuelve a cargar de
+    forma transparente. La RAM solo crece con las partidas en juego, no con
+    las abiertas. Al cerrar se guardan todas, así que sobreviven a reinicios.
+
+    Toda partida tiene su fila en disco, también mientras está en memoria
+    (la fila se escribe al crearla y se actualiza al desalojarla): cargarla
+    no la borra, así que otro worker con el mismo fichero la sigue
+    encontrando, y los recuentos y listados salen solo de la tabla.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._lock = threading.RLock()
+        self._activas = {}
+        self._uso = {}  # partida_id -> último acceso (monotonic)
+        self.desalojadas = 0
+        self.rehidratadas = 0
+
+        # Una sola conexión protegida por el lock: cada operación es una fila
+        self._conn = sqlite3.connect(ruta, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS inactivas (
+                id TEXT PRIMARY KEY,
+                creado REAL NOT NULL,
+                datos BLOB NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def __getitem__(self, partida_id):
+        with self._lock:
+            partida = self._activas.get(partida_id)
+            if partida is None:
+                fila = self._conn.execute("SELECT datos FROM inactivas WHERE id = ?", (partida_id,)).fetchone()
+                if fila is None:
+                    raise KeyError(partida_id)
+                partida = Partida.desde_bytes(fila[0])
+                self._activas[partida_id] = partida
+                self.rehidratadas += 1
+            self._uso[partida_id] = time.monotonic()
+            return partida
+
+    def __contains__(self, partida_id):
+        with self._lock:
+            if partida_id in self._activas:
+                return True
+            return self._conn.execute("SELECT 1 FROM inactivas WHERE id = ?", (partida_id,)).fetchone() is not None
+
+    def __setitem__(self, partida_id, partida):
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO inactivas (id, creado, datos) VALUES (?, ?, ?)",
+                    (partida_id, partida.creado, partida.a_bytes())
+                )
+            self._activas[partida_id] = partida
+            self._uso[partida_id] = time.monotonic()
+
+    def __delitem__(self, partida_id):
+        with self._lock:
+            with self._conn:
+                borradas = self._conn.execute("DELETE FROM inactivas WHERE id = ?", (partida_id,)).rowcount
+            self._uso.pop(partida_id, None)
+            if self._activas.pop(partida_id, None) is None and not borradas:
+                raise KeyError(partida_id)
+
+    def __iter__(self):
+        with self._lock:
+            ids = [fila[0] for fila in self._conn.execute("SELECT id FROM inactivas")]
+        return iter(ids)
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM inactivas").fetchone()[0]
+
+    def registrar_entrada(self, partida_id, n, entrada):
+        """Las partidas activas están en memoria; se escriben al desalojarlas"""
+
+    def anular_entrada(self, partida_id, n):
+        """Las partidas activas están en memoria; se escriben al desalojarlas"""
+
+    def registrar_consumo(self, partida_id, partida, segundos):
+        """Se guarda con la partida al desalojarla (`Partida.a_bytes()`)"""
+
+    def activas(self):
+        """(partida_id, partida) de las partidas en memoria, sin cargar las de disco"""
+        with self._lock:
+            return list(self._activas.items())
+
+    def antiguas(self, limite):
+        """Ids de las partidas creadas antes de `limite` (timestamp), en memoria o en disco"""
+        with self._lock:
+            return [fila[0] for fila in self._conn.execute(
+                "SELECT id FROM inactivas WHERE creado < ?", (limite,))]
+
+    def desalojar(self, inactividad):
+        """Pasa a disco las partidas sin uso desde hace `inactividad` segundos; devuelve sus ids"""
+        limite = time.monotonic() - inactividad
+        with self._lock:
+            inactivas = [partida_id for partida_id, usado in self._uso.items() if usado <= limite]
+            if not inactivas:
+                return inactivas
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO inactivas (id, creado, datos) VALUES (?, ?, ?)",
+                    [(partida_id, self._activas[partida_id].creado, self._activas[partida_id].a_bytes())
+                     for partida_id in inactivas]
+                )
+            for partida_id in inactivas:
+                del self._activas[partida_id]
+                del self._uso[partida_id]
+            self.desalojadas += len(inactivas)
+        return inactivas
+
+    def estadisticas(self):
+        with self._lock:
+            partidas = self._conn.execute("SELECT COUNT(*) FROM inactivas").fetchone()[0]
+            return {
+                'tipo': 'niveles',
+                'partidas': partidas,
+                'en_memoria': len(self._activas),
+                'en_disco': max(0, partidas - len(self._activas)),
+                'desalojadas': self.desalojadas,
+                'rehidratadas': self.rehidratadas,
+            }
+
+    def cerrar(self):
+        """Guarda en disco todas las partidas en memoria"""
+        self.desalojar(0)
+        with self._lock:
+            self._conn.close()
+
+
+def crear_almacen(url):
+    """Crea el backend según la URL: 'memoria', 'sqlite:///ruta/partidas.db' o
+    'niveles:///ruta/inactivas.db' (activas en memoria, inactivas en disco)"""
+    if not url or url == 'memoria':
+        return AlmacenMemoria()
+    if url.startswith('niveles:///'):
+        ruta = url[len('niveles:///'):]
+        os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+        return AlmacenNiveles(ruta)
+    if url.startswith('sqlite:///'):
+        ruta = url[len('sqlite:///'):]
+        directorio = os.path.dirname(os.path.abspath(ruta))
+        os.makedirs(directorio, exist_ok=True)
+        return AlmacenSQLite(ruta)
+    raise ValueError(f"Almacén de partidas no soportado: {url}")
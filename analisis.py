@@ -0,0 +1,154 @@
+import chess
+import chess.engine
+import chess.pgn
+import io
+import math
+import threading
+
+MAX_MULTIPV = 10
+TIEMPO_ANALISIS_DEFECTO = 0.1
+
+
+class ParametrosInvalidosError(ValueError):
+    """Parámetros de análisis (límites, MultiPV, posiciones) no válidos"""
+
+
+def limite_desde_parametros(data, tiempo_defecto=TIEMPO_ANALISIS_DEFECTO):
+    """Construye un `Limit` con los campos depth/nodes/time de una petición"""
+    try:
+        depth = int(data['depth']) if data.get('depth') is not None else None
+        nodes = int(data['nodes']) if data.get('nodes') is not None else None
+        tiempo = float(data['time']) if data.get('time') is not None else None
+    except (TypeError, ValueError, OverflowError):
+        raise ParametrosInvalidosError("depth, nodes y time deben ser numéricos")
+
+    if tiempo is not None and not math.isfinite(tiempo):
+        raise ParametrosInvalidosError("time debe ser finito")
+    if any(v is not None and v <= 0 for v in (depth, nodes, tiempo)):
+        raise ParametrosInvalidosError("depth, nodes y time deben ser positivos")
+    if depth is None and nodes is None and tiempo is None:
+        tiempo = tiempo_defecto
+    return chess.engine.Limit(time=tiempo, depth=depth, nodes=nodes)
+
+
+def multipv_desde_parametros(data):
+    """Número de líneas principales pedidas (1..MAX_MULTIPV)"""
+    try:
+        multipv = int(data.get('multipv', 1))
+    except (TypeError, ValueError):
+        raise ParametrosInvalidosError("multipv debe ser un entero")
+    if not 1 <= multipv <= MAX_MULTIPV:
+        raise ParametrosInvalidosError(f"multipv debe estar entre 1 y {MAX_MULTIPV}")
+    return multipv
+
+
+def info_a_dict(info):
+    """Serializa un `InfoDict` del motor (puntuación desde el punto de vista de las blancas)"""
+    linea = {}
+    if 'multipv' in info:
+        linea['multipv'] = info['multipv']
+    if 'score' in info:
+        score = info['score'].white()
+        linea['score_cp'] = score.score()
+        linea['mate'] = score.mate()
+    if 'pv' in info:
+        linea['pv'] = [move.uci() for move in info['pv']]
+    for campo in ('depth', 'seldepth', 'nodes', 'nps', 'time'):
+        if campo in info:
+            linea[campo] = info[campo]
+    return linea
+
+
+def limite_acotado(limite, tiempo_max):
+    """El mismo límite con un tiempo máximo (también si solo tenía depth o nodes)"""
+    tiempo = min(limite.time, tiempo_max) if limite.time is not None else tiempo_max
+    return chess.engine.Limit(time=tiempo, depth=limite.depth, nodes=limite.nodes)
+
+
+class LineasAnalisis:
+    """Agrupa los `info` de un análisis MultiPV en actualizaciones completas.
+
+    El motor envía una línea por `info`; se emite una actualización cada vez
+    que llega la última línea pedida (todas las de esa profundidad).
+    """
+
+    def __init__(self, board, multipv=1):
+        self.num_lineas = max(1, min(multipv, board.legal_moves.count()))
+        self.lineas = {}
+
+    def anadir(self, info):
+        """Añade un `info`; devuelve la actualización si completa las líneas, si no None"""
+        if 'pv' not in info or 'score' not in info:
+            return None
+        numero = info.get('multipv', 1)
+        self.lineas[numero] = info_a_dict(info)
+        if numero != self.num_lineas or len(self.lineas) < self.num_lineas:
+            return None
+        return self.actualizacion()
+
+    def actualizacion(self):
+        """Estado actual: datos de la línea principal y todas las líneas"""
+        lineas = [self.lineas[numero] for numero in sorted(self.lineas)]
+        principal = lineas[0] if lineas else {}
+        actualizacion = {campo: principal.get(campo)
+                         for campo in ('depth', 'seldepth', 'nodes', 'nps', 'time', 'score_cp', 'mate')}
+        actualizacion['lineas'] = lineas
+        return actualizacion
+
+
+class RegistroAnalisis:
+    """Análisis en curso por clave (una partida o un cliente).
+
+    Registrar uno nuevo con la misma clave detiene el anterior, y
+    `cancelar()` detiene el de una partida cuyo tablero ha cambiado: un
+    análisis obsoleto no sigue ocupando un motor.
+    """
+
+    def __init__(self):
+        self._activos = {}  # clave -> (token, función que lo detiene)
+        self._lock = threading.Lock()
+
+    def registrar(self, clave, parar):
+        """Registra un análisis y detiene el anterior con la misma clave; devuelve su token"""
+        token = object()
+        with self._lock:
+            anterior = self._activos.get(clave)
+            self._activos[clave] = (token, parar)
+        if anterior is not None:
+            anterior[1]()
+        return token
+
+    def quitar(self, clave, token):
+        """Da por terminado el análisis (si no lo ha sustituido otro)"""
+        with self._lock:
+            if self._activos.get(clave, (None,))[0] is token:
+                del self._activos[clave]
+
+    def cancelar(self, clave):
+        """Detiene el análisis en curso con esa clave, si lo hay"""
+        with self._lock:
+            activo = self._activos.pop(clave, None)
+        if activo is not None:
+            activo[1]()
+
+    def __len__(self):
+        return len(self._activos)
+
+
+def leer_partidas(fichero):
+    """Genera las partidas de un PGN de una en una, sin cargar el fichero entero"""
+    while True:
+        game = chess.pgn.read_game(fichero)
+        if game is None:
+            return
+        yield game
+
+
+def posiciones_desde_pgn(texto):
+    """Genera (partida, ply, tablero) para cada posición de la línea principal"""
+    for numero, game in enumerate(leer_partidas(io.StringIO(texto))):
+        board = game.board()
+        yield numero, 0, board.copy()
+        for ply, move in enumerate(game.mainline_moves(), start=1):
+            board.push(move)
+            yield numero, ply, board.copy()
@@ -0,0 +1,279 @@
+"""Análisis masivo de ficheros PGN con un pool de procesos de motor.
+
+Lee el PGN partida a partida (nunca el fichero entero), evalúa cada
+posición de la línea principal repartiéndolas entre N procesos con su propio
+motor UCI y escribe el PGN anotado (`[%eval ...]`, ?!, ?, ?? y la mejor
+jugada en los errores) según va terminando cada partida. Las posiciones
+repetidas, dentro de una partida o entre partidas, se evalúan una sola vez
+gracias a una caché común acotada, así que la memoria no crece con el
+tamaño del fichero:
+
+    python3 analisis_pgn.py partidas.pgn -o anotadas.pgn --motores 8 --depth 16
+    zcat base.pgn.gz | python3 analisis_pgn.py - --time 0.2 > anotadas.pgn
+"""
+import chess
+import chess.engine
+import chess.pgn
+import argparse
+import os
+import sys
+import time
+import logging
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import util
+
+from analisis import ParametrosInvalidosError, leer_partidas, limite_desde_parametros
+from cache_jugadas import CacheJugadas, clave_posicion
+from pool_motores import calcular_recursos
+
+STOCKFISH_PATH = os.environ.get("STOCKFISH_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "engines/Cfish_Linux", "Cfish 060821 x64 general"))
+
+# Pérdida de puntuación esperada (0..1, modelo WDL de Stockfish) del bando
+# que mueve a partir de la cual la jugada se marca
+UMBRALES = (
+    (0.15, chess.pgn.NAG_BLUNDER),
+    (0.10, chess.pgn.NAG_MISTAKE),
+    (0.05, chess.pgn.NAG_DUBIOUS_MOVE),
+)
+
+
+# --- Procesos del pool: un motor por proceso ---
+
+_motor = None
+_ruta_motor = None
+_opciones_motor = None
+
+
+def _lanzar_motor():
+    motor = chess.engine.SimpleEngine.popen_uci(
+        [os.path.abspath(_ruta_motor)], cwd=os.path.dirname(os.path.abspath(_ruta_motor))
+    )
+    motor.configure({k: v for k, v in _opciones_motor.items() if k in motor.options})
+    return motor
+
+
+def _cerrar_motor():
+    if _motor is not None:
+        try:
+            _motor.quit()
+        except Exception:
+            pass
+
+
+def _iniciar_proceso(ruta, opciones):
+    """Inicializador de cada proceso: arranca su motor y lo cierra al terminar el pool"""
+    global _motor, _ruta_motor, _opciones_motor
+    _ruta_motor, _opciones_motor = ruta, opciones
+    _motor = _lanzar_motor()
+    util.Finalize(None, _cerrar_motor, exitpriority=16)
+
+
+def _evaluar(fen, limite):
+    """Evalúa una posición: (puntuación desde las blancas, mejor jugada UCI)"""
+    global _motor
+    board = chess.Board(fen)
+    try:
+        info = _motor.analyse(board, limite)
+    except chess.engine.EngineTerminatedError:
+        logging.warning("Motor caído durante el análisis, se reinicia")
+        _motor = _lanzar_motor()
+        info = _motor.analyse(board, limite)
+    mejor = info['pv'][0].uci() if info.get('pv') else None
+    return info['score'].white(), mejor
+
+
+# --- Proceso principal ---
+
+def evaluacion_final(board):
+    """Evaluación sin motor de las posiciones terminales (mate o tablas); si no, None"""
+    if board.is_checkmate():
+        return chess.engine.PovScore(chess.engine.Mate(0), board.turn).white(), None
+    if board.is_game_over(claim_draw=False):
+        return chess.engine.Cp(0), None
+    return None
+
+
+def perdida_esperada(antes, despues, color):
+    """Puntuación esperada (0..1) que pierde `color` con su jugada"""
+    antes = chess.engine.PovScore(antes, chess.WHITE).pov(color)
+    despues = chess.engine.PovScore(despues, chess.WHITE).pov(color)
+    return antes.wdl().expectation() - despues.wdl().expectation()
+
+
+class AnalizadorPGN:
+    """Tubería de análisis: partidas → posiciones únicas → pool de motores → PGN anotado.
+
+    Como mucho `ventana` partidas están a la vez en vuelo; se escriben en el
+    orden de entrada en cuanto están evaluadas todas sus posiciones.
+    """
+
+    def __init__(self, ruta_motor, limite, num_motores=None, hash_total_mb=512,
+                 max_cache=200000, ventana=None):
+        self.ruta_motor = ruta_motor
+        self.limite = limite
+        self.num_motores = num_motores or os.cpu_count() or 1
+        self.opciones = calcular_recursos(self.num_motores, hash_total_mb)
+        self.ventana = ventana or 4 * self.num_motores
+        self.cache = CacheJugadas(max_entradas=max_cache)
+        self._en_vuelo = {}  # clave de la posición -> Future de su evaluación
+        self._tableros = {}  # Future -> posición, para guardarla en la caché al terminar
+        self._executor = None
+
+        # Métricas
+        self.partidas = 0
+        self.posiciones = 0
+        self.evaluadas = 0
+        self.repetidas = 0
+        self.errores = 0
+        self.inicio = None
+
+    def _evaluacion(self, board):
+        """Evaluación ya conocida, Future compartido o nueva tarea para el pool"""
+        final = evaluacion_final(board)
+        if final is not None:
+            return final
+        resultado = self.cache.obtener(board, self.limite)
+        if resultado is not None:
+            self.repetidas += 1
+            return resultado
+        clave = clave_posicion(board, self.limite)
+        futuro = self._en_vuelo.get(clave)
+        if futuro is not None:
+            self.repetidas += 1
+            return futuro
+        futuro = self._executor.submit(_evaluar, board.fen(), self.limite)
+        self._en_vuelo[clave] = futuro
+        self._tableros[futuro] = board
+        self.evaluadas += 1
+        return futuro
+
+    def _preparar(self, game):
+        """Lanza la evaluación de cada posición de la línea principal"""
+        nodos = []
+        board = game.board()
+        nodos.append((game, self._evaluacion(board.copy(stack=False))))
+        for nodo in game.mainline():
+            board.push(nodo.move)
+            nodos.append((nodo, self._evaluacion(board.copy(stack=False))))
+        self.posiciones += len(nodos)
+        return game, nodos
+
+    def _resolver(self, evaluacion):
+        if not isinstance(evaluacion, Future):
+            return evaluacion
+        try:
+            resultado = evaluacion.result()
+        except chess.engine.EngineError as e:
+            logging.warning(f"Posición sin evaluar: {e}")
+            self.errores += 1
+            resultado = None
+        board = self._tableros.pop(evaluacion, None)
+        if board is not None:
+            # Primera partida que la usa: pasa de "en vuelo" a la caché
+            self._en_vuelo.pop(clave_posicion(board, self.limite), None)
+            if resultado is not None:
+                self.cache.guardar(board, self.limite, resultado)
+        return resultado
+
+    def _anotar(self, game, nodos):
+        """Añade la evaluación y las marcas de error a cada jugada"""
+        anterior = None
+        for nodo, evaluacion in nodos:
+            actual = self._resolver(evaluacion)
+            if nodo.parent is not None and actual is not None:
+                nodo.set_eval(chess.engine.PovScore(actual[0], chess.WHITE))
+                if anterior is not None:
+                    color = not nodo.turn()
+                    perdida = perdida_esperada(anterior[0], actual[0], color)
+                    for umbral, nag in UMBRALES:
+                        if perdida >= umbral:
+                            nodo.nags.add(nag)
+                            if anterior[1] is not None and anterior[1] != nodo.move.uci():
+                                mejor = nodo.parent.board().san(chess.Move.from_uci(anterior[1]))
+                                nodo.comment = f"{nodo.comment} Mejor: {mejor}".strip()
+                            break
+            anterior = actual
+        game.headers["Annotator"] = os.path.basename(self.ruta_motor)
+
+    def _escribir(self, pendiente, salida):
+        game, nodos = pendiente
+        self._anotar(game, nodos)
+        print(game, file=salida, end="\n\n")
+        salida.flush()
+        self.partidas += 1
+
+    def analizar(self, entrada, salida, progreso=0):
+        """Analiza todas las partidas de `entrada` y escribe el PGN anotado en `salida`"""
+        self.inicio = time.monotonic()
+        pendientes = deque()
+        with ProcessPoolExecutor(self.num_motores, initializer=_iniciar_proceso,
+                                 initargs=(self.ruta_motor, self.opciones)) as self._executor:
+            for game in leer_partidas(entrada):
+                pendientes.append(self._preparar(game))
+                while len(pendientes) >= self.ventana:
+                    self._escribir(pendientes.popleft(), salida)
+                    if progreso and self.partidas % progreso == 0:
+                        self.mostrar_estadisticas()
+            while pendientes:
+                self._escribir(pendientes.popleft(), salida)
+        self._executor = None
+        return self.estadisticas()
+
+    def estadisticas(self):
+        duracion = time.monotonic() - self.inicio if self.inicio is not None else 0.0
+        return {
+            'partidas': self.partidas,
+            'posiciones': self.posiciones,
+            'evaluadas': self.evaluadas,
+            'repetidas': self.repetidas,
+            'errores': self.errores,
+            'segundos': round(duracion, 2),
+            'posiciones_s': round(self.posiciones / duracion, 1) if duracion else 0.0,
+        }
+
+    def mostrar_estadisticas(self):
+        e = self.estadisticas()
+        print(f"♟️  {e['partidas']} partidas, {e['posiciones']} posiciones "
+              f"({e['evaluadas']} con motor, {e['repetidas']} repetidas), "
+              f"{e['posiciones_s']} pos/s", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Anota con evaluaciones del motor todas las partidas de un PGN")
+    parser.add_argument("entrada", help="Fichero PGN de entrada ('-' para la entrada estándar)")
+    parser.add_argument("-o", "--salida", default="-", help="PGN anotado ('-' para la salida estándar)")
+    parser.add_argument("--motor", default=STOCKFISH_PATH, help="Ejecutable UCI")
+    parser.add_argument("--motores", type=int, default=None, help="Procesos de motor (por defecto, uno por núcleo)")
+    parser.add_argument("--hash", type=int, default=512, help="MB de hash a repartir entre los motores")
+    parser.add_argument("--depth", type=int, default=None)
+    parser.add_argument("--nodes", type=int, default=None)
+    parser.add_argument("--time", type=float, default=None, help="Segundos por posición (0.1 si no se da ningún límite)")
+    parser.add_argument("--cache", type=int, default=200000, help="Posiciones evaluadas que se recuerdan")
+    parser.add_argument("--ventana", type=int, default=None, help="Partidas en vuelo a la vez (por defecto 4 por motor)")
+    parser.add_argument("--progreso", type=int, default=100, help="Mostrar estadísticas cada N partidas (0 = nunca)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    try:
+        limite = limite_desde_parametros({'depth': args.depth, 'nodes': args.nodes, 'time': args.time})
+    except ParametrosInvalidosError as e:
+        parser.error(str(e))
+    if not os.path.exists(args.motor):
+        parser.error(f"Archivo del motor no encontrado: {args.motor}")
+
+    analizador = AnalizadorPGN(args.motor, limite, args.motores, args.hash, args.cache, args.ventana)
+    entrada = sys.stdin if args.entrada == "-" else open(args.entrada, encoding="utf-8", errors="replace")
+    salida = sys.stdout if args.salida == "-" else open(args.salida, "w", encoding="utf-8")
+    try:
+        analizador.analizar(entrada, salida, args.progreso)
+    finally:
+        if entrada is not sys.stdin:
+            entrada.close()
+        if salida is not sys.stdout:
+            salida.close()
+    analizador.mostrar_estadisticas()
+
+
+if __name__ == "__main__":
+    main()
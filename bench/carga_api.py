@@ -0,0 +1,228 @@
+"""Prueba de carga y latencia de las APIs Flask con un motor UCI falso.
+
+Simula N jugadores concurrentes contra server_api.py (nueva partida, jugar,
+esperar la respuesta del motor) o contra server_stockfish.py (/make_move) y
+muestra latencias p50/p95/p99 por ruta, peticiones/s y la espera en la cola
+de motores. Sin --url se ejecuta en el propio proceso con el cliente de
+pruebas de Flask y bench/motor_falso.py, así que funciona sin red ni motor:
+
+    python3 bench/carga_api.py --jugadores 20 --jugadas 10
+    python3 bench/carga_api.py --servidor stockfish --jugadores 8
+    python3 bench/carga_api.py --url http://localhost:5000 --jugadores 50
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MOTOR_FALSO = os.path.join(RAIZ, "bench", "motor_falso.py")
+
+
+class ClienteHTTP:
+    """Cliente mínimo sobre urllib para un servidor ya arrancado"""
+
+    def __init__(self, url):
+        self.url = url.rstrip("/")
+
+    def peticion(self, metodo, ruta, datos=None):
+        cuerpo = json.dumps(datos).encode() if datos is not None else None
+        req = urllib.request.Request(self.url + ruta, data=cuerpo, method=metodo,
+                                     headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(req, timeout=60) as resp:
+                return resp.status, json.loads(resp.read() or b"null")
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read() or b"null")
+
+
+class ClienteLocal:
+    """Mismo interfaz sobre el cliente de pruebas de Flask (en proceso)"""
+
+    def __init__(self, app):
+        self.cliente = app.test_client()
+
+    def peticion(self, metodo, ruta, datos=None):
+        resp = self.cliente.open(ruta, method=metodo, json=datos)
+        return resp.status_code, resp.get_json()
+
+
+class Metricas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencias = defaultdict(list)
+        self.errores = defaultdict(int)
+        self.peticiones = 0
+
+    def medir(self, cliente, nombre, metodo, ruta, datos=None):
+        inicio = time.perf_counter()
+        estado, cuerpo = cliente.peticion(metodo, ruta, datos)
+        duracion = time.perf_counter() - inicio
+        with self._lock:
+            self.peticiones += 1
+            self.latencias[nombre].append(duracion)
+            if estado >= 400:
+                self.errores[f"{nombre} {estado}"] += 1
+        return estado, cuerpo
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def jugador_api(cliente, metricas, jugadas, modo_espera):
+    """Un jugador: crea partida y juega jugadas aleatorias esperando al motor"""
+    estado, cuerpo = metricas.medir(cliente, "nueva-partida", "POST", "/api/nueva-partida")
+    if estado != 200:
+        return
+    partida_id = cuerpo["partida_id"]
+    legales = cuerpo["tablero"]["jugadas_legales"]
+    ply = 0
+
+    for _ in range(jugadas):
+        if not legales:
+            return
+        estado, cuerpo = metricas.medir(cliente, "jugar", "POST", f"/api/jugar/{partida_id}",
+                                        {"movimiento": random.choice(legales)})
+        if estado == 503:
+            time.sleep(float(cuerpo.get("retry_after", 1)) if cuerpo else 1)
+            continue
+        if estado != 200 or cuerpo.get("juego_terminado"):
+            return
+        ply += 1
+
+        # Esperar la respuesta del motor (long-poll o sondeo de /api/estado)
+        inicio = time.perf_counter()
+        while True:
+            if modo_espera == "long-poll":
+                estado, evento = metricas.medir(cliente, "esperar", "GET",
+                                                f"/api/esperar/{partida_id}?desde={ply}&timeout=10")
+            else:
+                estado, evento = metricas.medir(cliente, "estado", "GET", f"/api/estado/{partida_id}")
+            if estado != 200:
+                return
+            if evento.get("es_turno_humano") or evento.get("juego_terminado"):
+                break
+            if modo_espera == "sondeo":
+                time.sleep(0.05)
+        with metricas._lock:
+            metricas.latencias["respuesta-motor"].append(time.perf_counter() - inicio)
+        if evento.get("juego_terminado"):
+            return
+        ply += 1
+
+        estado, cuerpo = metricas.medir(cliente, "jugadas-legales", "GET", f"/api/jugadas-legales/{partida_id}")
+        legales = cuerpo.get("jugadas_legales", []) if estado == 200 else []
+
+
+def jugador_stockfish(cliente, metricas, jugadas):
+    """Un jugador contra /make_move: partida aleatoria pidiendo jugada en cada turno"""
+    import chess
+    board = chess.Board()
+    for _ in range(jugadas):
+        if board.is_game_over():
+            return
+        board.push(random.choice(list(board.legal_moves)))
+        if board.is_game_over():
+            return
+        estado, cuerpo = metricas.medir(cliente, "make_move", "POST", "/make_move", {"fen": board.fen()})
+        if estado != 200 or not cuerpo.get("best_move"):
+            return
+        board.push_uci(cuerpo["best_move"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--servidor", choices=["api", "stockfish"], default="api")
+    parser.add_argument("--url", help="URL de un servidor ya arrancado (por defecto, en proceso)")
+    parser.add_argument("--jugadores", type=int, default=10)
+    parser.add_argument("--jugadas", type=int, default=10)
+    parser.add_argument("--espera", choices=["long-poll", "sondeo"], default="long-poll")
+    parser.add_argument("--motor-ms", type=int, default=50, help="Tiempo de reflexión del motor falso")
+    parser.add_argument("--motores", type=int, default=2, help="Procesos del pool (modo en proceso)")
+    parser.add_argument("--json", action="store_true", help="Informe en JSON")
+    args = parser.parse_args()
+
+    modulo = None
+    if args.url:
+        crear_cliente = lambda: ClienteHTTP(args.url)
+    else:
+        os.environ.setdefault("STOCKFISH_PATH", MOTOR_FALSO)
+        os.environ["MOTOR_FALSO_MS"] = str(args.motor_ms)
+        os.environ.setdefault("MOTORES_POOL", str(args.motores))
+        sys.path.insert(0, RAIZ)
+        modulo = __import__("server_api" if args.servidor == "api" else "server_stockfish")
+        crear_cliente = lambda: ClienteLocal(modulo.app)
+
+    metricas = Metricas()
+    if args.servidor == "api":
+        objetivo, extra = jugador_api, (args.jugadas, args.espera)
+    else:
+        objetivo, extra = jugador_stockfish, (args.jugadas,)
+
+    hilos = [threading.Thread(target=objetivo, args=(crear_cliente(), metricas) + extra)
+             for _ in range(args.jugadores)]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    duracion = time.perf_counter() - inicio
+
+    salud_ruta = "/api/health" if args.servidor == "api" else "/health"
+    _, salud = crear_cliente().peticion("GET", salud_ruta)
+
+    informe = {
+        "servidor": args.servidor,
+        "jugadores": args.jugadores,
+        "duracion_s": round(duracion, 3),
+        "peticiones": metricas.peticiones,
+        "peticiones_s": round(metricas.peticiones / duracion, 1) if duracion else 0.0,
+        "rutas": {
+            nombre: {
+                "n": len(valores),
+                "p50_ms": round(1000 * percentil(valores, 50), 2),
+                "p95_ms": round(1000 * percentil(valores, 95), 2),
+                "p99_ms": round(1000 * percentil(valores, 99), 2),
+            }
+            for nombre, valores in sorted(metricas.latencias.items())
+        },
+        "errores": dict(metricas.errores),
+        "pool_motores": (salud or {}).get("pool_motores"),
+        "cola_motor": (salud or {}).get("cola_motor"),
+    }
+
+    if args.json:
+        print(json.dumps(informe, indent=2))
+    else:
+        print(f"\n📊 {informe['peticiones']} peticiones en {informe['duracion_s']} s "
+              f"({informe['peticiones_s']} req/s), {args.jugadores} jugadores")
+        print(f"{'ruta':<18}{'n':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for nombre, r in informe["rutas"].items():
+            print(f"{nombre:<18}{r['n']:>7}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}")
+        if informe["errores"]:
+            print(f"⚠️ Errores: {informe['errores']}")
+        if informe["cola_motor"]:
+            cola = informe["cola_motor"]
+            print(f"⏳ Espera en cola del motor: media {cola['espera_media_ms']} ms, máx {cola['espera_max_ms']} ms, "
+                  f"{cola['rechazados']} rechazados")
+        if informe["pool_motores"]:
+            pool = informe["pool_motores"]
+            print(f"🔧 Espera por motor libre: media {pool['espera_media_ms']} ms, máx {pool['espera_max_ms']} ms")
+
+    if modulo is not None:
+        if args.servidor == "api":
+            modulo.cerrar_motor()
+        else:
+            modulo.stockfish_engine.close()
+
+
+if __name__ == "__main__":
+    main()
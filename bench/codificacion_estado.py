@@ -0,0 +1,127 @@
+"""Micro-benchmark de la codificación de /api/estado en cada formato negociable.
+
+Construye la respuesta de /api/estado (tablero completo con sus 64 casillas
+o `?formato=compacto`, jugadas legales e historial) para posiciones de
+partidas aleatorias y mide, por formato, el tiempo de codificación por
+respuesta y los bytes enviados:
+
+- `jsonify` anterior: módulo json con `ensure_ascii` y claves ordenadas;
+- JSON con orjson (`serializacion.a_json`);
+- MessagePack;
+
+cada uno sin comprimir, con gzip y con brotli (los niveles del servidor).
+
+    python3 bench/codificacion_estado.py --partidas 50 --repeticiones 20
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import chess
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import serializacion  # noqa: E402
+from cuentas_motor import CuentasMotor  # noqa: E402
+from estado_partida import estado_de  # noqa: E402
+from partida import Partida  # noqa: E402
+from tablero_json import tablero_a_json_compacto  # noqa: E402
+
+
+def partidas_aleatorias(num_partidas, semilla):
+    """Partidas a medio jugar (entre 10 y 80 medias jugadas)"""
+    rng = random.Random(semilla)
+    resultado = []
+    for _ in range(num_partidas):
+        partida = Partida()
+        objetivo = rng.randint(10, 80)
+        while partida.num_jugadas < objetivo and not partida.board.is_game_over():
+            move = rng.choice(list(partida.board.legal_moves))
+            partida.jugar(move, 'humano' if partida.board.turn == chess.WHITE else 'motor')
+        resultado.append(partida)
+    return resultado
+
+
+def estado_api(partida_id, partida, cuentas, compacto):
+    """El mismo diccionario que devuelve /api/estado"""
+    derivado = estado_de(partida)
+    tablero = tablero_a_json_compacto(partida.board, None, derivado.resumen()) if compacto else derivado.tablero()
+    return {
+        'success': True,
+        'partida_id': partida_id,
+        'tablero': tablero,
+        'historial': partida.historial(10),
+        'es_turno_humano': partida.board.turn == chess.WHITE,
+        'juego_terminado': derivado.terminado,
+        'movimientos_totales': partida.num_entradas,
+        'consumo_motor': cuentas.consumo(partida),
+        'motor_activo': True
+    }
+
+
+def jsonify_anterior(datos):
+    return json.dumps(datos, ensure_ascii=True, sort_keys=True, separators=(',', ':')).encode() + b'\n'
+
+
+def formatos():
+    """(nombre, codificador) de cada formato disponible"""
+    resultado = [('jsonify (json)', jsonify_anterior)]
+    if serializacion.orjson is not None:
+        resultado.append(('orjson', serializacion.a_json))
+    if serializacion.msgpack is not None:
+        resultado.append(('msgpack', serializacion.a_msgpack))
+    return resultado
+
+
+def compresiones():
+    resultado = [('-', None), ('gzip', 'gzip')]
+    if serializacion.brotli is not None:
+        resultado.append(('br', 'br'))
+    return resultado
+
+
+def medir(estados, codificar, compresion, repeticiones):
+    """(microsegundos por respuesta, bytes medios por respuesta)"""
+    total_bytes = 0
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        for datos in estados:
+            cuerpo = codificar(datos)
+            if compresion is not None:
+                cuerpo = serializacion.comprimir(cuerpo, compresion)
+            total_bytes += len(cuerpo)
+    n = repeticiones * len(estados)
+    return (time.perf_counter() - inicio) / n * 1e6, total_bytes / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--partidas", type=int, default=50)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--semilla", type=int, default=1)
+    args = parser.parse_args()
+
+    partidas = partidas_aleatorias(args.partidas, args.semilla)
+    cuentas = CuentasMotor()
+    ausentes = [nombre for nombre in ('orjson', 'msgpack', 'brotli') if getattr(serializacion, nombre) is None]
+    if ausentes:
+        print(f"Sin instalar (se omiten): {', '.join(ausentes)}")
+
+    for compacto in (False, True):
+        estados = [estado_api(str(i), partida, cuentas, compacto) for i, partida in enumerate(partidas)]
+        base_us, base_bytes = medir(estados, jsonify_anterior, None, args.repeticiones)
+        print(f"\n/api/estado{'?formato=compacto' if compacto else ''} ({len(estados)} posiciones)")
+        print(f"  {'formato':<16}{'compresión':<12}{'µs/resp':>10}{'bytes':>10}{'vs jsonify':>12}")
+        for nombre, codificar in formatos():
+            for etiqueta, compresion in compresiones():
+                us, tam = medir(estados, codificar, compresion, args.repeticiones)
+                print(f"  {nombre:<16}{etiqueta:<12}{us:10.1f}{tam:10.0f}"
+                      f"{base_us / us:6.1f}x {base_bytes / tam:4.1f}x")
+
+
+if __name__ == "__main__":
+    main()
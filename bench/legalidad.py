@@ -0,0 +1,115 @@
+"""Micro-benchmark de la comprobación de legalidad y la lista de jugadas legales.
+
+Compara, sobre posiciones de partidas aleatorias, el camino anterior de
+/api/jugar y /api/jugadas-legales (`Move.from_uci` + `move in
+board.legal_moves`, `board.outcome()` y `[move.uci() for move in
+board.legal_moves]`, cada uno con su propia generación) con una sola
+generación por jugada guardada como array de enteros de 16 bits
+(`jugadas_compactas`):
+
+    python3 bench/legalidad.py --partidas 40 --repeticiones 9
+
+Las dos versiones se alternan en cada repetición, así que el ruido de la
+máquina afecta a las dos por igual. Se informa de la mediana y del rango
+(mínimo–máximo) de la razón entre ambas. Con Python 3.11.7, python-chess
+1.11.2, un núcleo, la semilla 1 y `--partidas 40 --repeticiones 9`, la
+mediana sale entre 1.15x y 1.2x según la ejecución, y cada repetición
+suelta entre 1.0x y 1.4x. En otras máquinas puede quedarse en torno a
+1.05x. La mejora depende de la máquina y de la mezcla de posiciones, y solo
+afecta a la parte de la petición que genera jugadas. No tomes la cifra de
+una única ejecución.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+import chess
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import jugadas_compactas  # noqa: E402
+
+
+def posiciones(num_partidas, semilla):
+    """(tablero, jugada UCI pedida) de cada jugada de partidas aleatorias"""
+    rng = random.Random(semilla)
+    resultado = []
+    for _ in range(num_partidas):
+        board = chess.Board()
+        while not board.is_game_over() and board.ply() < 160:
+            legales = list(board.legal_moves)
+            move = rng.choice(legales)
+            # Una de cada cuatro peticiones es ilegal (casilla destino al azar)
+            pedida = move.uci()
+            if rng.random() < 0.25:
+                destino = rng.choice([sq for sq in chess.SQUARES if sq != move.from_square])
+                pedida = chess.Move(move.from_square, destino).uci()
+            resultado.append((board.copy(), pedida))
+            board.push(move)
+    return resultado
+
+
+def camino_anterior(board, pedida):
+    move = chess.Move.from_uci(pedida)
+    board.outcome()
+    legal = move in board.legal_moves
+    return legal, [m.uci() for m in board.legal_moves]
+
+
+def camino_compacto(board, pedida):
+    legales = jugadas_compactas.legales(board)
+    jugadas_compactas.outcome_con_legales(board, len(legales) > 0)
+    legal = jugadas_compactas.codificar(chess.Move.from_uci(pedida)) in legales
+    return legal, [jugadas_compactas.uci(codigo) for codigo in legales]
+
+
+def medir(funcion, casos):
+    inicio = time.perf_counter()
+    for board, pedida in casos:
+        funcion(board, pedida)
+    return time.perf_counter() - inicio
+
+
+def medir_alternando(casos, repeticiones):
+    """Tiempos (anterior, compacto) de cada repetición, alternando el orden"""
+    tiempos = []
+    for i in range(repeticiones):
+        if i % 2:
+            compacto = medir(camino_compacto, casos)
+            anterior = medir(camino_anterior, casos)
+        else:
+            anterior = medir(camino_anterior, casos)
+            compacto = medir(camino_compacto, casos)
+        tiempos.append((anterior, compacto))
+    return tiempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--partidas", type=int, default=100)
+    parser.add_argument("--repeticiones", type=int, default=15)
+    parser.add_argument("--semilla", type=int, default=1)
+    args = parser.parse_args()
+
+    casos = posiciones(args.partidas, args.semilla)
+    for board, pedida in casos:
+        assert camino_anterior(board, pedida) == camino_compacto(board, pedida)
+
+    tiempos = medir_alternando(casos, args.repeticiones)
+    anterior = statistics.median(t[0] for t in tiempos)
+    compacto = statistics.median(t[1] for t in tiempos)
+    razones = [a / c for a, c in tiempos]
+    print(f"{len(casos)} posiciones (mediana de {args.repeticiones} repeticiones alternadas)")
+    print(f"  anterior:  {1e6 * anterior / len(casos):8.2f} µs/petición")
+    print(f"  compacto:  {1e6 * compacto / len(casos):8.2f} µs/petición")
+    print(f"  razón:     {statistics.median(razones):.2f}x (rango {min(razones):.2f}x–{max(razones):.2f}x)")
+    legales = jugadas_compactas.legales(chess.Board())
+    print(f"  memoria por jugada: {legales.itemsize} bytes en array frente a un chess.Move por jugada")
+
+
+if __name__ == "__main__":
+    main()
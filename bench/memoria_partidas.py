@@ -0,0 +1,102 @@
+"""Memoria por partida: diccionario con `chess.Board` frente a `Partida`.
+
+Crea N partidas aleatorias de M jugadas en tres formatos y mide con
+tracemalloc los bytes por partida:
+
+- el formato anterior: dict con el `chess.Board` completo (pila de jugadas
+  incluida) y un historial de diccionarios con la SAN y el timestamp;
+- `Partida` con el tablero en memoria (partida en juego);
+- `Partida` compactada (sin tablero, como una partida inactiva).
+
+    python3 bench/memoria_partidas.py --partidas 2000 --jugadas 60
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+import chess
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from partida import Partida  # noqa: E402
+
+
+def partidas_aleatorias(num_partidas, num_jugadas, semilla):
+    """Listas de jugadas de partidas aleatorias"""
+    rng = random.Random(semilla)
+    resultado = []
+    for _ in range(num_partidas):
+        board = chess.Board()
+        jugadas = []
+        while len(jugadas) < num_jugadas and not board.is_game_over():
+            move = rng.choice(list(board.legal_moves))
+            board.push(move)
+            jugadas.append(move)
+        resultado.append(jugadas)
+    return resultado
+
+
+def formato_anterior(jugadas):
+    partida = {'board': chess.Board(), 'historial': [], 'creado': time.time(),
+               'jugador_color': 'white', 'dificultad': 'normal'}
+    for i, move in enumerate(jugadas):
+        notacion = partida['board'].san(move)
+        partida['board'].push(move)
+        partida['historial'].append({
+            'jugador': 'humano' if i % 2 == 0 else 'motor',
+            'movimiento': move.uci(),
+            'notacion': notacion,
+            'timestamp': time.time()
+        })
+    return partida
+
+
+def formato_partida(jugadas, compactar=False):
+    partida = Partida()
+    partida.board  # partida en juego: el tablero está en memoria
+    for i, move in enumerate(jugadas):
+        partida.jugar(move, 'humano' if i % 2 == 0 else 'motor')
+    if compactar:
+        partida.compactar()
+    return partida
+
+
+def medir(crear, lista):
+    """Bytes por partida que siguen vivos tras crearlas todas"""
+    gc.collect()
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    partidas = [crear(jugadas) for jugadas in lista]
+    gc.collect()
+    despues = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del partidas
+    return (despues - antes) / len(lista)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--partidas", type=int, default=1000)
+    parser.add_argument("--jugadas", type=int, default=60)
+    parser.add_argument("--semilla", type=int, default=1)
+    args = parser.parse_args()
+
+    lista = partidas_aleatorias(args.partidas, args.jugadas, args.semilla)
+    media = sum(len(jugadas) for jugadas in lista) / len(lista)
+    anterior = medir(formato_anterior, lista)
+    activa = medir(formato_partida, lista)
+    compactada = medir(lambda jugadas: formato_partida(jugadas, compactar=True), lista)
+
+    print(f"{args.partidas} partidas, {media:.1f} jugadas de media")
+    print(f"  dict + chess.Board:     {anterior:10.0f} bytes/partida")
+    print(f"  Partida con tablero:    {activa:10.0f} bytes/partida  ({anterior / activa:.1f}x menos)")
+    print(f"  Partida compactada:     {compactada:10.0f} bytes/partida  ({anterior / compactada:.1f}x menos)")
+
+
+if __name__ == "__main__":
+    main()
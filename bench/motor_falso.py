@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""Motor UCI falso para pruebas de carga sin Cfish/Stockfish.
+
+Responde al protocolo UCI con jugadas legales aleatorias tras un tiempo de
+"reflexión" configurable (MOTOR_FALSO_MS, 50 ms por defecto), emitiendo
+líneas `info` por profundidad, MultiPV y jugada de ponder. Atiende `stop`
+para búsquedas infinitas o de ponder.
+"""
+import chess
+import os
+import random
+import sys
+import threading
+import time
+
+TIEMPO_MS = int(os.environ.get("MOTOR_FALSO_MS", "50"))
+NPS = 1000000
+
+opciones = {"multipv": 1}
+board = chess.Board()
+salida_lock = threading.Lock()
+busqueda = None
+parar = threading.Event()
+
+
+def enviar(linea):
+    with salida_lock:
+        sys.stdout.write(linea + "\n")
+        sys.stdout.flush()
+
+
+def posicion(partes):
+    global board
+    if partes[1] == "startpos":
+        nuevo, resto = chess.Board(), partes[2:]
+    else:
+        fin = partes.index("moves") if "moves" in partes else len(partes)
+        nuevo, resto = chess.Board(" ".join(partes[2:fin])), partes[fin:]
+    if resto and resto[0] == "moves":
+        for uci in resto[1:]:
+            nuevo.push_uci(uci)
+    board = nuevo
+
+
+def parametros_go(partes):
+    """Tiempo de búsqueda en segundos (None = hasta recibir stop)"""
+    if "infinite" in partes or "ponder" in partes:
+        return None
+    tiempo = TIEMPO_MS / 1000
+    if "movetime" in partes:
+        tiempo = min(tiempo, int(partes[partes.index("movetime") + 1]) / 1000)
+    return tiempo
+
+
+def buscar(tablero, tiempo):
+    legales = list(tablero.legal_moves)
+    if not legales:
+        enviar("bestmove (none)")
+        return
+    random.shuffle(legales)
+    lineas = legales[:opciones["multipv"]]
+    inicio = time.monotonic()
+    profundidad = 0
+    while True:
+        profundidad += 1
+        transcurrido = time.monotonic() - inicio
+        for i, move in enumerate(lineas, start=1):
+            pv = [move.uci()]
+            tablero.push(move)
+            respuestas = list(tablero.legal_moves)
+            if respuestas:
+                pv.append(random.choice(respuestas).uci())
+            tablero.pop()
+            nodos = int(NPS * transcurrido) + profundidad
+            enviar(f"info depth {profundidad} multipv {i} score cp {random.randint(-50, 50)} "
+                   f"nodes {nodos} nps {NPS} time {int(transcurrido * 1000)} pv {' '.join(pv)}")
+        espera = 0.01 if tiempo is None else max(0.0, min(0.01, tiempo - transcurrido))
+        if parar.wait(espera) or (tiempo is not None and time.monotonic() - inicio >= tiempo):
+            break
+    mejor = lineas[0]
+    tablero.push(mejor)
+    respuestas = list(tablero.legal_moves)
+    ponder = f" ponder {random.choice(respuestas).uci()}" if respuestas else ""
+    enviar(f"bestmove {mejor.uci()}{ponder}")
+
+
+def main():
+    global busqueda
+    for linea in sys.stdin:
+        partes = linea.split()
+        if not partes:
+            continue
+        comando = partes[0]
+        if comando == "uci":
+            enviar("id name MotorFalso")
+            enviar("id author Chess_GUI bench")
+            enviar("option name Hash type spin default 16 min 1 max 65536")
+            enviar("option name Threads type spin default 1 min 1 max 512")
+            enviar("option name MultiPV type spin default 1 min 1 max 500")
+            enviar("option name Ponder type check default false")
+            enviar("option name Skill Level type spin default 20 min 0 max 20")
+            enviar("uciok")
+        elif comando == "isready":
+            enviar("readyok")
+        elif comando == "setoption" and "name" in partes and "value" in partes:
+            nombre = " ".join(partes[partes.index("name") + 1:partes.index("value")]).lower()
+            if nombre == "multipv":
+                opciones["multipv"] = max(1, int(partes[partes.index("value") + 1]))
+        elif comando == "ucinewgame":
+            pass
+        elif comando == "position":
+            posicion(partes)
+        elif comando == "go":
+            parar.clear()
+            busqueda = threading.Thread(target=buscar, args=(board.copy(), parametros_go(partes)))
+            busqueda.start()
+        elif comando in ("stop", "ponderhit"):
+            parar.set()
+            if busqueda is not None:
+                busqueda.join()
+        elif comando == "quit":
+            parar.set()
+            break
+
+
+if __name__ == "__main__":
+    main()
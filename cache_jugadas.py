@@ -0,0 +1,75 @@
+import chess
+import chess.polyglot
+import threading
+import time
+from collections import OrderedDict
+
+
+def clave_posicion(board, limite):
+    """Clave de caché: hash Zobrist de la posición más el límite de búsqueda"""
+    return (
+        chess.polyglot.zobrist_hash(board),
+        limite.time,
+        limite.depth,
+        limite.nodes,
+    )
+
+
+class CacheJugadas:
+    """Caché LRU acotada (con TTL opcional) de jugadas del motor por posición.
+
+    Las aperturas se repiten entre usuarios, así que una posición ya
+    calculada con el mismo límite se responde sin consultar al motor.
+    """
+
+    def __init__(self, max_entradas=10000, ttl=None):
+        self.max_entradas = max_entradas
+        self.ttl = ttl or None
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, board, limite):
+        """Devuelve el resultado guardado para la posición o None"""
+        clave = clave_posicion(board, limite)
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                guardado, resultado = entrada
+                if self.ttl is None or time.monotonic() - guardado <= self.ttl:
+                    self._entradas.move_to_end(clave)
+                    self.aciertos += 1
+                    return resultado
+                del self._entradas[clave]
+            self.fallos += 1
+            return None
+
+    def guardar(self, board, limite, resultado):
+        """Guarda el resultado de una búsqueda, expulsando la entrada menos usada"""
+        clave = clave_posicion(board, limite)
+        with self._lock:
+            self._entradas[clave] = (time.monotonic(), resultado)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def limpiar(self):
+        """Vacía la caché y reinicia los contadores"""
+        with self._lock:
+            self._entradas.clear()
+            self.aciertos = 0
+            self.fallos = 0
+
+    def estadisticas(self):
+        """Contadores de aciertos/fallos para los endpoints de salud"""
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'entradas': len(self._entradas),
+                'max_entradas': self.max_entradas,
+                'ttl': self.ttl,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa_aciertos': round(self.aciertos / consultas, 4) if consultas else 0.0,
+            }
@@ -0,0 +1,123 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+
+class CuotaAgotadaError(Exception):
+    """El cliente o la partida ha gastado sus segundos de motor"""
+
+    def __init__(self, ambito, retry_after=None):
+        if ambito == 'partida':
+            mensaje = "Cuota de motor de la partida agotada"
+        else:
+            mensaje = f"Cuota de motor del cliente agotada, reintentar en {retry_after} s"
+        super().__init__(mensaje)
+        self.ambito = ambito  # 'cliente' o 'partida'
+        self.retry_after = retry_after  # None: no se recupera esperando
+
+
+class CuentasMotor:
+    """Cuentas de segundos de motor por cliente y por partida.
+
+    Cada cliente dispone de `cuota_cliente` segundos de motor que se recargan
+    de forma continua a lo largo de `ventana` segundos (cubo de fichas); cada
+    partida, de `cuota_partida` segundos en total, anotados en la propia
+    `Partida` (`segundos_motor`). Las cuentas se comprueban antes de encolar
+    el trabajo, así que quien no tiene saldo no llega a ocupar un motor, y la
+    duración real de cada búsqueda se carga al terminar (el saldo puede
+    quedar en negativo el coste de una búsqueda). Una cuota 0 es ilimitada.
+    Sin partida (búsquedas sueltas o análisis) solo cuenta la del cliente.
+    """
+
+    def __init__(self, cuota_cliente=0.0, ventana=3600.0, cuota_partida=0.0, max_clientes=100000):
+        if not (math.isfinite(ventana) and ventana > 0):
+            raise ValueError(f"La ventana de la cuota de motor debe ser un número de segundos positivo: {ventana}")
+        self.cuota_cliente = cuota_cliente
+        self.ventana = ventana
+        self.cuota_partida = cuota_partida
+        self.max_clientes = max_clientes
+        self._recarga = cuota_cliente / ventana if cuota_cliente else 0.0  # segundos de saldo por segundo
+        self._clientes = OrderedDict()  # cliente -> [saldo, última actualización], LRU
+        self._lock = threading.Lock()
+
+        # Métricas
+        self.segundos_total = 0.0
+        self.busquedas = 0
+        self.rechazos_cliente = 0
+        self.rechazos_partida = 0
+
+    def _cuenta(self, cliente, ahora):
+        """Cuenta del cliente con la recarga acumulada desde su último uso"""
+        cuenta = self._clientes.get(cliente)
+        if cuenta is None:
+            cuenta = self._clientes[cliente] = [self.cuota_cliente, ahora]
+            if len(self._clientes) > self.max_clientes:
+                # La menos usada: tras una ventana sin uso ya estaría llena
+                self._clientes.popitem(last=False)
+        else:
+            self._clientes.move_to_end(cliente)
+            cuenta[0] = min(self.cuota_cliente, cuenta[0] + (ahora - cuenta[1]) * self._recarga)
+            cuenta[1] = ahora
+        return cuenta
+
+    def comprobar(self, cliente, partida=None):
+        """Lanza CuotaAgotadaError si la partida o su cliente no tienen saldo"""
+        if self.cuota_partida and partida is not None and partida.segundos_motor >= self.cuota_partida:
+            with self._lock:
+                self.rechazos_partida += 1
+            raise CuotaAgotadaError('partida')
+        if self.cuota_cliente and cliente is not None:
+            with self._lock:
+                saldo = self._cuenta(cliente, time.monotonic())[0]
+                if saldo <= 0:
+                    self.rechazos_cliente += 1
+                    raise CuotaAgotadaError('cliente', max(1, math.ceil(-saldo / self._recarga)))
+
+    def disponible(self, cliente, partida=None):
+        """Como `comprobar`, sin excepción ni contar rechazos (búsquedas opcionales como el ponder)"""
+        if self.cuota_partida and partida is not None and partida.segundos_motor >= self.cuota_partida:
+            return False
+        saldo = self.saldo(cliente)
+        return saldo is None or saldo > 0
+
+    def cargar(self, cliente, partida, segundos):
+        """Anota en la partida y en la cuenta del cliente la duración de una búsqueda"""
+        if partida is not None:
+            partida.segundos_motor += segundos
+            partida.busquedas_motor += 1
+        with self._lock:
+            self.segundos_total += segundos
+            self.busquedas += 1
+            if self.cuota_cliente and cliente is not None:
+                self._cuenta(cliente, time.monotonic())[0] -= segundos
+
+    def saldo(self, cliente):
+        """Segundos de motor que le quedan al cliente (None sin cuota)"""
+        if not self.cuota_cliente or cliente is None:
+            return None
+        with self._lock:
+            return self._cuenta(cliente, time.monotonic())[0]
+
+    def consumo(self, partida):
+        """Uso del motor de una partida y saldo de su cliente, para las respuestas de estado"""
+        saldo = self.saldo(partida.cliente)
+        return {
+            'segundos': round(partida.segundos_motor, 3),
+            'busquedas': partida.busquedas_motor,
+            'cuota_partida': self.cuota_partida or None,
+            'saldo_cliente': round(saldo, 3) if saldo is not None else None,
+        }
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                'cuota_cliente': self.cuota_cliente or None,
+                'ventana': self.ventana,
+                'cuota_partida': self.cuota_partida or None,
+                'clientes': len(self._clientes),
+                'busquedas': self.busquedas,
+                'segundos_total': round(self.segundos_total, 3),
+                'rechazos_cliente': self.rechazos_cliente,
+                'rechazos_partida': self.rechazos_partida,
+            }
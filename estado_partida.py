@@ -0,0 +1,140 @@
+import chess
+import threading
+
+import jugadas_compactas
+from tablero_json import estado_juego, tablero_a_json
+
+
+class EstadoDerivado:
+    """Estado derivado de un tablero, calculado una vez por jugada.
+
+    Jugadas legales, fin de partida, resultado y el tablero serializado se
+    calculan la primera vez que se piden en cada jugada y se guardan hasta el
+    siguiente `push`/`pop`, así que los endpoints de lectura no vuelven a
+    recorrer la pila de movimientos en cada petición.
+
+    Las jugadas legales se generan una sola vez por jugada y se guardan
+    codificadas en un `array` de enteros de 16 bits (ver `jugadas_compactas`);
+    de ahí salen la comprobación de legalidad, la lista UCI y el fin de partida.
+    """
+
+    def __init__(self, board):
+        self.board = board
+        self._lock = threading.Lock()
+        self._clave = None
+        self._outcome = None
+        self._legales = None
+        self._legales_uci = None
+        self._resumen = None
+        self._tablero = None
+
+    def _clave_actual(self):
+        stack = self.board.move_stack
+        return (len(stack), stack[-1] if stack else None)
+
+    def _vigente(self):
+        """Recalcula la parte básica si el tablero cambió desde la última consulta"""
+        clave = self._clave_actual()
+        if clave != self._clave:
+            self._clave = clave
+            self._legales = jugadas_compactas.legales(self.board)
+            self._outcome = jugadas_compactas.outcome_con_legales(self.board, len(self._legales) > 0)
+            self._legales_uci = None
+            self._resumen = None
+            self._tablero = None
+
+    def invalidar(self):
+        """Fuerza el recálculo en la próxima consulta"""
+        with self._lock:
+            self._clave = None
+
+    @property
+    def terminado(self):
+        with self._lock:
+            self._vigente()
+            return self._outcome is not None
+
+    @property
+    def outcome(self):
+        with self._lock:
+            self._vigente()
+            return self._outcome
+
+    @property
+    def resultado(self):
+        """Resultado PGN ('1-0', '0-1', '1/2-1/2') o '*' si sigue en juego"""
+        outcome = self.outcome
+        return outcome.result() if outcome else '*'
+
+    @property
+    def jugadas_legales(self):
+        """Lista de jugadas legales en UCI"""
+        with self._lock:
+            self._vigente()
+            return self._legales_uci_vigentes()
+
+    def es_legal(self, move):
+        """Comprueba la legalidad contra las jugadas codificadas de esta jugada"""
+        with self._lock:
+            self._vigente()
+            return jugadas_compactas.codificar(move) in self._legales
+
+    def resumen(self):
+        """Indicadores de turno, jaque y fin de partida (ver `estado_juego`)"""
+        with self._lock:
+            self._vigente()
+            return self._resumen_vigente()
+
+    def _legales_uci_vigentes(self):
+        if self._legales_uci is None:
+            self._legales_uci = [jugadas_compactas.uci(codigo) for codigo in self._legales]
+        return self._legales_uci
+
+    def _resumen_vigente(self):
+        if self._resumen is None:
+            self._resumen = estado_juego(self.board, self._legales_uci_vigentes(), self._outcome)
+        return self._resumen
+
+    def tablero(self):
+        """Tablero completo serializado para el frontend"""
+        with self._lock:
+            self._vigente()
+            if self._tablero is None:
+                self._tablero = tablero_a_json(self.board, self._resumen_vigente())
+            return self._tablero
+
+
+def estado_de(partida):
+    """Estado derivado de una partida, creado la primera vez que se pide"""
+    estado = partida.estado
+    if estado is None or estado.board is not partida.board:
+        estado = partida.estado = EstadoDerivado(partida.board)
+    return estado
+
+
+def resultado_de(partida):
+    """Resultado PGN de la partida ('*' si sigue en juego).
+
+    De una partida compactada se usa el guardado al compactarla, sin
+    reconstruir su tablero (recorridos de salud, limpieza y listados).
+    """
+    final = partida.final
+    if final is not None:
+        return final[0]
+    return estado_de(partida).resultado
+
+
+def evento_partida(partida_id, partida):
+    """Resumen ligero del último movimiento para long-poll y SSE (sin tablero completo)"""
+    board = partida.board
+    derivado = estado_de(partida)
+    ultimo = partida.ultima_entrada()
+    return {
+        'partida_id': partida_id,
+        'ply': len(board.move_stack),
+        'fen': board.fen(),
+        'ultimo_movimiento': ultimo,
+        'es_turno_humano': board.turn == chess.WHITE,
+        'juego_terminado': derivado.terminado,
+        'resultado': derivado.resultado if derivado.terminado else None
+    }
@@ -0,0 +1,122 @@
+import chess
+import chess.engine
+
+TIEMPO_BASE = 2.0  # segundos por jugada en una posición normal de medio juego
+TIEMPO_MINIMO = 0.05
+
+# Multiplicador del tiempo según la dificultad pedida por el jugador
+DIFICULTADES = {
+    'facil': 0.25,
+    'normal': 1.0,
+    'dificil': 1.5,
+}
+DIFICULTAD_DEFECTO = 'normal'
+
+# Escalones de tiempo: los límites se redondean a estos valores para que
+# las posiciones repetidas sigan acertando en la caché de jugadas
+ESCALONES = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 4.0)
+
+# Presupuesto determinista: nodos por jugada en una posición normal de medio
+# juego (equivale a unos TIEMPO_BASE segundos en un núcleo) y profundidad
+# máxima por dificultad. A diferencia del tiempo, no depende de la carga de
+# la máquina: la fuerza del motor es la misma con la CPU saturada
+NODOS_BASE = 1000000
+NODOS_MINIMOS = 5000
+PROFUNDIDADES = {
+    'facil': 8,
+    'normal': None,
+    'dificil': None,
+}
+
+# Material sin peones de la posición inicial (caballos, alfiles, torres, damas)
+_VALOR_FASE = {chess.KNIGHT: 1, chess.BISHOP: 1, chess.ROOK: 2, chess.QUEEN: 4}
+_FASE_TOTAL = 24
+
+
+def dificultad_valida(dificultad):
+    """Normaliza la dificultad pedida; None, desconocida o no texto → la de por defecto"""
+    if not isinstance(dificultad, str):
+        return DIFICULTAD_DEFECTO
+    dificultad = dificultad.strip().lower()
+    return dificultad if dificultad in DIFICULTADES else DIFICULTAD_DEFECTO
+
+
+def fase_partida(board):
+    """Fracción del material de piezas que queda: 1.0 al inicio, 0.0 en finales de peones"""
+    material = sum(valor * len(board.pieces(pieza, color))
+                   for pieza, valor in _VALOR_FASE.items()
+                   for color in chess.COLORS)
+    return min(1.0, material / _FASE_TOTAL)
+
+
+def jugada_unica(board):
+    """La única jugada legal si no hay otra (no hace falta buscar); si no, None"""
+    unica = None
+    for move in board.legal_moves:
+        if unica is not None:
+            return None
+        unica = move
+    return unica
+
+
+def _factor_jugadas(num_legales):
+    """Pocas alternativas (recapturas, salir de jaque) necesitan menos búsqueda"""
+    return min(1.0, 0.3 + num_legales / 30)
+
+
+def _factor_fase(board, fase):
+    """Menos tiempo en la apertura, el máximo en el medio juego, algo menos en el final"""
+    if board.fullmove_number <= 8:
+        return 0.5
+    if fase < 0.3:
+        return 0.75
+    return 1.0
+
+
+def _factor_carga(carga):
+    """Acorta las búsquedas cuando hay trabajos esperando (carga = pendientes / motores)"""
+    return 1.0 / (1.0 + 0.5 * max(0.0, carga))
+
+
+def _escalon(tiempo):
+    """Redondea hacia abajo al escalón de tiempo más cercano"""
+    elegido = ESCALONES[0]
+    for escalon in ESCALONES:
+        if escalon > tiempo:
+            break
+        elegido = escalon
+    return elegido
+
+
+def tiempo_jugada(board, dificultad=None, carga=0.0, tiempo_base=TIEMPO_BASE):
+    """Segundos de búsqueda para la jugada del motor en esta posición"""
+    num_legales = board.legal_moves.count()
+    tiempo = (tiempo_base
+              * DIFICULTADES[dificultad_valida(dificultad)]
+              * _factor_jugadas(num_legales)
+              * _factor_fase(board, fase_partida(board))
+              * _factor_carga(carga))
+    return _escalon(max(TIEMPO_MINIMO, tiempo))
+
+
+def nodos_jugada(board, dificultad=None, nodos_base=NODOS_BASE):
+    """Nodos de búsqueda para la jugada del motor (sin depender de la carga)"""
+    num_legales = board.legal_moves.count()
+    nodos = (nodos_base
+             * DIFICULTADES[dificultad_valida(dificultad)]
+             * _factor_jugadas(num_legales)
+             * _factor_fase(board, fase_partida(board)))
+    return max(NODOS_MINIMOS, int(nodos))
+
+
+def limite_jugada(board, dificultad=None, carga=0.0, tiempo_base=TIEMPO_BASE, nodos_base=None):
+    """`Limit` para la jugada del motor.
+
+    Con `nodos_base` es un presupuesto determinista de nodos y profundidad
+    (ver `nodos_jugada`); si no, un tiempo adaptativo (ver `tiempo_jugada`).
+    """
+    if nodos_base:
+        dificultad = dificultad_valida(dificultad)
+        return chess.engine.Limit(nodes=nodos_jugada(board, dificultad, nodos_base),
+                                  depth=PROFUNDIDADES[dificultad])
+    return chess.engine.Limit(time=tiempo_jugada(board, dificultad, carga, tiempo_base))
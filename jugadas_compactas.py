@@ -0,0 +1,58 @@
+import chess
+from array import array
+
+# Jugada codificada en 15 bits: origen | destino << 6 | pieza de promoción << 12.
+# Cabe en un entero sin signo de 16 bits (array 'H'); 0 (a1a1) nunca es legal.
+TIPO_ARRAY = 'H'
+
+
+def codificar(move):
+    """Entero de 16 bits de una jugada"""
+    return move.from_square | move.to_square << 6 | (move.promotion or 0) << 12
+
+
+def decodificar(codigo):
+    """`chess.Move` de una jugada codificada"""
+    return chess.Move(codigo & 63, codigo >> 6 & 63, codigo >> 12 or None)
+
+
+def _tabla_uci():
+    tabla = {}
+    for desde in chess.SQUARES:
+        for hasta in chess.SQUARES:
+            move = chess.Move(desde, hasta)
+            tabla[codificar(move)] = move.uci()
+            if chess.square_rank(hasta) in (0, 7) and chess.square_distance(desde, hasta) == 1:
+                for pieza in (chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN):
+                    move = chess.Move(desde, hasta, pieza)
+                    tabla[codificar(move)] = move.uci()
+    return tabla
+
+
+# Texto UCI de cada código, calculado una sola vez al importar
+UCI = _tabla_uci()
+
+
+def uci(codigo):
+    """Texto UCI de una jugada codificada (sin crear el `chess.Move`)"""
+    return UCI[codigo]
+
+
+def legales(board):
+    """Jugadas legales del tablero codificadas en un array compacto"""
+    return array(TIPO_ARRAY, [codificar(move) for move in board.generate_legal_moves()])
+
+
+def outcome_con_legales(board, hay_legales):
+    """`board.outcome()` reutilizando las jugadas legales ya generadas"""
+    if not hay_legales:
+        if board.is_check():
+            return chess.Outcome(chess.Termination.CHECKMATE, not board.turn)
+        return chess.Outcome(chess.Termination.STALEMATE, None)
+    if board.is_insufficient_material():
+        return chess.Outcome(chess.Termination.INSUFFICIENT_MATERIAL, None)
+    if board.is_seventyfive_moves():
+        return chess.Outcome(chess.Termination.SEVENTYFIVE_MOVES, None)
+    if board.is_fivefold_repetition():
+        return chess.Outcome(chess.Termination.FIVEFOLD_REPETITION, None)
+    return None
@@ -0,0 +1,70 @@
+import chess
+import chess.polyglot
+import os
+import threading
+import logging
+
+
+class LibroAperturas:
+    """Libro de aperturas Polyglot (.bin) consultado antes que el motor.
+
+    `chess.polyglot.open_reader` mapea el fichero en memoria (mmap) y
+    localiza las entradas de cada posición por búsqueda binaria sobre el
+    hash Zobrist, así que una consulta cuesta microsegundos.
+    """
+
+    def __init__(self, ruta=None, max_ply=20):
+        self.ruta = ruta
+        self.max_ply = max_ply
+        self._reader = None
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+        if ruta:
+            if os.path.exists(ruta):
+                self._reader = chess.polyglot.open_reader(ruta)
+                logging.info(f"Libro de aperturas cargado: {ruta}")
+            else:
+                logging.warning(f"Libro de aperturas no encontrado: {ruta}")
+
+    def disponible(self):
+        """Indica si hay un libro cargado"""
+        return self._reader is not None
+
+    def elegir_jugada(self, board):
+        """Devuelve una jugada del libro ponderada por peso, o None.
+
+        Fuera del libro, o pasada la profundidad máxima, devuelve None para
+        que la posición se consulte al motor.
+        """
+        if self._reader is None or board.ply() >= self.max_ply:
+            return None
+
+        try:
+            move = self._reader.weighted_choice(board).move
+        except IndexError:
+            move = None
+
+        with self._lock:
+            if move is None:
+                self.fallos += 1
+            else:
+                self.aciertos += 1
+        return move
+
+    def estadisticas(self):
+        """Contadores de jugadas de libro frente a consultas que siguen al motor"""
+        with self._lock:
+            return {
+                'activo': self.disponible(),
+                'max_ply': self.max_ply,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+            }
+
+    def cerrar(self):
+        """Libera el mapeo del fichero"""
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
@@ -0,0 +1,188 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from flask import g, request
+
+BUCKETS_LATENCIA = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CODIFICACION = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01)
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _etiquetas_texto(nombres, valores):
+    if not nombres:
+        return ''
+    return '{' + ','.join(f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)) + '}'
+
+
+class Contador:
+    """Contador monótono con etiquetas opcionales"""
+
+    tipo = 'counter'
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def inc(self, valor=1, **etiquetas):
+        clave = tuple(etiquetas.get(n, '') for n in self.etiquetas)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0) + valor
+
+    def muestras(self):
+        with self._lock:
+            valores = list(self._valores.items())
+        for clave, valor in valores:
+            yield f"{self.nombre}{_etiquetas_texto(self.etiquetas, clave)} {valor}"
+
+
+class Histograma:
+    """Histograma acumulativo por buckets (estilo Prometheus)"""
+
+    tipo = 'histogram'
+
+    def __init__(self, nombre, ayuda, buckets=BUCKETS_LATENCIA, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.buckets = tuple(sorted(buckets))
+        self.etiquetas = tuple(etiquetas)
+        self._series = {}  # etiquetas -> [conteos por bucket + inf, suma, total]
+        self._lock = threading.Lock()
+
+    def observar(self, valor, **etiquetas):
+        clave = tuple(etiquetas.get(n, '') for n in self.etiquetas)
+        indice = bisect.bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = self._series[clave] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            serie[0][indice] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    @contextmanager
+    def medir(self, **etiquetas):
+        """Observa la duración del bloque en segundos"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, **etiquetas)
+
+    def muestras(self):
+        with self._lock:
+            series = [(clave, list(s[0]), s[1], s[2]) for clave, s in self._series.items()]
+        for clave, conteos, suma, total in series:
+            acumulado = 0
+            for limite, conteo in zip(self.buckets + (float('inf'),), conteos):
+                acumulado += conteo
+                le = '+Inf' if limite == float('inf') else repr(limite)
+                yield (f"{self.nombre}_bucket"
+                       f"{_etiquetas_texto(self.etiquetas + ('le',), clave + (le,))} {acumulado}")
+            yield f"{self.nombre}_sum{_etiquetas_texto(self.etiquetas, clave)} {suma}"
+            yield f"{self.nombre}_count{_etiquetas_texto(self.etiquetas, clave)} {total}"
+
+
+class MetricaCalculada:
+    """Gauge o contador cuyo valor se lee de una función al exponer las métricas"""
+
+    def __init__(self, nombre, ayuda, funcion, tipo='gauge'):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.funcion = funcion
+        self.tipo = tipo
+
+    def muestras(self):
+        try:
+            valor = self.funcion()
+        except Exception:
+            return
+        if valor is not None:
+            yield f"{self.nombre} {float(valor)}"
+
+
+class Registro:
+    """Conjunto de métricas de un servidor, expuestas en formato de texto Prometheus.
+
+    La recogida en el camino caliente es un incremento bajo un lock por
+    métrica; el formateo solo ocurre cuando se consulta `/metrics`.
+    """
+
+    def __init__(self):
+        self._metricas = []
+
+    def _registrar(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def contador(self, nombre, ayuda, etiquetas=()):
+        return self._registrar(Contador(nombre, ayuda, etiquetas))
+
+    def histograma(self, nombre, ayuda, buckets=BUCKETS_LATENCIA, etiquetas=()):
+        return self._registrar(Histograma(nombre, ayuda, buckets, etiquetas))
+
+    def calculada(self, nombre, ayuda, funcion, tipo='gauge'):
+        return self._registrar(MetricaCalculada(nombre, ayuda, funcion, tipo))
+
+    def exponer(self):
+        """Texto para el endpoint /metrics"""
+        lineas = []
+        for metrica in self._metricas:
+            lineas.append(f"# HELP {metrica.nombre} {metrica.ayuda}")
+            lineas.append(f"# TYPE {metrica.nombre} {metrica.tipo}")
+            lineas.extend(metrica.muestras())
+        return '\n'.join(lineas) + '\n'
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def instrumentar_rutas(app, histograma):
+    """Mide la latencia de cada petición Flask etiquetada por ruta, método y código"""
+    @app.before_request
+    def _inicio_peticion():
+        g._inicio_metricas = time.perf_counter()
+
+    @app.after_request
+    def _fin_peticion(respuesta):
+        inicio = g.pop('_inicio_metricas', None)
+        if inicio is not None:
+            ruta = request.url_rule.rule if request.url_rule else 'sin_ruta'
+            histograma.observar(time.perf_counter() - inicio, ruta=ruta,
+                                metodo=request.method, codigo=respuesta.status_code)
+        return respuesta
+
+
+class InstrumentarASGI:
+    """Middleware ASGI equivalente a `instrumentar_rutas` para el servidor asíncrono"""
+
+    def __init__(self, app, histograma):
+        self.app = app
+        self.histograma = histograma
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        inicio = time.perf_counter()
+        codigo = 500
+
+        async def enviar(mensaje):
+            nonlocal codigo
+            if mensaje['type'] == 'http.response.start':
+                codigo = mensaje['status']
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            # El router deja la ruta encontrada en el scope (plantilla, no la URL)
+            ruta = getattr(scope.get('route'), 'path', 'sin_ruta')
+            self.histograma.observar(time.perf_counter() - inicio, ruta=ruta,
+                                     metodo=scope['method'], codigo=codigo)
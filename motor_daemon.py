@@ -0,0 +1,236 @@
+"""Daemon de motores compartido por varios workers web.
+
+Mantiene un `PoolMotores` y atiende búsquedas por un socket Unix local
+(`multiprocessing.connection`), de modo que los workers de Flask/gunicorn no
+arrancan su propio motor y las dos capas escalan por separado:
+
+    python3 motor_daemon.py --socket /tmp/chess-motores.sock --motores 4
+    MOTOR_SOCKET=/tmp/chess-motores.sock gunicorn -w 8 server_api:app
+"""
+import chess
+import chess.engine
+import argparse
+import os
+import queue
+import threading
+import logging
+from contextlib import contextmanager
+from multiprocessing.connection import Listener, Client
+
+from pool_motores import PoolMotores, PoolAgotadoError
+from supervisor_motores import SupervisorMotores
+
+CAMPOS_LIMITE = ('time', 'depth', 'nodes', 'mate')
+
+
+def limite_a_dict(limite):
+    return {campo: getattr(limite, campo) for campo in CAMPOS_LIMITE if getattr(limite, campo) is not None}
+
+
+def tablero_a_peticion(board):
+    """Posición inicial + jugadas, para conservar el historial de repeticiones"""
+    return {
+        'fen': board.root().fen(),
+        'movimientos': [move.uci() for move in board.move_stack]
+    }
+
+
+def peticion_a_tablero(peticion):
+    board = chess.Board(peticion['fen'])
+    for uci in peticion['movimientos']:
+        board.push_uci(uci)
+    return board
+
+
+# --- Lado servidor ---
+
+class DaemonMotores:
+    """Atiende peticiones de búsqueda de los workers web con un pool local"""
+
+    def __init__(self, pool, socket_path, clave=None):
+        self.pool = pool
+        self.socket_path = socket_path
+        self.clave = clave
+
+    def _atender(self, peticion):
+        op = peticion.get('op')
+        if op == 'play':
+            board = peticion_a_tablero(peticion)
+            limite = chess.engine.Limit(**peticion['limite'])
+            with self.pool.usar(timeout=peticion.get('timeout')) as motor:
+                result = motor.play(board, limite)
+            return {
+                'move': result.move.uci() if result.move else None,
+                'ponder': result.ponder.uci() if result.ponder else None
+            }
+        if op == 'ping':
+            return {'ping': self.pool.ping()}
+        if op == 'estadisticas':
+            return {'estadisticas': self.pool.estadisticas()}
+        return {'error': 'operacion', 'mensaje': f"Operación desconocida: {op}"}
+
+    def _conexion(self, conn):
+        with conn:
+            while True:
+                try:
+                    peticion = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    respuesta = self._atender(peticion)
+                except PoolAgotadoError as e:
+                    respuesta = {'error': 'agotado', 'mensaje': str(e)}
+                except chess.engine.EngineTerminatedError as e:
+                    respuesta = {'error': 'terminado', 'mensaje': str(e)}
+                except Exception as e:
+                    respuesta = {'error': 'motor', 'mensaje': str(e)}
+                try:
+                    conn.send(respuesta)
+                except (EOFError, OSError):
+                    return
+
+    def servir(self):
+        """Acepta conexiones indefinidamente, un hilo por conexión"""
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        with Listener(self.socket_path, family='AF_UNIX', authkey=self.clave) as listener:
+            logging.info(f"Daemon de motores escuchando en {self.socket_path}")
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    logging.warning(f"Conexión rechazada: {e}")
+                    continue
+                threading.Thread(target=self._conexion, args=(conn,), daemon=True).start()
+
+
+# --- Lado cliente (workers web) ---
+
+class _MotorRemoto:
+    """Proxy con la misma interfaz `play` que un motor del pool"""
+
+    def __init__(self, cliente, conn, timeout):
+        self._cliente = cliente
+        self._conn = conn
+        self._timeout = timeout
+
+    def play(self, board, limit):
+        peticion = tablero_a_peticion(board)
+        peticion.update(op='play', limite=limite_a_dict(limit), timeout=self._timeout)
+        respuesta = self._cliente._pedir(self._conn, peticion)
+        return chess.engine.PlayResult(
+            chess.Move.from_uci(respuesta['move']) if respuesta['move'] else None,
+            chess.Move.from_uci(respuesta['ponder']) if respuesta['ponder'] else None
+        )
+
+
+class ClienteMotorRemoto:
+    """Cliente del daemon con la misma interfaz que `PoolMotores`.
+
+    Reutiliza conexiones al socket (una por búsqueda simultánea) y traduce
+    los errores del daemon a las mismas excepciones que el pool local.
+    """
+
+    def __init__(self, socket_path, clave=None):
+        self.socket_path = socket_path
+        self.clave = clave
+        self._conexiones = queue.LifoQueue()
+
+    def _conectar(self):
+        try:
+            return self._conexiones.get_nowait()
+        except queue.Empty:
+            return Client(self.socket_path, family='AF_UNIX', authkey=self.clave)
+
+    def _pedir(self, conn, peticion):
+        try:
+            conn.send(peticion)
+            respuesta = conn.recv()
+        except (EOFError, OSError) as e:
+            conn.close()
+            raise chess.engine.EngineTerminatedError(f"Conexión con el daemon perdida: {e}")
+
+        error = respuesta.get('error')
+        if error == 'agotado':
+            raise PoolAgotadoError(respuesta['mensaje'])
+        if error == 'terminado':
+            raise chess.engine.EngineTerminatedError(respuesta['mensaje'])
+        if error:
+            raise chess.engine.EngineError(respuesta['mensaje'])
+        return respuesta
+
+    def _peticion_simple(self, peticion):
+        conn = self._conectar()
+        respuesta = self._pedir(conn, peticion)
+        self._conexiones.put(conn)
+        return respuesta
+
+    def iniciar(self):
+        """Comprueba que el daemon responde; devuelve cuántos motores tiene"""
+        try:
+            return self.estadisticas()['motores']
+        except Exception as e:
+            logging.error(f"No se pudo contactar con el daemon en {self.socket_path}: {e}")
+            return 0
+
+    def disponible(self):
+        return True
+
+    @contextmanager
+    def usar(self, timeout=None):
+        try:
+            conn = self._conectar()
+        except OSError as e:
+            raise chess.engine.EngineTerminatedError(f"Daemon de motores no disponible: {e}")
+        try:
+            yield _MotorRemoto(self, conn, timeout)
+        finally:
+            if not conn.closed:
+                self._conexiones.put(conn)
+
+    def ping(self):
+        try:
+            return self._peticion_simple({'op': 'ping'})['ping']
+        except Exception:
+            return False
+
+    def estadisticas(self):
+        estadisticas = self._peticion_simple({'op': 'estadisticas'})['estadisticas']
+        estadisticas['remoto'] = self.socket_path
+        return estadisticas
+
+    def cerrar(self):
+        while True:
+            try:
+                self._conexiones.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Daemon de motores UCI compartido por los workers web")
+    parser.add_argument("--socket", default=os.environ.get("MOTOR_SOCKET", "/tmp/chess-motores.sock"))
+    parser.add_argument("--motor", default=os.environ.get("STOCKFISH_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "engines/Cfish_Linux", "Cfish 060821 x64 general")))
+    parser.add_argument("--motores", type=int, default=int(os.environ.get("MOTORES_POOL", "0")) or None)
+    parser.add_argument("--hash-total", type=int, default=int(os.environ.get("MOTOR_HASH_TOTAL_MB", "512")))
+    parser.add_argument("--reserva", type=int, default=int(os.environ.get("MOTORES_RESERVA", "1")))
+    parser.add_argument("--max-motores", type=int, default=int(os.environ.get("MOTORES_MAX", "0")) or None)
+    args = parser.parse_args()
+
+    clave = os.environ.get("MOTOR_SOCKET_CLAVE")
+    pool = PoolMotores(args.motor, num_motores=args.motores, hash_total_mb=args.hash_total,
+                       reserva=args.reserva, max_motores=args.max_motores, plazo_busqueda=30)
+    if not pool.iniciar():
+        raise SystemExit("❌ No se pudo iniciar ningún motor")
+    supervisor = SupervisorMotores(pool)
+    supervisor.iniciar()
+
+    try:
+        DaemonMotores(pool, args.socket, clave.encode() if clave else None).servir()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        supervisor.detener()
+        pool.cerrar()
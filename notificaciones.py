@@ -0,0 +1,84 @@
+import asyncio
+import threading
+
+
+class NotificadorPartidas:
+    """Condiciones por partida para despertar a los clientes en espera.
+
+    Las peticiones long-poll y los streams SSE esperan en la condición de su
+    partida y se despiertan en cuanto se juega un movimiento, en lugar de
+    sondear `/api/estado` periódicamente.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._condiciones = {}
+
+    def _condicion(self, partida_id):
+        with self._lock:
+            cond = self._condiciones.get(partida_id)
+            if cond is None:
+                cond = self._condiciones[partida_id] = threading.Condition()
+            return cond
+
+    def notificar(self, partida_id):
+        """Despierta a todos los clientes que esperan cambios en la partida"""
+        # Sin nadie esperando no se crea condición: quien empiece a esperar
+        # comprueba antes el predicado
+        with self._lock:
+            cond = self._condiciones.get(partida_id)
+        if cond is not None:
+            with cond:
+                cond.notify_all()
+
+    def esperar(self, partida_id, predicado, timeout):
+        """Espera hasta que `predicado()` sea cierto o venza el timeout"""
+        cond = self._condicion(partida_id)
+        with cond:
+            return cond.wait_for(predicado, timeout)
+
+    def olvidar(self, partida_id):
+        """Despierta a los que esperan y libera la condición de la partida"""
+        with self._lock:
+            cond = self._condiciones.pop(partida_id, None)
+        if cond is not None:
+            with cond:
+                cond.notify_all()
+
+
+class NotificadorPartidasAsync:
+    """Equivalente de `NotificadorPartidas` para el servidor asíncrono.
+
+    Un `asyncio.Event` por partida que se sustituye en cada notificación:
+    miles de long-polls pueden esperar la misma partida sin ocupar un hilo
+    cada uno. Solo debe usarse desde el bucle de eventos.
+    """
+
+    def __init__(self):
+        self._eventos = {}
+
+    def notificar(self, partida_id):
+        """Despierta a todos los clientes que esperan cambios en la partida"""
+        evento = self._eventos.pop(partida_id, None)
+        if evento is not None:
+            evento.set()
+
+    async def esperar(self, partida_id, predicado, timeout):
+        """Espera hasta que `predicado()` sea cierto o venza el timeout"""
+        limite = asyncio.get_running_loop().time() + timeout
+        while not predicado():
+            restante = limite - asyncio.get_running_loop().time()
+            if restante <= 0:
+                return False
+            evento = self._eventos.get(partida_id)
+            if evento is None:
+                evento = self._eventos[partida_id] = asyncio.Event()
+            try:
+                await asyncio.wait_for(evento.wait(), restante)
+            except asyncio.TimeoutError:
+                return predicado()
+        return True
+
+    def olvidar(self, partida_id):
+        """Despierta a los que esperan y libera el evento de la partida"""
+        self.notificar(partida_id)
@@ -0,0 +1,226 @@
+import chess
+import json
+import struct
+import time
+from array import array
+
+import jugadas_compactas
+
+# Autor de cada jugada, guardado como índice de un byte
+JUGADORES = ('humano', 'motor')
+
+# Formato en disco: longitud de la cabecera JSON y número de jugadas, la
+# cabecera y los tres arrays (jugadas, autores, tiempos) tal cual
+_PREFIJO = struct.Struct('<II')
+
+
+class Partida:
+    """Registro compacto de una partida.
+
+    Las jugadas se guardan codificadas en 16 bits (`jugadas_compactas`) en
+    un `array`, junto con el autor (un byte) y el instante relativo a
+    `creado` (float de 4 bytes). La notación SAN se calcula al pedir el
+    historial y el `chess.Board` se reconstruye a partir de las jugadas la
+    primera vez que se usa; `compactar()` lo libera en partidas inactivas y
+    `a_bytes()`/`desde_bytes()` la guardan en disco en unos 7 bytes por jugada.
+    Al compactarla se guardan el resultado y la SAN de la última jugada, así
+    que listar partidas inactivas no reconstruye sus tableros.
+    También lleva el cliente que la creó y los segundos de motor consumidos
+    (ver `cuentas_motor`).
+    """
+
+    __slots__ = ('creado', 'jugador_color', 'dificultad', 'cliente', 'segundos_motor', 'busquedas_motor',
+                 'estado', '_jugadas', '_autores', '_tiempos', '_eventos', '_board', '_final')
+
+    def __init__(self, creado=None, jugador_color='white', dificultad='normal', cliente=None):
+        self.creado = creado if creado is not None else time.time()
+        self.jugador_color = jugador_color
+        self.dificultad = dificultad
+        self.cliente = cliente
+        self.segundos_motor = 0.0
+        self.busquedas_motor = 0
+        self.estado = None  # EstadoDerivado (ver estado_partida.estado_de)
+        self._jugadas = array(jugadas_compactas.TIPO_ARRAY)
+        self._autores = bytearray()
+        self._tiempos = array('f')
+        self._eventos = None  # [(jugadas previas, jugador, evento, timestamp)], casi siempre vacío
+        self._board = None
+        self._final = None  # (resultado PGN, SAN de la última jugada) al compactar
+
+    @property
+    def board(self):
+        """Tablero actual, reconstruido desde las jugadas si no está en memoria"""
+        if self._board is None:
+            board = chess.Board()
+            for codigo in self._jugadas:
+                board.push(jugadas_compactas.decodificar(codigo))
+            self._board = board
+        return self._board
+
+    @property
+    def final(self):
+        """(resultado PGN, SAN de la última jugada) guardados al compactar.
+
+        None si el tablero está en memoria: entonces manda el estado derivado.
+        """
+        return self._final if self._board is None else None
+
+    def _calcular_final(self):
+        if self._board is None:
+            return self._final
+        outcome = self._board.outcome()
+        notacion = None
+        if self._jugadas:
+            anterior = self._board.copy(stack=1)
+            move = anterior.pop()
+            notacion = anterior.san(move)
+        return (outcome.result() if outcome else '*', notacion)
+
+    @property
+    def num_jugadas(self):
+        return len(self._jugadas)
+
+    @property
+    def num_entradas(self):
+        """Jugadas más eventos del historial"""
+        return len(self._jugadas) + (len(self._eventos) if self._eventos else 0)
+
+    def jugar(self, move, jugador, timestamp=None):
+        """Añade una jugada ya validada por quien llama"""
+        if self._board is not None:
+            self._board.push(move)
+        self._final = None
+        self._jugadas.append(jugadas_compactas.codificar(move))
+        self._autores.append(JUGADORES.index(jugador))
+        self._tiempos.append((timestamp if timestamp is not None else time.time()) - self.creado)
+
+    def deshacer(self):
+        """Quita la última jugada"""
+        if self._board is not None:
+            self._board.pop()
+        self._final = None
+        self._jugadas.pop()
+        self._autores.pop()
+        self._tiempos.pop()
+
+    def registrar_evento(self, evento, jugador='sistema', timestamp=None):
+        """Entrada del historial sin jugada (p. ej. rendición)"""
+        if self._eventos is None:
+            self._eventos = []
+        self._eventos.append((len(self._jugadas), jugador, evento,
+                              timestamp if timestamp is not None else time.time()))
+
+    def compactar(self):
+        """Libera el tablero y el estado derivado; se reconstruyen al volver a usarse.
+
+        Devuelve True si había algo que liberar.
+        """
+        liberado = self._board is not None
+        self._final = self._calcular_final()
+        self._board = None
+        self.estado = None
+        return liberado
+
+    def _orden(self):
+        """Entradas del historial en orden: ('j', índice de jugada) o ('e', índice de evento)"""
+        orden = []
+        eventos = self._eventos or ()
+        e = 0
+        for i in range(len(self._jugadas) + 1):
+            while e < len(eventos) and eventos[e][0] == i:
+                orden.append(('e', e))
+                e += 1
+            if i < len(self._jugadas):
+                orden.append(('j', i))
+        return orden
+
+    def _notaciones(self, desde):
+        """SAN de las jugadas a partir de `desde`, deshaciendo sobre una copia del tablero"""
+        tablero = self.board.copy()
+        for _ in range(len(self._jugadas) - desde):
+            tablero.pop()
+        notaciones = []
+        for codigo in self._jugadas[desde:]:
+            move = jugadas_compactas.decodificar(codigo)
+            notaciones.append(tablero.san(move))
+            tablero.push(move)
+        return notaciones
+
+    def historial(self, ultimas=None):
+        """Entradas del historial como diccionarios (todas o solo las `ultimas`)"""
+        orden = self._orden()
+        if ultimas is not None:
+            orden = orden[-ultimas:] if ultimas > 0 else []
+        jugadas = [i for tipo, i in orden if tipo == 'j']
+        desde = jugadas[0] if jugadas else len(self._jugadas)
+        notaciones = self._notaciones(desde) if jugadas else []
+
+        entradas = []
+        for tipo, i in orden:
+            if tipo == 'j':
+                entradas.append(self._entrada_jugada(i, notaciones[i - desde]))
+            else:
+                _, jugador, evento, timestamp = self._eventos[i]
+                entradas.append({'jugador': jugador, 'evento': evento, 'timestamp': timestamp})
+        return entradas
+
+    def _entrada_jugada(self, i, notacion):
+        return {
+            'jugador': JUGADORES[self._autores[i]],
+            'movimiento': jugadas_compactas.uci(self._jugadas[i]),
+            'notacion': notacion,
+            'timestamp': self.creado + self._tiempos[i]
+        }
+
+    def ultima_entrada(self):
+        """Última entrada del historial o None"""
+        final = self.final
+        if final is not None and self._jugadas and (not self._eventos or self._eventos[-1][0] < len(self._jugadas)):
+            # Compactada y terminada en jugada: la SAN guardada evita reconstruir el tablero
+            return self._entrada_jugada(len(self._jugadas) - 1, final[1])
+        ultimas = self.historial(1)
+        return ultimas[0] if ultimas else None
+
+    def ultima_entrada_numerada(self):
+        """(índice, entrada) de la última entrada, para persistirla con el índice de ese momento"""
+        return self.num_entradas - 1, self.ultima_entrada()
+
+    def aplicar_entrada(self, entrada):
+        """Añade una entrada serializada con `historial()` (p. ej. leída de SQLite)"""
+        if 'movimiento' in entrada:
+            self.jugar(chess.Move.from_uci(entrada['movimiento']), entrada['jugador'], entrada.get('timestamp'))
+        else:
+            self.registrar_evento(entrada.get('evento'), entrada.get('jugador', 'sistema'), entrada.get('timestamp'))
+
+    def a_bytes(self):
+        """Serialización compacta para guardar la partida en disco"""
+        cabecera = json.dumps([self.creado, self.jugador_color, self.dificultad, self._eventos or [],
+                               self.cliente, self.segundos_motor, self.busquedas_motor,
+                               self._calcular_final()]).encode()
+        return b''.join((
+            _PREFIJO.pack(len(cabecera), len(self._jugadas)),
+            cabecera,
+            self._jugadas.tobytes(),
+            bytes(self._autores),
+            self._tiempos.tobytes(),
+        ))
+
+    @classmethod
+    def desde_bytes(cls, datos):
+        """Partida guardada con `a_bytes()` (sin tablero: se reconstruye al usarse)"""
+        largo, n = _PREFIJO.unpack_from(datos)
+        pos = _PREFIJO.size
+        (creado, jugador_color, dificultad, eventos,
+         cliente, segundos_motor, busquedas_motor, final) = json.loads(datos[pos:pos + largo])
+        pos += largo
+        partida = cls(creado, jugador_color, dificultad, cliente)
+        partida.segundos_motor = segundos_motor
+        partida.busquedas_motor = busquedas_motor
+        partida._final = tuple(final) if final else None
+        fin = pos + n * partida._jugadas.itemsize
+        partida._jugadas.frombytes(datos[pos:fin])
+        partida._autores.extend(datos[fin:fin + n])
+        pos = fin + n
+        partida._tiempos.frombytes(datos[pos:pos + n * partida._tiempos.itemsize])
+        partida._eventos = [tuple(evento) for evento in eventos] or None
+        return partida
@@ -0,0 +1,135 @@
+import math
+import threading
+import time
+import logging
+from collections import OrderedDict, deque
+
+
+class ColaLlenaError(Exception):
+    """La cola de trabajos del motor está llena; reintentar más tarde"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Cola del motor llena, reintentar en {retry_after} s")
+        self.retry_after = retry_after
+
+
+class PlanificadorMotor:
+    """Cola acotada de trabajos del motor con un conjunto fijo de workers.
+
+    Los trabajos se agrupan por partida y los workers las atienden por
+    turnos (round-robin), de modo que una partida no acapara el motor. Cada
+    partida tiene un número de generación: al reiniciarla o eliminarla se
+    incrementa y sus trabajos pendientes se descartan sin llegar al motor.
+    """
+
+    def __init__(self, ejecutar, num_workers=2, max_trabajos=200):
+        self.ejecutar = ejecutar
+        self.num_workers = num_workers
+        self.max_trabajos = max_trabajos
+
+        self._colas = OrderedDict()  # partida_id -> deque de (generacion, encolado, args)
+        self._generaciones = {}
+        self._pendientes = 0
+        self._cond = threading.Condition()
+        self._activo = False
+
+        # Métricas
+        self._ejecutados = 0
+        self._rechazados = 0
+        self._descartados = 0
+        self._duracion_total = 0.0
+        self._atendidos = 0
+        self._espera_total = 0.0
+        self._espera_max = 0.0
+
+    def iniciar(self):
+        """Arranca los workers"""
+        self._activo = True
+        for i in range(self.num_workers):
+            threading.Thread(target=self._worker, name=f"motor-worker-{i}", daemon=True).start()
+
+    def detener(self):
+        """Detiene los workers al terminar el trabajo en curso"""
+        with self._cond:
+            self._activo = False
+            self._cond.notify_all()
+
+    def _retry_after(self):
+        """Estimación en segundos de cuándo habrá hueco en la cola"""
+        media = self._duracion_total / self._ejecutados if self._ejecutados else 2.0
+        return max(1, math.ceil(self._pendientes * media / self.num_workers))
+
+    def encolar(self, partida_id, *args):
+        """Añade un trabajo para la partida o lanza ColaLlenaError"""
+        with self._cond:
+            if self._pendientes >= self.max_trabajos:
+                self._rechazados += 1
+                raise ColaLlenaError(self._retry_after())
+            generacion = self._generaciones.get(partida_id, 0)
+            self._colas.setdefault(partida_id, deque()).append((generacion, time.monotonic(), args))
+            self._pendientes += 1
+            self._cond.notify()
+
+    def invalidar(self, partida_id, eliminar=False):
+        """Descarta los trabajos pendientes de una partida reiniciada o eliminada"""
+        with self._cond:
+            cola = self._colas.pop(partida_id, None)
+            if cola:
+                self._pendientes -= len(cola)
+                self._descartados += len(cola)
+            if eliminar:
+                self._generaciones.pop(partida_id, None)
+            else:
+                self._generaciones[partida_id] = self._generaciones.get(partida_id, 0) + 1
+
+    def _siguiente(self):
+        """Toma el primer trabajo de la partida que más tiempo lleva esperando turno"""
+        partida_id, cola = self._colas.popitem(last=False)
+        generacion, encolado, args = cola.popleft()
+        if cola:
+            # La partida vuelve al final de la ronda
+            self._colas[partida_id] = cola
+        self._pendientes -= 1
+        espera = time.monotonic() - encolado
+        self._atendidos += 1
+        self._espera_total += espera
+        self._espera_max = max(self._espera_max, espera)
+        return partida_id, generacion, args
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while self._activo and not self._colas:
+                    self._cond.wait()
+                if not self._activo:
+                    return
+                partida_id, generacion, args = self._siguiente()
+                if generacion != self._generaciones.get(partida_id, 0):
+                    self._descartados += 1
+                    continue
+
+            inicio = time.monotonic()
+            try:
+                self.ejecutar(partida_id, *args)
+            except Exception as e:
+                logging.error(f"Error en trabajo del motor para {partida_id}: {e}")
+            finally:
+                with self._cond:
+                    self._ejecutados += 1
+                    self._duracion_total += time.monotonic() - inicio
+
+    def estadisticas(self):
+        """Profundidad de cola y contadores de trabajos"""
+        with self._cond:
+            return {
+                'workers': self.num_workers,
+                'pendientes': self._pendientes,
+                'max_trabajos': self.max_trabajos,
+                'partidas_en_cola': len(self._colas),
+                'ejecutados': self._ejecutados,
+                'rechazados': self._rechazados,
+                'descartados': self._descartados,
+                'duracion_media_ms': round(1000 * self._duracion_total / self._ejecutados, 2) if self._ejecutados else 0.0,
+                'espera_media_ms': round(1000 * self._espera_total / self._atendidos, 2) if self._atendidos else 0.0,
+                'espera_max_ms': round(1000 * self._espera_max, 2),
+            }
@@ -0,0 +1,186 @@
+import chess
+import chess.engine
+import functools
+import threading
+import time
+import logging
+from collections import OrderedDict
+
+
+class BusquedaPonder:
+    """Búsqueda en segundo plano de la posición tras la respuesta esperada del humano.
+
+    Ocupa un motor del pool mientras dura; un hilo propio espera a que la
+    búsqueda termine (por `detener()` o por llegar a `tiempo_max`), pasa su
+    duración a `al_terminar` y devuelve el motor al pool, o lo reemplaza si
+    el proceso ha caído.
+    """
+
+    def __init__(self, pool, motor, board, jugada_esperada, tiempo_max, al_terminar=None):
+        self.pool = pool
+        self.al_terminar = al_terminar
+        self.jugada_esperada = jugada_esperada
+        self.fen = board.fen()
+        self.inicio = time.monotonic()
+        self._mejor = None
+        self._terminada = threading.Event()
+        self._analisis = motor.analysis(board, chess.engine.Limit(time=tiempo_max))
+        threading.Thread(target=self._esperar, args=(motor,), name="ponder", daemon=True).start()
+
+    def _esperar(self, motor):
+        try:
+            mejor = self._analisis.wait()
+            if mejor.move is not None:
+                self._mejor = chess.engine.PlayResult(mejor.move, mejor.ponder)
+        except chess.engine.EngineTerminatedError:
+            self.pool.reemplazar(motor)
+            return
+        except Exception as e:
+            logging.warning(f"Error en búsqueda de ponder: {e}")
+        finally:
+            if self.al_terminar is not None:
+                try:
+                    self.al_terminar(time.monotonic() - self.inicio)
+                except Exception as e:
+                    logging.warning(f"Error al cargar la búsqueda de ponder: {e}")
+            self._terminada.set()
+        self.pool.devolver(motor)
+
+    def detener(self, timeout=5):
+        """Para la búsqueda y espera a que el motor vuelva al pool"""
+        try:
+            self._analisis.stop()
+        except Exception:
+            pass
+        self._terminada.wait(timeout)
+
+    def resultado(self, tiempo, timeout=5):
+        """`PlayResult` tras buscar al menos `tiempo` segundos desde el inicio del ponder (o None)"""
+        restante = tiempo - (time.monotonic() - self.inicio)
+        if restante > 0:
+            self._terminada.wait(restante)
+        self.detener(timeout)
+        return self._mejor
+
+
+class GestorPonder:
+    """Ponder por partida con los motores que quedan libres del pool.
+
+    Tras cada jugada del motor se busca en segundo plano la respuesta
+    esperada del humano. Si el humano la juega (ponderhit) la búsqueda ya
+    lleva ventaja y la jugada sale casi sin espera; si no, se descarta. Las
+    búsquedas de ponder ceden su motor en cuanto otra partida lo necesita.
+    Al terminar, su duración se pasa a `cargar(partida_id, partida, segundos)`
+    para cargarla a las cuentas de motor de la partida y su cliente.
+    """
+
+    def __init__(self, pool, tiempo_max=60, cargar=None):
+        self.pool = pool
+        self.tiempo_max = tiempo_max
+        self.cargar = cargar
+        self._lock = threading.Lock()
+        self._activas = OrderedDict()  # partida_id -> BusquedaPonder (más antigua primero)
+        self._acertadas = {}  # partida_id -> BusquedaPonder pendiente de usar por el motor
+
+        # Métricas
+        self.iniciadas = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.cedidas = 0
+
+    def iniciar(self, partida_id, board, jugada_esperada, partida=None):
+        """Empieza a buscar `board` + `jugada_esperada` si hay un motor libre"""
+        if jugada_esperada is None or not board.is_legal(jugada_esperada):
+            return False
+        siguiente = board.copy()
+        siguiente.push(jugada_esperada)
+        if siguiente.is_game_over():
+            return False
+
+        motor = self.pool.intentar_obtener(plazo=self.tiempo_max + 10)
+        if motor is None:
+            return False
+        al_terminar = None
+        if self.cargar is not None and partida is not None:
+            al_terminar = functools.partial(self.cargar, partida_id, partida)
+        try:
+            busqueda = BusquedaPonder(self.pool, motor, siguiente, jugada_esperada, self.tiempo_max, al_terminar)
+        except chess.engine.EngineTerminatedError:
+            self.pool.reemplazar(motor)
+            return False
+        except Exception as e:
+            logging.warning(f"No se pudo iniciar el ponder de {partida_id}: {e}")
+            self.pool.devolver(motor)
+            return False
+
+        with self._lock:
+            anterior = self._activas.pop(partida_id, None)
+            self._activas[partida_id] = busqueda
+            self.iniciadas += 1
+        if anterior is not None:
+            anterior.detener()
+        return True
+
+    def resolver(self, partida_id, move):
+        """Jugada del humano: conserva la búsqueda si acertó (ponderhit) o la para"""
+        with self._lock:
+            busqueda = self._activas.pop(partida_id, None)
+            if busqueda is None:
+                return False
+            acierto = busqueda.jugada_esperada == move
+            if acierto:
+                self.aciertos += 1
+                self._acertadas[partida_id] = busqueda
+            else:
+                self.fallos += 1
+        if not acierto:
+            busqueda.detener()
+        return acierto
+
+    def tomar(self, partida_id, board):
+        """Búsqueda acertada de la partida si sigue siendo la posición actual"""
+        with self._lock:
+            busqueda = self._acertadas.pop(partida_id, None)
+        if busqueda is not None and busqueda.fen != board.fen():
+            busqueda.detener()
+            return None
+        return busqueda
+
+    def ceder(self):
+        """Para la búsqueda de ponder más antigua para liberar su motor"""
+        with self._lock:
+            if not self._activas:
+                return False
+            _, busqueda = self._activas.popitem(last=False)
+            self.cedidas += 1
+        busqueda.detener()
+        return True
+
+    def cancelar(self, partida_id):
+        """Descarta el ponder de una partida reiniciada o eliminada"""
+        with self._lock:
+            busquedas = [b for b in (self._activas.pop(partida_id, None),
+                                     self._acertadas.pop(partida_id, None)) if b is not None]
+        for busqueda in busquedas:
+            busqueda.detener()
+
+    def cerrar(self):
+        with self._lock:
+            busquedas = list(self._activas.values()) + list(self._acertadas.values())
+            self._activas.clear()
+            self._acertadas.clear()
+        for busqueda in busquedas:
+            busqueda.detener(timeout=1)
+
+    def estadisticas(self):
+        """Búsquedas activas, aciertos (ponderhit) y motores cedidos"""
+        with self._lock:
+            resueltas = self.aciertos + self.fallos
+            return {
+                'activas': len(self._activas),
+                'iniciadas': self.iniciadas,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'cedidas': self.cedidas,
+                'tasa_aciertos': round(self.aciertos / resueltas, 4) if resueltas else 0.0,
+            }
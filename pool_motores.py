@@ -0,0 +1,277 @@
+import chess
+import chess.engine
+import os
+import queue
+import threading
+import time
+import logging
+from contextlib import contextmanager
+
+
+class PoolAgotadoError(Exception):
+    """No hay ningún motor libre dentro del tiempo de espera indicado"""
+
+
+def calcular_recursos(num_motores, hash_total_mb, nucleos=None):
+    """Reparte los núcleos y la memoria de hash entre los procesos del pool"""
+    nucleos = nucleos or os.cpu_count() or 1
+    return {
+        "Hash": max(16, hash_total_mb // num_motores),
+        "Threads": max(1, nucleos // num_motores),
+    }
+
+
+class PoolMotores:
+    """Pool de N procesos UCI (Cfish/Stockfish) con checkout/checkin.
+
+    Cada partida toma un motor libre solo durante su búsqueda, de modo que
+    el número de búsquedas simultáneas escala con los procesos del pool en
+    lugar de quedar serializado detrás de un único lock global.
+
+    Además del pool se pueden mantener `reserva` procesos ya arrancados y
+    configurados (NNUE cargada, hash reservado) que sustituyen al instante a
+    un motor caído o amplían el pool hasta `max_motores`. Cada checkout
+    tiene un plazo (`plazo_busqueda` segundos) tras el que el supervisor
+    considera colgada la búsqueda.
+    """
+
+    def __init__(self, ruta, num_motores=None, hash_total_mb=512, opciones=None,
+                 reserva=0, max_motores=None, plazo_busqueda=None):
+        self.ruta = ruta
+        nucleos = os.cpu_count() or 1
+        self.num_motores = num_motores or max(1, nucleos // 2)
+        self.opciones = calcular_recursos(self.num_motores, hash_total_mb, nucleos)
+        self.opciones.update(opciones or {})
+        self.reserva = reserva
+        self.max_motores = max(max_motores or self.num_motores, self.num_motores)
+        self.plazo_busqueda = plazo_busqueda
+
+        self._libres = queue.Queue()
+        self._motores = []
+        self._reserva = []  # procesos calientes fuera del pool
+        self._ocupados = {}  # motor -> instante (monotonic) en que vence su checkout
+        self._lock = threading.Lock()
+
+        # Métricas de cola y espera
+        self._en_espera = 0
+        self._esperas = 0
+        self._espera_total = 0.0
+        self._espera_max = 0.0
+        self._busquedas = 0
+        self._reinicios = 0
+
+    def _lanzar_motor(self):
+        """Arranca un proceso UCI desde el directorio del motor (necesario para el NNUE)"""
+        motor = chess.engine.SimpleEngine.popen_uci(
+            [os.path.abspath(self.ruta)], cwd=os.path.dirname(os.path.abspath(self.ruta))
+        )
+        motor.configure({k: v for k, v in self.opciones.items() if k in motor.options})
+        # isready: el motor carga la red NNUE y reserva el hash antes de usarse
+        motor.ping()
+        return motor
+
+    def iniciar(self):
+        """Arranca los procesos del pool; devuelve cuántos se iniciaron"""
+        if not os.path.exists(self.ruta):
+            logging.error(f"Archivo del motor no encontrado: {self.ruta}")
+            return 0
+
+        for _ in range(self.num_motores):
+            try:
+                motor = self._lanzar_motor()
+            except Exception as e:
+                logging.error(f"Error iniciando motor del pool: {e}")
+                continue
+            self._motores.append(motor)
+            self._libres.put(motor)
+
+        while self._motores and self.reponer_reserva():
+            pass
+
+        logging.info(f"Pool de motores iniciado: {len(self._motores)}/{self.num_motores} "
+                     f"procesos (+{len(self._reserva)} en reserva) con {self.opciones}")
+        return len(self._motores)
+
+    def disponible(self):
+        """Indica si el pool tiene al menos un motor"""
+        return len(self._motores) > 0
+
+    def _marcar(self, motor, plazo):
+        plazo = plazo if plazo is not None else self.plazo_busqueda
+        with self._lock:
+            self._ocupados[motor] = time.monotonic() + plazo if plazo is not None else None
+
+    def obtener(self, timeout=None, plazo=None):
+        """Toma un motor libre (checkout), esperando como máximo `timeout` segundos.
+
+        `plazo` (por defecto `plazo_busqueda`) es el tiempo tras el que la
+        búsqueda se considera colgada.
+        """
+        inicio = time.monotonic()
+        with self._lock:
+            self._en_espera += 1
+        try:
+            motor = self._libres.get(timeout=timeout)
+        except queue.Empty:
+            raise PoolAgotadoError(f"Ningún motor libre tras {timeout} s")
+        finally:
+            espera = time.monotonic() - inicio
+            with self._lock:
+                self._en_espera -= 1
+                self._esperas += 1
+                self._espera_total += espera
+                self._espera_max = max(self._espera_max, espera)
+        self._marcar(motor, plazo)
+        return motor
+
+    def intentar_obtener(self, plazo=None):
+        """Toma un motor solo si hay uno libre ahora mismo (trabajo en segundo plano); si no, None"""
+        try:
+            motor = self._libres.get_nowait()
+        except queue.Empty:
+            return None
+        self._marcar(motor, plazo)
+        return motor
+
+    def devolver(self, motor):
+        """Devuelve un motor al pool (checkin)"""
+        with self._lock:
+            self._ocupados.pop(motor, None)
+            if motor not in self._motores:
+                # Reemplazado mientras estaba fuera (p. ej. por el watchdog)
+                return
+        self._libres.put(motor)
+
+    def vencidos(self):
+        """Motores cuyo checkout ha superado su plazo (búsquedas colgadas)"""
+        ahora = time.monotonic()
+        with self._lock:
+            return [motor for motor, vence in self._ocupados.items() if vence is not None and ahora > vence]
+
+    def matar(self, motor):
+        """Mata el proceso de una búsqueda colgada.
+
+        Quien tiene el motor recibe `EngineTerminatedError` y, como con
+        cualquier motor caído, el pool lo reemplaza.
+        """
+        with self._lock:
+            self._ocupados.pop(motor, None)
+        try:
+            motor.protocol.loop.call_soon_threadsafe(motor.transport.kill)
+        except Exception as e:
+            logging.warning(f"No se pudo matar el motor colgado: {e}")
+
+    def reponer_reserva(self):
+        """Arranca un proceso de reserva si faltan; devuelve True si arrancó uno"""
+        with self._lock:
+            if len(self._reserva) >= self.reserva:
+                return False
+        try:
+            motor = self._lanzar_motor()
+        except Exception as e:
+            logging.error(f"Error arrancando motor de reserva: {e}")
+            return False
+        with self._lock:
+            self._reserva.append(motor)
+        return True
+
+    def ampliar(self):
+        """Pasa un proceso de reserva al pool si no se ha llegado a `max_motores`"""
+        with self._lock:
+            if len(self._motores) >= self.max_motores or not self._reserva:
+                return False
+            motor = self._reserva.pop()
+            self._motores.append(motor)
+        self._libres.put(motor)
+        logging.info(f"Pool de motores ampliado a {len(self._motores)} procesos")
+        return True
+
+    def reemplazar(self, motor):
+        """Sustituye un proceso caído o colgado, con uno de reserva si lo hay"""
+        with self._lock:
+            self._ocupados.pop(motor, None)
+            if motor not in self._motores:
+                # Ya reemplazado (watchdog y búsqueda fallida a la vez)
+                return
+            self._motores.remove(motor)
+            self._reinicios += 1
+            nuevo = self._reserva.pop() if self._reserva else None
+        try:
+            motor.close()
+        except Exception:
+            pass
+        if nuevo is None:
+            # Sin reserva: arranque en frío en el camino de la petición
+            try:
+                nuevo = self._lanzar_motor()
+            except Exception as e:
+                logging.error(f"No se pudo reemplazar el motor caído: {e}")
+                return
+        with self._lock:
+            self._motores.append(nuevo)
+        self._libres.put(nuevo)
+
+    @contextmanager
+    def usar(self, timeout=None):
+        """Context manager: obtiene un motor, lo cede al bloque y lo devuelve"""
+        motor = self.obtener(timeout)
+        try:
+            yield motor
+        except chess.engine.EngineTerminatedError:
+            self.reemplazar(motor)
+            raise
+        except BaseException:
+            # Búsqueda interrumpida (p. ej. un stream cerrado por el cliente):
+            # el motor sigue vivo y vuelve al pool
+            self.devolver(motor)
+            raise
+        else:
+            self.devolver(motor)
+        finally:
+            with self._lock:
+                self._busquedas += 1
+
+    def ping(self):
+        """Comprueba un motor libre sin bloquear a las búsquedas en curso.
+
+        Devuelve None si todos los motores están ocupados.
+        """
+        try:
+            motor = self._libres.get_nowait()
+        except queue.Empty:
+            return None
+        try:
+            motor.ping()
+            self.devolver(motor)
+            return True
+        except Exception:
+            self.reemplazar(motor)
+            return False
+
+    def estadisticas(self):
+        """Métricas de ocupación, profundidad de cola y tiempos de espera"""
+        with self._lock:
+            return {
+                'motores': len(self._motores),
+                'libres': self._libres.qsize(),
+                'en_uso': len(self._motores) - self._libres.qsize(),
+                'en_espera': self._en_espera,
+                'busquedas': self._busquedas,
+                'reinicios': self._reinicios,
+                'reserva': len(self._reserva),
+                'max_motores': self.max_motores,
+                'espera_media_ms': round(1000 * self._espera_total / self._esperas, 2) if self._esperas else 0.0,
+                'espera_max_ms': round(1000 * self._espera_max, 2),
+                'opciones': dict(self.opciones),
+            }
+
+    def cerrar(self):
+        """Cierra todos los procesos del pool"""
+        with self._lock:
+            motores, self._motores = self._motores + self._reserva, []
+            self._reserva = []
+        for motor in motores:
+            try:
+                motor.quit()
+            except Exception as e:
+                logging.warning(f"Error cerrando motor del pool: {e}")
@@ -0,0 +1,256 @@
+import chess
+import chess.engine
+import asyncio
+import os
+import time
+import logging
+from contextlib import asynccontextmanager
+
+from pool_motores import PoolAgotadoError, calcular_recursos
+
+
+class PoolMotoresAsync:
+    """Pool de procesos UCI con el protocolo asíncrono de python-chess.
+
+    Misma interfaz que `PoolMotores` pero con corrutinas: las búsquedas se
+    esperan con `await` en el bucle de eventos, sin un hilo bloqueado por
+    petición ni el hilo de bucle propio de cada `SimpleEngine`. Como aquel,
+    mantiene `reserva` procesos calientes y un plazo por checkout para el
+    supervisor (`SupervisorMotoresAsync`).
+    """
+
+    def __init__(self, ruta, num_motores=None, hash_total_mb=512, opciones=None,
+                 reserva=0, max_motores=None, plazo_busqueda=None):
+        self.ruta = ruta
+        nucleos = os.cpu_count() or 1
+        self.num_motores = num_motores or max(1, nucleos // 2)
+        self.opciones = calcular_recursos(self.num_motores, hash_total_mb, nucleos)
+        self.opciones.update(opciones or {})
+        self.reserva = reserva
+        self.max_motores = max(max_motores or self.num_motores, self.num_motores)
+        self.plazo_busqueda = plazo_busqueda
+
+        self._libres = None  # asyncio.Queue, se crea dentro del bucle en iniciar()
+        self._motores = {}  # protocolo -> transporte
+        self._reserva = {}  # procesos calientes fuera del pool, protocolo -> transporte
+        self._ocupados = {}  # motor -> instante (monotonic) en que vence su checkout
+
+        # Métricas de cola y espera
+        self._en_espera = 0
+        self._esperas = 0
+        self._espera_total = 0.0
+        self._espera_max = 0.0
+        self._busquedas = 0
+        self._reinicios = 0
+
+    async def _lanzar_motor(self):
+        """Arranca un proceso UCI desde el directorio del motor (necesario para el NNUE)"""
+        transporte, motor = await chess.engine.popen_uci(
+            [os.path.abspath(self.ruta)], cwd=os.path.dirname(os.path.abspath(self.ruta))
+        )
+        try:
+            await motor.configure({k: v for k, v in self.opciones.items() if k in motor.options})
+            # isready: el motor carga la red NNUE y reserva el hash antes de usarse
+            await motor.ping()
+        except BaseException:
+            transporte.close()
+            raise
+        return motor, transporte
+
+    async def iniciar(self):
+        """Arranca los procesos del pool; devuelve cuántos se iniciaron"""
+        self._libres = asyncio.Queue()
+        if not os.path.exists(self.ruta):
+            logging.error(f"Archivo del motor no encontrado: {self.ruta}")
+            return 0
+
+        resultados = await asyncio.gather(
+            *(self._lanzar_motor() for _ in range(self.num_motores)), return_exceptions=True
+        )
+        for resultado in resultados:
+            if isinstance(resultado, BaseException):
+                logging.error(f"Error iniciando motor del pool: {resultado}")
+                continue
+            motor, transporte = resultado
+            self._motores[motor] = transporte
+            self._libres.put_nowait(motor)
+
+        while self._motores and await self.reponer_reserva():
+            pass
+
+        logging.info(f"Pool de motores asíncrono iniciado: {len(self._motores)}/{self.num_motores} "
+                     f"procesos (+{len(self._reserva)} en reserva) con {self.opciones}")
+        return len(self._motores)
+
+    def disponible(self):
+        """Indica si el pool tiene al menos un motor"""
+        return len(self._motores) > 0
+
+    def _marcar(self, motor, plazo):
+        plazo = plazo if plazo is not None else self.plazo_busqueda
+        self._ocupados[motor] = time.monotonic() + plazo if plazo is not None else None
+
+    async def obtener(self, timeout=None, plazo=None):
+        """Toma un motor libre (checkout), esperando como máximo `timeout` segundos.
+
+        `plazo` (por defecto `plazo_busqueda`) es el tiempo tras el que la
+        búsqueda se considera colgada.
+        """
+        inicio = time.monotonic()
+        self._en_espera += 1
+        try:
+            motor = await asyncio.wait_for(self._libres.get(), timeout)
+        except asyncio.TimeoutError:
+            raise PoolAgotadoError(f"Ningún motor libre tras {timeout} s")
+        finally:
+            espera = time.monotonic() - inicio
+            self._en_espera -= 1
+            self._esperas += 1
+            self._espera_total += espera
+            self._espera_max = max(self._espera_max, espera)
+        self._marcar(motor, plazo)
+        return motor
+
+    def intentar_obtener(self, plazo=None):
+        """Toma un motor solo si hay uno libre ahora mismo (trabajo en segundo plano); si no, None"""
+        try:
+            motor = self._libres.get_nowait()
+        except asyncio.QueueEmpty:
+            return None
+        self._marcar(motor, plazo)
+        return motor
+
+    def devolver(self, motor):
+        """Devuelve un motor al pool (checkin)"""
+        self._ocupados.pop(motor, None)
+        if motor not in self._motores:
+            # Reemplazado mientras estaba fuera (p. ej. por el watchdog)
+            return
+        self._libres.put_nowait(motor)
+
+    def vencidos(self):
+        """Motores cuyo checkout ha superado su plazo (búsquedas colgadas)"""
+        ahora = time.monotonic()
+        return [motor for motor, vence in self._ocupados.items() if vence is not None and ahora > vence]
+
+    def matar(self, motor):
+        """Mata el proceso de una búsqueda colgada.
+
+        Quien tiene el motor recibe `EngineTerminatedError` y, como con
+        cualquier motor caído, el pool lo reemplaza.
+        """
+        self._ocupados.pop(motor, None)
+        transporte = self._motores.get(motor)
+        if transporte is None:
+            return
+        try:
+            transporte.kill()
+        except Exception as e:
+            logging.warning(f"No se pudo matar el motor colgado: {e}")
+
+    async def reponer_reserva(self):
+        """Arranca un proceso de reserva si faltan; devuelve True si arrancó uno"""
+        if len(self._reserva) >= self.reserva:
+            return False
+        try:
+            motor, transporte = await self._lanzar_motor()
+        except Exception as e:
+            logging.error(f"Error arrancando motor de reserva: {e}")
+            return False
+        self._reserva[motor] = transporte
+        return True
+
+    def ampliar(self):
+        """Pasa un proceso de reserva al pool si no se ha llegado a `max_motores`"""
+        if len(self._motores) >= self.max_motores or not self._reserva:
+            return False
+        motor, transporte = self._reserva.popitem()
+        self._motores[motor] = transporte
+        self._libres.put_nowait(motor)
+        logging.info(f"Pool de motores ampliado a {len(self._motores)} procesos")
+        return True
+
+    async def reemplazar(self, motor):
+        """Sustituye un proceso caído o colgado, con uno de reserva si lo hay"""
+        self._ocupados.pop(motor, None)
+        transporte = self._motores.pop(motor, None)
+        if transporte is None:
+            # Ya reemplazado (watchdog y búsqueda fallida a la vez)
+            return
+        transporte.close()
+        self._reinicios += 1
+        if self._reserva:
+            nuevo, transporte = self._reserva.popitem()
+        else:
+            # Sin reserva: arranque en frío en el camino de la petición
+            try:
+                nuevo, transporte = await self._lanzar_motor()
+            except Exception as e:
+                logging.error(f"No se pudo reemplazar el motor caído: {e}")
+                return
+        self._motores[nuevo] = transporte
+        self._libres.put_nowait(nuevo)
+
+    @asynccontextmanager
+    async def usar(self, timeout=None):
+        """Context manager asíncrono: obtiene un motor, lo cede al bloque y lo devuelve"""
+        motor = await self.obtener(timeout)
+        try:
+            yield motor
+        except chess.engine.EngineTerminatedError:
+            await self.reemplazar(motor)
+            raise
+        except BaseException:
+            # Búsqueda cancelada (cliente desconectado, apagado): el motor
+            # sigue vivo y vuelve al pool
+            self.devolver(motor)
+            raise
+        else:
+            self.devolver(motor)
+        finally:
+            self._busquedas += 1
+
+    async def ping(self, timeout=5):
+        """Comprueba un motor libre sin esperar a las búsquedas en curso.
+
+        Devuelve None si todos los motores están ocupados.
+        """
+        try:
+            motor = self._libres.get_nowait()
+        except asyncio.QueueEmpty:
+            return None
+        try:
+            await asyncio.wait_for(motor.ping(), timeout)
+            self.devolver(motor)
+            return True
+        except Exception:
+            await self.reemplazar(motor)
+            return False
+
+    def estadisticas(self):
+        """Métricas de ocupación, profundidad de cola y tiempos de espera"""
+        libres = self._libres.qsize() if self._libres is not None else 0
+        return {
+            'motores': len(self._motores),
+            'libres': libres,
+            'en_uso': len(self._motores) - libres,
+            'en_espera': self._en_espera,
+            'busquedas': self._busquedas,
+            'reinicios': self._reinicios,
+            'reserva': len(self._reserva),
+            'max_motores': self.max_motores,
+            'espera_media_ms': round(1000 * self._espera_total / self._esperas, 2) if self._esperas else 0.0,
+            'espera_max_ms': round(1000 * self._espera_max, 2),
+            'opciones': dict(self.opciones),
+        }
+
+    async def cerrar(self):
+        """Cierra todos los procesos del pool"""
+        motores = {**self._motores, **self._reserva}
+        self._motores, self._reserva = {}, {}
+        for motor, transporte in motores.items():
+            try:
+                await asyncio.wait_for(motor.quit(), 5)
+            except Exception as e:
+                logging.warning(f"Error cerrando motor del pool: {e}")
+                transporte.close()
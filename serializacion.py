@@ -0,0 +1,161 @@
+import functools
+import gzip
+import json
+import time
+
+from flask import has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+
+# Codificadores opcionales: orjson (JSON rápido), msgpack y brotli. Sin ellos
+# se responde con el módulo json y se comprime con gzip
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+TIPO_JSON = 'application/json'
+TIPO_MSGPACK = 'application/msgpack'
+TIPOS_MSGPACK = ('application/msgpack', 'application/x-msgpack', 'application/vnd.msgpack')
+
+# Niveles pensados para respuestas dinámicas: casi toda la reducción de
+# tamaño por una fracción del tiempo de los niveles máximos
+NIVEL_GZIP = 5
+CALIDAD_BROTLI = 5
+UMBRAL_COMPRESION = 1024  # bytes; por debajo la cabecera y el tiempo no compensan
+
+
+def a_json(datos, default=None):
+    """Codifica `datos` como JSON UTF-8 compacto (bytes), con orjson si está instalado"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(datos, default=default, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass  # enteros de más de 64 bits u otros tipos que orjson no admite
+    return json.dumps(datos, ensure_ascii=False, separators=(',', ':'), default=default).encode()
+
+
+def a_msgpack(datos, default=None):
+    return msgpack.packb(datos, use_bin_type=True, default=default)
+
+
+def _preferencias(cabecera):
+    """{valor: q} de una cabecera Accept o Accept-Encoding"""
+    preferencias = {}
+    for parte in (cabecera or '').split(','):
+        valor, _, parametros = parte.partition(';')
+        valor = valor.strip().lower()
+        if not valor:
+            continue
+        q = 1.0
+        for parametro in parametros.split(';'):
+            nombre, _, numero = parametro.partition('=')
+            if nombre.strip() == 'q':
+                try:
+                    q = float(numero)
+                except ValueError:
+                    q = 0.0
+        preferencias[valor] = q
+    return preferencias
+
+
+@functools.lru_cache(maxsize=256)
+def negociar(accept, accept_encoding):
+    """Formato ('json' o 'msgpack') y compresión ('br', 'gzip' o None) para una petición.
+
+    MessagePack solo se usa si el cliente lo pide explícitamente con al
+    menos la misma preferencia que JSON; un `*/*` de navegador sigue
+    recibiendo JSON. Los clientes repiten siempre las mismas cabeceras, así
+    que el resultado se guarda por par de cabeceras.
+    """
+    formato = 'json'
+    if msgpack is not None and accept:
+        tipos = _preferencias(accept)
+        q_msgpack = max(tipos.get(tipo, 0.0) for tipo in TIPOS_MSGPACK)
+        q_json = tipos.get(TIPO_JSON, tipos.get('application/*', tipos.get('*/*', 0.0)))
+        if q_msgpack > 0 and q_msgpack >= q_json:
+            formato = 'msgpack'
+
+    compresion = None
+    if accept_encoding:
+        codificaciones = _preferencias(accept_encoding)
+        q_gzip = codificaciones.get('gzip', codificaciones.get('*', 0.0))
+        q_br = codificaciones.get('br', 0.0) if brotli is not None else 0.0
+        if q_br > 0 and q_br >= q_gzip:
+            compresion = 'br'
+        elif q_gzip > 0:
+            compresion = 'gzip'
+    return formato, compresion
+
+
+def comprimir(cuerpo, compresion):
+    if compresion == 'br':
+        return brotli.compress(cuerpo, quality=CALIDAD_BROTLI)
+    return gzip.compress(cuerpo, compresslevel=NIVEL_GZIP, mtime=0)
+
+
+def codificar(datos, accept=None, accept_encoding=None, umbral=UMBRAL_COMPRESION, default=None):
+    """Cuerpo de la respuesta en el formato negociado.
+
+    Devuelve (cuerpo, content_type, content_encoding, formato); la
+    compresión solo se aplica a cuerpos de al menos `umbral` bytes (0 = nunca).
+    """
+    formato, compresion = negociar(accept, accept_encoding)
+    if formato == 'msgpack':
+        cuerpo, tipo = a_msgpack(datos, default), TIPO_MSGPACK
+    else:
+        cuerpo, tipo = a_json(datos, default), TIPO_JSON
+    if compresion is None or not umbral or len(cuerpo) < umbral:
+        return cuerpo, tipo, None, formato
+    return comprimir(cuerpo, compresion), tipo, compresion, formato
+
+
+class ProveedorJSON(DefaultJSONProvider):
+    """Proveedor JSON de Flask con formato y compresión negociados.
+
+    `jsonify` (y los errores que lo usan) responde en JSON con orjson o en
+    MessagePack según la cabecera `Accept`, y comprime con brotli o gzip
+    según `Accept-Encoding` a partir de `umbral` bytes. Con un histograma y
+    un contador se miden el tiempo de codificación y los bytes enviados por
+    formato y compresión.
+    """
+
+    def __init__(self, app, umbral=UMBRAL_COMPRESION, histograma=None, contador_bytes=None):
+        super().__init__(app)
+        self.umbral = umbral
+        self.histograma = histograma
+        self.contador_bytes = contador_bytes
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return a_json(obj, self.default).decode()
+
+    def response(self, *args, **kwargs):
+        datos = self._prepare_response_obj(args, kwargs)
+        if has_request_context():
+            accept, accept_encoding = request.headers.get('Accept'), request.headers.get('Accept-Encoding')
+        else:
+            accept = accept_encoding = None
+
+        inicio = time.perf_counter()
+        cuerpo, tipo, compresion, formato = codificar(datos, accept, accept_encoding, self.umbral, self.default)
+        if self.histograma is not None:
+            self.histograma.observar(time.perf_counter() - inicio, formato=formato, compresion=compresion or 'ninguna')
+        if self.contador_bytes is not None:
+            self.contador_bytes.inc(len(cuerpo), formato=formato, compresion=compresion or 'ninguna')
+
+        respuesta = self._app.response_class(cuerpo, mimetype=tipo)
+        if compresion:
+            respuesta.headers['Content-Encoding'] = compresion
+        respuesta.vary.update(('Accept', 'Accept-Encoding'))
+        return respuesta
@@ -1,7 +1,8 @@
 import chess
 import chess.engine
 import os
-from flask import Flask, request, jsonify
+import json
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
 import threading
 import time
@@ -9,63 +10,170 @@ import uuid
 from flask import send_file, send_from_directory
 import atexit
 import signal
+from pool_motores import PoolMotores, PoolAgotadoError
+from motor_daemon import ClienteMotorRemoto
+from supervisor_motores import SupervisorMotores
+from cache_jugadas import CacheJugadas
+from libro_aperturas import LibroAperturas
+from tablas_finales import TablasFinales
+from planificador import PlanificadorMotor, ColaLlenaError
+from cuentas_motor import CuentasMotor, CuotaAgotadaError
+from analisis import (ParametrosInvalidosError, LineasAnalisis, RegistroAnalisis, limite_acotado,
+                      limite_desde_parametros, multipv_desde_parametros)
+from notificaciones import NotificadorPartidas
+from tablero_json import tablero_a_json_compacto
+from estado_partida import estado_de, evento_partida, resultado_de
+from almacen_partidas import crear_almacen
+from partida import Partida
+from gestion_tiempo import jugada_unica, limite_jugada, tiempo_jugada, dificultad_valida
+from ponder import GestorPonder
+from serializacion import ProveedorJSON
+import metricas
 
 app = Flask(__name__)
 CORS(app)  # Permitir requests desde web/Android
 
+# Métricas Prometheus (expuestas en /metrics)
+registro = metricas.Registro()
+m_peticiones = registro.histograma('chess_peticion_segundos', 'Latencia por ruta', etiquetas=('ruta', 'metodo', 'codigo'))
+m_busqueda = registro.histograma('chess_motor_busqueda_segundos', 'Duración de las búsquedas del motor')
+m_espera_motor = registro.histograma('chess_motor_espera_segundos', 'Espera hasta obtener un motor libre')
+m_tablero = registro.histograma('chess_tablero_json_segundos', 'Serialización del tablero', etiquetas=('formato',))
+m_partidas = registro.contador('chess_partidas_creadas_total', 'Partidas creadas')
+m_jugadas = registro.contador('chess_jugadas_total', 'Jugadas realizadas', etiquetas=('jugador', 'origen'))
+m_analisis = registro.contador('chess_analisis_total', 'Análisis en streaming terminados', etiquetas=('fin',))
+m_codificacion = registro.histograma('chess_respuesta_codificacion_segundos', 'Codificación de las respuestas de la API',
+                                     buckets=metricas.BUCKETS_CODIFICACION, etiquetas=('formato', 'compresion'))
+m_bytes = registro.contador('chess_respuesta_bytes_total', 'Bytes enviados en las respuestas de la API', etiquetas=('formato', 'compresion'))
+metricas.instrumentar_rutas(app, m_peticiones)
+
 # Configuración del motor (usando tu misma configuración)
 CFISH_PATH = os.environ.get("STOCKFISH_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "engines/Cfish_Linux", "Cfish 060821 x64 general"))
 
-# Configuración de límites
-MAX_PARTIDAS = 100
+# Configuración de límites. Las partidas sin uso durante PARTIDAS_INACTIVIDAD
+# segundos se desalojan de memoria (se compactan o, con el almacén
+# 'niveles', pasan a disco) y se recargan en el siguiente acceso
+MAX_PARTIDAS = int(os.environ.get("MAX_PARTIDAS", "50000"))
 MAX_TIEMPO_PARTIDA = 24 * 60 * 60  # 24 horas
+INACTIVIDAD_PARTIDA = float(os.environ.get("PARTIDAS_INACTIVIDAD", "600"))
+INTERVALO_LIMPIEZA = 60
+
+# Pool de motores: número de procesos y memoria de hash total a repartir
+NUM_MOTORES = int(os.environ.get("MOTORES_POOL", "0")) or None  # None = núcleos / 2
+HASH_TOTAL_MB = int(os.environ.get("MOTOR_HASH_TOTAL_MB", "512"))
+TIMEOUT_MOTOR = 30  # segundos máximos esperando un motor libre
+
+# Supervisor del pool: procesos de reserva ya arrancados, máximo al que se
+# amplía el pool si hay jugadas esperando motor, plazo tras el que una
+# búsqueda se considera colgada y segundos entre revisiones
+MOTORES_RESERVA = int(os.environ.get("MOTORES_RESERVA", "1"))
+MOTORES_MAX = int(os.environ.get("MOTORES_MAX", "0")) or None  # None = sin ampliación
+PLAZO_BUSQUEDA = 30
+INTERVALO_SUPERVISOR = 5
+
+# Daemon de motores compartido (motor_daemon.py); si se indica, este proceso
+# no arranca motores propios
+MOTOR_SOCKET = os.environ.get("MOTOR_SOCKET")
+MOTOR_SOCKET_CLAVE = os.environ.get("MOTOR_SOCKET_CLAVE")
+
+# Caché de jugadas del motor por posición (TTL en segundos, 0 = sin caducidad)
+CACHE_MAX_ENTRADAS = int(os.environ.get("CACHE_JUGADAS_MAX", "10000"))
+CACHE_TTL = float(os.environ.get("CACHE_JUGADAS_TTL", "0"))
+
+# Libro de aperturas Polyglot (.bin) consultado antes que el motor
+LIBRO_PATH = os.environ.get("LIBRO_APERTURAS")
+LIBRO_MAX_PLY = int(os.environ.get("LIBRO_MAX_PLY", "20"))
+
+# Tablas de finales Syzygy (directorios separados por ':'), consultadas antes
+# que el motor con pocas piezas; TABLAS_MAX_FDS = ficheros abiertos a la vez
+TABLAS_PATH = os.environ.get("TABLAS_FINALES")
+TABLAS_MAX_FDS = int(os.environ.get("TABLAS_MAX_FDS", "128"))
+
+# Cola de trabajos del motor: workers fijos y tamaño máximo antes de rechazar
+MAX_COLA_MOTOR = int(os.environ.get("MAX_COLA_MOTOR", "200"))
+
+# Presupuesto de búsqueda: nodos por jugada en una posición normal, escalados
+# por la dificultad (0 = tiempo adaptativo según la carga). Cuentas de
+# segundos de motor por cliente (se recargan a lo largo de la ventana) y por
+# partida; 0 = sin límite. El cliente es la IP o, detrás de un proxy que
+# autentique, la cabecera indicada en CLIENTE_CABECERA
+MOTOR_NODOS = int(os.environ.get("MOTOR_NODOS", "0"))
+CUOTA_MOTOR_CLIENTE = float(os.environ.get("CUOTA_MOTOR_CLIENTE", "0"))
+CUOTA_MOTOR_VENTANA = float(os.environ.get("CUOTA_MOTOR_VENTANA", "3600"))
+CUOTA_MOTOR_PARTIDA = float(os.environ.get("CUOTA_MOTOR_PARTIDA", "0"))
+CLIENTE_CABECERA = os.environ.get("CLIENTE_CABECERA")
+
+# Long-poll y SSE: espera máxima por petición y latido del stream (segundos)
+MAX_ESPERA_LONG_POLL = 30
+LATIDO_SSE = 15
+
+# Análisis en streaming: segundos máximos de cada análisis (por debajo del
+# plazo tras el que el supervisor da una búsqueda por colgada)
+ANALISIS_TIEMPO_MAX = float(os.environ.get("ANALISIS_TIEMPO_MAX", "20"))
+
+# Respuestas: JSON (orjson) o MessagePack según `Accept`, comprimidas con
+# brotli o gzip según `Accept-Encoding` a partir de estos bytes (0 = nunca)
+COMPRESION_MIN_BYTES = int(os.environ.get("COMPRESION_MIN_BYTES", "1024"))
+app.json = ProveedorJSON(app, COMPRESION_MIN_BYTES, m_codificacion, m_bytes)
+
+# Ponder: mientras piensa el humano, un motor libre busca la posición tras
+# su respuesta esperada (MOTOR_PONDER=1 para activarlo). Tiempo máximo en s.
+PONDER = os.environ.get("MOTOR_PONDER", "0") == "1"
+PONDER_MAX = 60
+
+# Almacén de partidas: 'memoria' (por defecto) o 'sqlite:///ruta/partidas.db'
+# para conservarlas entre reinicios y compartirlas entre varios workers
+ALMACEN_PARTIDAS = os.environ.get("ALMACEN_PARTIDAS", "memoria")
 
 # Estado global del juego
-partidas = {}
-motor_lock = threading.Lock()
+partidas = crear_almacen(ALMACEN_PARTIDAS)
+atexit.register(partidas.cerrar)
+partidas_lock = threading.Lock()
+cache_jugadas = CacheJugadas(CACHE_MAX_ENTRADAS, CACHE_TTL)
+libro = LibroAperturas(LIBRO_PATH, LIBRO_MAX_PLY)
+tablas = TablasFinales(TABLAS_PATH, TABLAS_MAX_FDS)
+notificador = NotificadorPartidas()
+cuentas = CuentasMotor(CUOTA_MOTOR_CLIENTE, CUOTA_MOTOR_VENTANA, CUOTA_MOTOR_PARTIDA)
+analisis_activos = RegistroAnalisis()  # clave: partida_id o ('fen', cliente)
 
 def inicializar_motor():
-    """Inicializa el motor de chess con manejo robusto de errores"""
+    """Inicializa el pool de motores de chess con manejo robusto de errores"""
     try:
-        motor_dir = os.path.dirname(CFISH_PATH)
-        motor_nombre = os.path.basename(CFISH_PATH)
-        
-        # Guardar directorio actual para restaurarlo después
-        directorio_original = os.getcwd()
+        if MOTOR_SOCKET:
+            cliente = ClienteMotorRemoto(MOTOR_SOCKET, MOTOR_SOCKET_CLAVE.encode() if MOTOR_SOCKET_CLAVE else None)
+            if not cliente.iniciar():
+                print(f"❌ Daemon de motores no disponible en: {MOTOR_SOCKET}")
+                return None
+            print(f"✅ Conectado al daemon de motores en {MOTOR_SOCKET}")
+            return cliente
         
-        if not os.path.exists(CFISH_PATH):
-            print(f"❌ Archivo del motor no encontrado: {CFISH_PATH}")
+        pool = PoolMotores(CFISH_PATH, num_motores=NUM_MOTORES, hash_total_mb=HASH_TOTAL_MB,
+                           reserva=MOTORES_RESERVA, max_motores=MOTORES_MAX, plazo_busqueda=PLAZO_BUSQUEDA)
+        if not pool.iniciar():
+            print(f"❌ No se pudo iniciar ningún motor desde: {CFISH_PATH}")
             return None
-            
-        os.chdir(motor_dir)
-        engine = chess.engine.SimpleEngine.popen_uci(f"./{motor_nombre}")
-        
-        # Restaurar directorio original
-        os.chdir(directorio_original)
         
-        # Configurar parámetros del motor
-        engine.configure({"Hash": 256, "Threads": 2})
-        
-        print("✅ Motor de chess inicializado correctamente")
-        return engine
+        print(f"✅ Pool de motores inicializado: {pool.estadisticas()['motores']} procesos")
+        return pool
         
     except Exception as e:
         print(f"❌ Error crítico iniciando motor: {e}")
-        # Restaurar directorio en caso de error
-        if 'directorio_original' in locals():
-            os.chdir(directorio_original)
         return None
 
 # Cierre graceful del motor
 def cerrar_motor():
-    """Cierra el motor de ajedrez de forma segura"""
+    """Cierra los motores de ajedrez de forma segura"""
     global engine
+    if supervisor is not None:
+        supervisor.detener()
+    if ponder is not None:
+        ponder.cerrar()
     if engine:
         try:
-            engine.quit()
-            print("✅ Motor de chess cerrado correctamente")
+            engine.cerrar()
+            print("✅ Motores de chess cerrados correctamente")
         except Exception as e:
-            print(f"⚠️ Error cerrando motor: {e}")
+            print(f"⚠️ Error cerrando motores: {e}")
         finally:
             engine = None
 
@@ -79,83 +187,100 @@ def signal_handler(sig, frame):
 signal.signal(signal.SIGINT, signal_handler)
 signal.signal(signal.SIGTERM, signal_handler)
 
-# Motor global (se reutiliza)
+# Pool global de motores (se reutiliza entre partidas)
+ponder = None
+supervisor = None
 engine = inicializar_motor()
 
+# Supervisor fuera del camino de las peticiones: ping, watchdog y reserva
+if isinstance(engine, PoolMotores):
+    supervisor = SupervisorMotores(engine, INTERVALO_SUPERVISOR)
+    supervisor.iniciar()
+
+def cargar_consumo(partida_id, partida, segundos):
+    """Carga una búsqueda a la partida y a su cliente, y la guarda con la partida"""
+    cuentas.cargar(partida.cliente, partida, segundos)
+    partidas.registrar_consumo(partida_id, partida, segundos)
+
+# El ponder necesita motores locales (no está disponible con el daemon); sus
+# búsquedas se cargan a la partida como las del motor
+if PONDER and isinstance(engine, PoolMotores):
+    ponder = GestorPonder(engine, PONDER_MAX, cargar=cargar_consumo)
+
 def limpiar_partidas_antiguas():
-    """Limpia partidas antiguas automáticamente"""
-    ahora = time.time()
-    partidas_a_eliminar = []
-    
-    for partida_id, partida in partidas.items():
-        tiempo_vida = ahora - partida['creado']
-        if (tiempo_vida > MAX_TIEMPO_PARTIDA or 
-            len(partidas) > MAX_PARTIDAS and partida['board'].is_game_over()):
-            partidas_a_eliminar.append(partida_id)
-    
+    """Elimina las partidas caducadas y desaloja de memoria las inactivas.
+
+    Trabaja con listas de ids que devuelve el almacén (no itera el
+    diccionario mientras otras peticiones lo modifican) y sin cargar las
+    partidas que están en disco.
+    """
+    partidas_a_eliminar = set(partidas.antiguas(time.time() - MAX_TIEMPO_PARTIDA))
+    if len(partidas) > MAX_PARTIDAS:
+        partidas_a_eliminar.update(partida_id for partida_id, partida in partidas.activas()
+                                   if resultado_de(partida) != '*')
+
     for partida_id in partidas_a_eliminar:
-        del partidas[partida_id]
+        try:
+            del partidas[partida_id]
+        except KeyError:
+            continue  # ya eliminada por otra petición
+        if planificador is not None:
+            planificador.invalidar(partida_id, eliminar=True)
+        if ponder is not None:
+            ponder.cancelar(partida_id)
+        analisis_activos.cancelar(partida_id)
+        notificador.olvidar(partida_id)
         print(f"🧹 Partida {partida_id} eliminada por limpieza automática")
 
+    # Sin uso desde hace INACTIVIDAD_PARTIDA segundos no tienen long-polls ni
+    # streams esperando (consultan la partida en cada latido): se suelta
+    # también su condición del notificador
+    desalojadas = partidas.desalojar(INACTIVIDAD_PARTIDA)
+    for partida_id in desalojadas:
+        notificador.olvidar(partida_id)
+    if desalojadas:
+        print(f"💤 {len(desalojadas)} partidas inactivas desalojadas de memoria")
+
 # Ejecutar limpieza periódica
 def iniciar_limpieza_periodica():
     def limpiar_periodicamente():
         while True:
-            time.sleep(3600)  # Cada hora
-            with motor_lock:
-                limpiar_partidas_antiguas()
+            time.sleep(INTERVALO_LIMPIEZA)
+            with partidas_lock:
+                try:
+                    limpiar_partidas_antiguas()
+                except Exception as e:
+                    print(f"❌ Error en la limpieza de partidas: {e}")
     
     threading.Thread(target=limpiar_periodicamente, daemon=True).start()
 
-def tablero_a_json(board):
-    """Convierte un tablero de chess a formato JSON para el frontend"""
-    tablero_json = []
-    
-    # Crear matriz 8x8 para el frontend (de arriba a abajo, de a-h)
-    for fila in range(7, -1, -1):  # De 7 a 0 (de arriba a abajo)
-        for col in range(8):
-            square = chess.square(col, fila)
-            pieza = board.piece_at(square)
-            
-            pieza_info = None
-            if pieza:
-                # Determinar tipo y color
-                tipo = pieza.symbol().lower()
-                color = 'white' if pieza.color == chess.WHITE else 'black'
-                
-                pieza_info = {
-                    'tipo': tipo,
-                    'color': color,
-                    'simbolo': pieza.symbol(),
-                    'unicode': obtener_unicode_pieza(pieza.symbol())
-                }
-            
-            tablero_json.append({
-                'casilla': chess.square_name(square),
-                'fila': 8 - fila,  # 1-8
-                'columna': chr(97 + col),  # a-h
-                'pieza': pieza_info,
-                'color_casilla': 'light' if (fila + col) % 2 == 0 else 'dark'
-            })
+# También con gunicorn: cada worker desaloja sus propias partidas inactivas
+iniciar_limpieza_periodica()
+
+def tablero_respuesta(partida):
+    """Tablero en el formato pedido: completo (por defecto) o `?formato=compacto`.
+
+    En formato compacto `?desde=<ply>` envía solo las casillas cambiadas
+    desde esa jugada.
+    """
+    estado = estado_de(partida)
+    if request.args.get('formato') != 'compacto':
+        with m_tablero.medir(formato='completo'):
+            return estado.tablero()
     
-    return {
-        'posiciones': tablero_json,
-        'fen': board.fen(),
-        'es_turno_blancas': board.turn == chess.WHITE,
-        'jugadas_legales': [move.uci() for move in board.legal_moves],
-        'es_jaque': board.is_check(),
-        'es_jaque_mate': board.is_checkmate(),
-        'es_tablas': board.is_stalemate() or board.is_insufficient_material() or board.is_fifty_moves() or board.is_repetition(),
-        'resultado': board.result() if board.is_game_over() else None
-    }
-
-def obtener_unicode_pieza(simbolo):
-    """Devuelve el símbolo Unicode para la pieza"""
-    unicode_piezas = {
-        'R': '♖', 'N': '♘', 'B': '♗', 'Q': '♕', 'K': '♔', 'P': '♙',
-        'r': '♜', 'n': '♞', 'b': '♝', 'q': '♛', 'k': '♚', 'p': '♟'
-    }
-    return unicode_piezas.get(simbolo, simbolo)
+    desde = request.args.get('desde')
+    try:
+        desde_ply = int(desde) if desde is not None else None
+    except ValueError:
+        desde_ply = None
+    with m_tablero.medir(formato='compacto'):
+        return tablero_a_json_compacto(partida.board, desde_ply, estado.resumen())
+
+def cliente_peticion():
+    """Cliente al que se cargan las búsquedas de sus partidas"""
+    if CLIENTE_CABECERA and request.headers.get(CLIENTE_CABECERA):
+        return request.headers[CLIENTE_CABECERA]
+    return request.remote_addr
 
 @app.route('/api/nueva-partida', methods=['POST'])
 def nueva_partida():
@@ -165,22 +290,22 @@ def nueva_partida():
         if len(partidas) >= MAX_PARTIDAS:
             limpiar_partidas_antiguas()
         
-        partida_id = str(uuid.uuid4())
-        board = chess.Board()
+        # Dificultad opcional: 'facil', 'normal' (por defecto) o 'dificil'
+        data = request.get_json(silent=True) or {}
+        dificultad = dificultad_valida(data.get('dificultad') if isinstance(data, dict) else None)
         
-        partidas[partida_id] = {
-            'board': board,
-            'historial': [],
-            'creado': time.time(),
-            'jugador_color': 'white'  # Humano juega con blancas
-        }
+        partida_id = str(uuid.uuid4())
+        partidas[partida_id] = Partida(jugador_color='white', dificultad=dificultad,  # Humano juega con blancas
+                                       cliente=cliente_peticion())
+        m_partidas.inc()
         
-        print(f"🎮 Nueva partida creada: {partida_id}")
+        print(f"🎮 Nueva partida creada: {partida_id} (dificultad {dificultad})")
         
         return jsonify({
             'success': True,
             'partida_id': partida_id,
-            'tablero': tablero_a_json(board),
+            'dificultad': dificultad,
+            'tablero': tablero_respuesta(partidas[partida_id]),
             'mensaje': 'Partida creada. Eres las blancas!'
         })
         
@@ -196,22 +321,24 @@ def obtener_estado(partida_id):
             return jsonify({'success': False, 'error': 'Partida no encontrada'}), 404
         
         partida = partidas[partida_id]
-        board = partida['board']
+        board = partida.board
+        derivado = estado_de(partida)
         
         estado = {
             'success': True,
             'partida_id': partida_id,
-            'tablero': tablero_a_json(board),
-            'historial': partida['historial'][-10:],  # Últimos 10 movimientos
+            'tablero': tablero_respuesta(partida),
+            'historial': partida.historial(10),  # Últimos 10 movimientos
             'es_turno_humano': board.turn == chess.WHITE,
-            'juego_terminado': board.is_game_over(),
-            'movimientos_totales': len(partida['historial']),
+            'juego_terminado': derivado.terminado,
+            'movimientos_totales': partida.num_entradas,
+            'consumo_motor': cuentas.consumo(partida),
             'motor_activo': engine is not None
         }
         
-        if board.is_game_over():
-            outcome = board.outcome()
-            estado['resultado'] = board.result()
+        if derivado.terminado:
+            outcome = derivado.outcome
+            estado['resultado'] = derivado.resultado
             estado['terminacion'] = str(outcome.termination) if outcome else 'unknown'
             estado['ganador'] = 'blancas' if outcome and outcome.winner == chess.WHITE else \
                               'negras' if outcome and outcome.winner == chess.BLACK else 'tablas'
@@ -242,14 +369,15 @@ def jugar_movimiento(partida_id):
             return jsonify({'success': False, 'error': 'Formato de movimiento inválido'}), 400
         
         partida = partidas[partida_id]
-        board = partida['board']
+        board = partida.board
+        derivado = estado_de(partida)
         
         # Verificar que el juego no ha terminado
-        if board.is_game_over():
+        if derivado.terminado:
             return jsonify({
                 'success': False, 
                 'error': 'La partida ha terminado',
-                'resultado': board.result()
+                'resultado': derivado.resultado
             }), 400
         
         # Verificar que es turno del humano
@@ -263,11 +391,11 @@ def jugar_movimiento(partida_id):
         # Validar movimiento
         try:
             move = chess.Move.from_uci(movimiento_uci)
-            if move not in board.legal_moves:
+            if not derivado.es_legal(move):
                 return jsonify({
                     'success': False, 
                     'error': 'Movimiento ilegal',
-                    'jugadas_legales': [m.uci() for m in board.legal_moves]
+                    'jugadas_legales': derivado.jugadas_legales
                 }), 400
         except ValueError as ve:
             return jsonify({
@@ -275,17 +403,61 @@ def jugar_movimiento(partida_id):
                 'error': f'Formato de movimiento inválido: {str(ve)}'
             }), 400
         
-        # Ejecutar movimiento humano
-        board.push(move)
+        # Ejecutar movimiento humano (la SAN se calcula antes de mover)
         notacion_san = board.san(move)
+        partida.jugar(move, 'humano')
+        n_entrada, entrada = partida.ultima_entrada_numerada()
         
-        partida['historial'].append({
-            'jugador': 'humano',
-            'movimiento': movimiento_uci,
-            'notacion': notacion_san,
-            'timestamp': time.time()
-        })
+        # Si el motor estaba pensando esta jugada (ponder) su búsqueda sigue;
+        # el análisis de la posición anterior ya no sirve
+        if ponder is not None:
+            ponder.resolver(partida_id, move)
+        analisis_activos.cancelar(partida_id)
+        
+        # Encolar la respuesta del motor; si la partida o su cliente han
+        # agotado su cuota de motor, o la cola está llena, se deshace la
+        # jugada para que el cliente pueda reintentarla
+        motor_encolado = False
+        if not derivado.terminado and planificador is not None:
+            try:
+                cuentas.comprobar(partida.cliente, partida)
+                # La jugada se guarda antes de encolar la respuesta del
+                # motor, que puede llegar a guardarse enseguida
+                partidas.registrar_entrada(partida_id, n_entrada, entrada)
+                planificador.encolar(partida_id)
+                motor_encolado = True
+            except CuotaAgotadaError as e:
+                partida.deshacer()
+                if ponder is not None:
+                    ponder.cancelar(partida_id)
+                print(f"💸 Cuota de motor agotada ({e.ambito}), jugada rechazada en partida {partida_id}")
+                respuesta = jsonify({
+                    'success': False,
+                    'error': str(e),
+                    'cuota': e.ambito,
+                    'retry_after': e.retry_after
+                })
+                if e.retry_after is not None:
+                    respuesta.headers['Retry-After'] = str(e.retry_after)
+                return respuesta, 429
+            except ColaLlenaError as e:
+                partida.deshacer()
+                partidas.anular_entrada(partida_id, n_entrada)
+                if ponder is not None:
+                    ponder.cancelar(partida_id)
+                print(f"⏳ Cola del motor llena, jugada rechazada en partida {partida_id}")
+                respuesta = jsonify({
+                    'success': False,
+                    'error': 'Servidor ocupado, reintenta en unos segundos',
+                    'retry_after': e.retry_after
+                })
+                respuesta.headers['Retry-After'] = str(e.retry_after)
+                return respuesta, 503
         
+        if not motor_encolado:
+            partidas.registrar_entrada(partida_id, n_entrada, entrada)
+        notificador.notificar(partida_id)
+        m_jugadas.inc(jugador='humano', origen='humano')
         print(f"👤 Jugador jugó: {movimiento_uci} ({notacion_san}) en partida {partida_id}")
         
         # Preparar respuesta
@@ -293,21 +465,20 @@ def jugar_movimiento(partida_id):
             'success': True,
             'movimiento_ejecutado': movimiento_uci,
             'notacion': notacion_san,
-            'tablero': tablero_a_json(board),
-            'juego_terminado': board.is_game_over(),
+            'tablero': tablero_respuesta(partida),
+            'juego_terminado': derivado.terminado,
             'es_turno_humano': False  # Ahora es turno del motor
         }
         
         # Manejar fin del juego
-        if board.is_game_over():
-            resultado = board.result()
+        if derivado.terminado:
+            resultado = derivado.resultado
             respuesta['resultado'] = resultado
             respuesta['mensaje'] = f'Partida terminada: {resultado}'
             print(f"🏁 Partida {partida_id} terminada: {resultado}")
         else:
-            # Iniciar movimiento del motor en segundo plano
-            if engine is not None:
-                threading.Thread(target=jugar_motor, args=(partida_id,), daemon=True).start()
+            # El movimiento del motor ya está en la cola de trabajos
+            if motor_encolado:
                 respuesta['motor_pensando'] = True
                 respuesta['mensaje'] = 'Cfish está pensando...'
             else:
@@ -320,59 +491,288 @@ def jugar_movimiento(partida_id):
         print(f"❌ Error en jugar_movimiento: {e}")
         return jsonify({'success': False, 'error': 'Error interno del servidor'}), 500
 
+def carga_motor():
+    """Trabajos del motor pendientes por worker (acorta las búsquedas con la cola llena)"""
+    if planificador is None:
+        return 0.0
+    estadisticas = planificador.estadisticas()
+    return estadisticas['pendientes'] / estadisticas['workers']
+
 def jugar_motor(partida_id):
     """Función mejorada para que juegue el motor con mejor manejo de errores"""
     if partida_id not in partidas:
         return
     
     partida = partidas[partida_id]
-    board = partida['board']
+    board = partida.board
     
     # Verificaciones adicionales
-    if (board.is_game_over() or 
+    if (estado_de(partida).terminado or 
         board.turn == chess.WHITE or 
         engine is None):
         return
     
-    # Pausa para mejor UX
-    time.sleep(0.5)
-    
-    with motor_lock:
-        try:
-            print(f"🤖 Motor pensando en partida {partida_id}...")
+    try:
+        print(f"🤖 Motor pensando en partida {partida_id}...")
+        
+        # Tras un ponderhit se usa la búsqueda que empezó mientras pensaba el
+        # humano. Si no, una única jugada legal se juega sin buscar; después
+        # el libro de aperturas, las tablas de finales, la caché de posiciones
+        # y solo si no hay
+        # respuesta se toma un motor libre del pool, con un presupuesto de
+        # nodos según la posición y la dificultad (o un tiempo adaptado
+        # también a la carga). La búsqueda se carga a la partida y a su cliente
+        result = None
+        busqueda_ponder = ponder.tomar(partida_id, board) if ponder is not None else None
+        if busqueda_ponder is not None:
+            origen = 'ponder'
+            result = busqueda_ponder.resultado(tiempo_jugada(board, partida.dificultad, carga_motor()))
+        if result is None:
+            origen, move_directo = 'unica', jugada_unica(board)
+            if move_directo is None:
+                origen, move_directo = 'libro', libro.elegir_jugada(board)
+            if move_directo is None:
+                origen, move_directo = 'tablas', tablas.elegir_jugada(board)
+            if move_directo is not None:
+                result = chess.engine.PlayResult(move_directo, None)
+        if result is None:
+            origen = 'cache'
+            limit = limite_jugada(board, partida.dificultad, carga_motor(), nodos_base=MOTOR_NODOS)
+            result = cache_jugadas.obtener(board, limit)
+        if result is None:
+            origen = 'motor'
+            # Las búsquedas de ponder ceden su motor al trabajo en primer plano
+            if ponder is not None and engine.estadisticas()['libres'] == 0:
+                ponder.ceder()
+            inicio_espera = time.perf_counter()
+            with engine.usar(timeout=TIMEOUT_MOTOR) as motor:
+                m_espera_motor.observar(time.perf_counter() - inicio_espera)
+                inicio_busqueda = time.perf_counter()
+                try:
+                    with m_busqueda.medir():
+                        result = motor.play(board, limit)
+                finally:
+                    cargar_consumo(partida_id, partida, time.perf_counter() - inicio_busqueda)
+            if result.move is not None:
+                cache_jugadas.guardar(board, limit, result)
+        
+        if result.move is None:
+            print(f"⚠️ Motor no devolvió movimiento en partida {partida_id}")
+            return
             
-            # Configuración robusta con timeout
-            limit = chess.engine.Limit(time=2.0)
-            result = engine.play(board, limit)
+        move = result.move
+        
+        # Verificar que el movimiento es legal
+        if not estado_de(partida).es_legal(move):
+            print(f"❌ Movimiento ilegal del motor: {move.uci()}")
+            return
+        
+        # Descartar el resultado si la partida se reinició o eliminó mientras
+        # el motor pensaba
+        if partidas.get(partida_id) is not partida:
+            print(f"🗑️ Resultado descartado: partida {partida_id} reiniciada o eliminada")
+            return
+        
+        # Ponder de la respuesta esperada, antes de publicar la jugada para
+        # que la del humano no pueda llegar antes; solo si no hay cola y a la
+        # partida y su cliente les queda saldo de motor
+        if (ponder is not None and result.ponder is not None and
+                planificador.estadisticas()['pendientes'] == 0 and
+                cuentas.disponible(partida.cliente, partida)):
+            tras_motor = board.copy()
+            tras_motor.push(move)
+            ponder.iniciar(partida_id, tras_motor, result.ponder, partida)
+        
+        # Ejecutar movimiento
+        notacion_san = board.san(move)
+        partida.jugar(move, 'motor')
+        n_entrada, entrada = partida.ultima_entrada_numerada()
+        analisis_activos.cancelar(partida_id)
             
-            if result.move is None:
-                print(f"⚠️ Motor no devolvió movimiento en partida {partida_id}")
-                return
-                
-            move = result.move
+        partidas.registrar_entrada(partida_id, n_entrada, entrada)
+        notificador.notificar(partida_id)
+        m_jugadas.inc(jugador='motor', origen=origen)
+        print(f"🤖 Motor jugó: {move.uci()} ({notacion_san}) en partida {partida_id}")
+        
+    except PoolAgotadoError:
+        print(f"⏳ Ningún motor libre a tiempo para la partida {partida_id}")
+    except chess.engine.EngineTerminatedError:
+        print(f"❌ Motor terminado inesperadamente en partida {partida_id}")
+    except Exception as e:
+        print(f"❌ Error del motor en partida {partida_id}: {e}")
+
+# Planificador de trabajos del motor: un worker por proceso que puede llegar
+# a tener el pool (los que esperan motor hacen que el supervisor lo amplíe)
+planificador = None
+if engine is not None:
+    planificador = PlanificadorMotor(jugar_motor, engine.estadisticas()['max_motores'], MAX_COLA_MOTOR)
+    planificador.iniciar()
+
+def esperar_cambio(partida_id, partida, desde_ply, timeout):
+    """Bloquea hasta que la partida pase de `desde_ply` o sea reiniciada/eliminada"""
+    return notificador.esperar(
+        partida_id,
+        lambda: partidas.get(partida_id) is not partida or partida.num_jugadas != desde_ply,
+        timeout
+    )
+
+@app.route('/api/esperar/<partida_id>', methods=['GET'])
+def esperar_jugada(partida_id):
+    """Long-poll: responde en cuanto la partida supera la jugada `desde` o vence el timeout"""
+    try:
+        if partida_id not in partidas:
+            return jsonify({'success': False, 'error': 'Partida no encontrada'}), 404
+        
+        partida = partidas[partida_id]
+        try:
+            desde_ply = int(request.args.get('desde', partida.num_jugadas))
+            timeout = min(float(request.args.get('timeout', MAX_ESPERA_LONG_POLL)), MAX_ESPERA_LONG_POLL)
+        except ValueError:
+            return jsonify({'success': False, 'error': 'Parámetros desde/timeout inválidos'}), 400
+        
+        cambio = esperar_cambio(partida_id, partida, desde_ply, timeout)
+        
+        partida = partidas.get(partida_id)
+        if partida is None:
+            return jsonify({'success': False, 'error': 'Partida no encontrada'}), 404
+        
+        evento = evento_partida(partida_id, partida)
+        evento['success'] = True
+        evento['cambio'] = cambio
+        return jsonify(evento)
+        
+    except Exception as e:
+        print(f"❌ Error en esperar_jugada: {e}")
+        return jsonify({'success': False, 'error': 'Error interno del servidor'}), 500
+
+@app.route('/api/eventos/<partida_id>', methods=['GET'])
+def eventos_partida(partida_id):
+    """Stream Server-Sent Events con cada movimiento de la partida"""
+    if partida_id not in partidas:
+        return jsonify({'success': False, 'error': 'Partida no encontrada'}), 404
+    
+    def generar():
+        partida = partidas.get(partida_id)
+        ply = None
+        while partida is not None:
+            if ply is not None and not esperar_cambio(partida_id, partida, ply, LATIDO_SSE):
+                yield ': latido\n\n'
+                continue
             
-            # Verificar que el movimiento es legal
-            if move not in board.legal_moves:
-                print(f"❌ Movimiento ilegal del motor: {move.uci()}")
+            partida = partidas.get(partida_id)
+            if partida is None:
+                yield 'event: eliminada\ndata: {}\n\n'
                 return
             
-            # Ejecutar movimiento
-            board.push(move)
-            notacion_san = board.san(move)
-            
-            partida['historial'].append({
-                'jugador': 'motor',
-                'movimiento': move.uci(),
-                'notacion': notacion_san,
-                'timestamp': time.time()
-            })
-                
-            print(f"🤖 Motor jugó: {move.uci()} ({notacion_san}) en partida {partida_id}")
-            
-        except chess.engine.EngineTerminatedError:
-            print(f"❌ Motor terminado inesperadamente en partida {partida_id}")
-        except Exception as e:
-            print(f"❌ Error del motor en partida {partida_id}: {e}")
+            evento = evento_partida(partida_id, partida)
+            ply = evento['ply']
+            yield f"event: jugada\ndata: {json.dumps(evento)}\n\n"
+            if evento['juego_terminado']:
+                return
+    
+    return Response(
+        stream_with_context(generar()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def respuesta_analisis(clave, board, cliente, partida=None):
+    """Stream SSE con la evaluación de `board` según profundiza el motor.
+
+    Cada `event: info` lleva la profundidad, puntuación, nodos/s y las
+    líneas MultiPV; al terminar llega `event: fin` con la mejor jugada, o
+    `event: cancelado` si la posición cambió o el mismo cliente pidió otro
+    análisis. Si el cliente se desconecta la búsqueda se para y el motor
+    vuelve al pool.
+    """
+    try:
+        limite = limite_acotado(limite_desde_parametros(request.args, ANALISIS_TIEMPO_MAX), ANALISIS_TIEMPO_MAX)
+        multipv = multipv_desde_parametros(request.args)
+    except ParametrosInvalidosError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    if board.is_game_over():
+        return jsonify({'success': False, 'error': 'La partida ha terminado', 'resultado': board.result()}), 400
+    if engine is None or isinstance(engine, ClienteMotorRemoto):
+        # El daemon de motores solo atiende búsquedas de una jugada
+        return jsonify({'success': False, 'error': 'Análisis no disponible'}), 503
+    try:
+        cuentas.comprobar(cliente, partida)
+    except CuotaAgotadaError as e:
+        respuesta = jsonify({'success': False, 'error': str(e), 'cuota': e.ambito, 'retry_after': e.retry_after})
+        if e.retry_after is not None:
+            respuesta.headers['Retry-After'] = str(e.retry_after)
+        return respuesta, 429
+    
+    def generar():
+        lineas = LineasAnalisis(board, multipv)
+        cancelado = threading.Event()
+        fin = 'desconectado'
+        inicio = None
+        try:
+            with engine.usar(timeout=TIMEOUT_MOTOR) as motor:
+                inicio = time.perf_counter()
+                with motor.analysis(board, limite, multipv=multipv) as analisis:
+                    def parar():
+                        cancelado.set()
+                        analisis.stop()
+                    token = analisis_activos.registrar(clave, parar)
+                    try:
+                        for info in analisis:
+                            actualizacion = lineas.anadir(info)
+                            if actualizacion is not None:
+                                yield f"event: info\ndata: {json.dumps(actualizacion)}\n\n"
+                        mejor = analisis.wait().move
+                    finally:
+                        analisis_activos.quitar(clave, token)
+            if cancelado.is_set():
+                fin = 'cancelado'
+                yield 'event: cancelado\ndata: {}\n\n'
+            else:
+                fin = 'completo'
+                final = lineas.actualizacion()
+                final['mejor'] = mejor.uci() if mejor else None
+                yield f"event: fin\ndata: {json.dumps(final)}\n\n"
+        except PoolAgotadoError:
+            fin = 'sin_motor'
+            yield f"event: error\ndata: {json.dumps({'error': 'Ningún motor libre, reintenta en unos segundos'})}\n\n"
+        except chess.engine.EngineError as e:
+            fin = 'error'
+            print(f"❌ Error del motor analizando {board.fen()}: {e}")
+            yield f"event: error\ndata: {json.dumps({'error': 'Error del motor'})}\n\n"
+        finally:
+            if inicio is not None:
+                consumo = time.perf_counter() - inicio
+                cuentas.cargar(cliente, partida, consumo)
+                if partida is not None:
+                    partidas.registrar_consumo(clave, partida, consumo)
+            m_analisis.inc(fin=fin)
+    
+    return Response(
+        stream_with_context(generar()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/analizar/<partida_id>', methods=['GET'])
+def analizar_partida(partida_id):
+    """Análisis en streaming de la posición actual de una partida (?multipv=&depth=&nodes=&time=)"""
+    partida = partidas.get(partida_id)
+    if partida is None:
+        return jsonify({'success': False, 'error': 'Partida no encontrada'}), 404
+    return respuesta_analisis(partida_id, partida.board.copy(), partida.cliente, partida)
+
+@app.route('/api/analizar', methods=['GET'])
+def analizar_fen():
+    """Análisis en streaming de una posición cualquiera (?fen=...&multipv=...)"""
+    fen = request.args.get('fen', '').strip()
+    if not fen:
+        return jsonify({'success': False, 'error': 'FEN no proporcionado'}), 400
+    try:
+        board = chess.Board(fen)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'FEN inválido'}), 400
+    cliente = cliente_peticion()
+    return respuesta_analisis(('fen', cliente), board, cliente)
 
 @app.route('/api/jugadas-legales/<partida_id>', methods=['GET'])
 def obtener_jugadas_legales(partida_id):
@@ -381,10 +781,11 @@ def obtener_jugadas_legales(partida_id):
         if partida_id not in partidas:
             return jsonify({'success': False, 'error': 'Partida no encontrada'}), 404
         
-        board = partidas[partida_id]['board']
+        board = partidas[partida_id].board
+        derivado = estado_de(partidas[partida_id])
         
         # Verificar que no es juego terminado
-        if board.is_game_over():
+        if derivado.terminado:
             return jsonify({
                 'success': True,
                 'jugadas_legales': [],
@@ -393,7 +794,7 @@ def obtener_jugadas_legales(partida_id):
                 'juego_terminado': True
             })
         
-        jugadas = [move.uci() for move in board.legal_moves]
+        jugadas = derivado.jugadas_legales
         
         return jsonify({
             'success': True,
@@ -415,11 +816,8 @@ def rendirse(partida_id):
             return jsonify({'success': False, 'error': 'Partida no encontrada'}), 404
         
         partida = partidas[partida_id]
-        partida['historial'].append({
-            'jugador': 'sistema',
-            'evento': 'El jugador se rindió',
-            'timestamp': time.time()
-        })
+        partida.registrar_evento('El jugador se rindió')
+        partidas.registrar_entrada(partida_id, *partida.ultima_entrada_numerada())
         
         return jsonify({
             'success': True,
@@ -436,21 +834,23 @@ def listar_partidas():
     """Lista todas las partidas activas"""
     try:
         partidas_lista = []
-        for pid, partida in partidas.items():
-            board = partida['board']
+        # Solo las partidas en memoria: las inactivas no se cargan para listarlas
+        for pid, partida in partidas.activas():
+            resultado = resultado_de(partida)  # sin reconstruir el tablero de las compactadas
             partidas_lista.append({
                 'partida_id': pid,
-                'creado': partida['creado'],
-                'movimientos': len(partida['historial']),
-                'terminada': board.is_game_over(),
-                'resultado': board.result() if board.is_game_over() else 'en_progreso',
-                'ultimo_movimiento': partida['historial'][-1] if partida['historial'] else None
+                'creado': partida.creado,
+                'movimientos': partida.num_entradas,
+                'terminada': resultado != '*',
+                'resultado': resultado if resultado != '*' else 'en_progreso',
+                'ultimo_movimiento': partida.ultima_entrada()
             })
         
         return jsonify({
             'success': True,
             'partidas': sorted(partidas_lista, key=lambda x: x['creado'], reverse=True),
             'total': len(partidas_lista),
+            'inactivas': len(partidas) - len(partidas_lista),
             'limite': MAX_PARTIDAS
         })
         
@@ -465,17 +865,24 @@ def reiniciar_partida(partida_id):
         if partida_id not in partidas:
             return jsonify({'success': False, 'error': 'Partida no encontrada'}), 404
         
-        partidas[partida_id] = {
-            'board': chess.Board(),
-            'historial': [],
-            'creado': time.time(),
-            'jugador_color': 'white'
-        }
+        # Los trabajos del motor pendientes de la partida anterior ya no valen
+        if planificador is not None:
+            planificador.invalidar(partida_id)
+        if ponder is not None:
+            ponder.cancelar(partida_id)
+        analisis_activos.cancelar(partida_id)
+        
+        anterior = partidas[partida_id]
+        partidas[partida_id] = Partida(
+            jugador_color='white', dificultad=anterior.dificultad, cliente=anterior.cliente
+        )
+        
+        notificador.notificar(partida_id)
         
         return jsonify({
             'success': True,
             'mensaje': 'Partida reiniciada',
-            'tablero': tablero_a_json(partidas[partida_id]['board'])
+            'tablero': tablero_respuesta(partidas[partida_id])
         })
         
     except Exception as e:
@@ -497,31 +904,76 @@ def info_api():
             'estado': 'GET /api/estado/<partida_id>',
             'jugar': 'POST /api/jugar/<partida_id>',
             'jugadas_legales': 'GET /api/jugadas-legales/<partida_id>',
+            'esperar': 'GET /api/esperar/<partida_id>?desde=<ply>&timeout=<s>',
+            'eventos': 'GET /api/eventos/<partida_id> (SSE)',
+            'analizar': 'GET /api/analizar/<partida_id>?multipv=<n>&depth=<d> (SSE)',
+            'analizar_fen': 'GET /api/analizar?fen=<fen>&multipv=<n> (SSE)',
             'rendirse': 'POST /api/rendirse/<partida_id>',
             'partidas': 'GET /api/partidas',
             'reiniciar': 'POST /api/reiniciar/<partida_id>',
             'health': 'GET /api/health',
+            'metrics': 'GET /metrics',
             'info': 'GET /api/info'
         }
     })
 
+def _estadistica_pool(campo):
+    return engine.estadisticas()[campo] if engine is not None else None
+
+registro.calculada('chess_motor_reinicios_total', 'Reinicios de procesos del motor', lambda: _estadistica_pool('reinicios'), 'counter')
+registro.calculada('chess_motor_colgados_total', 'Búsquedas cortadas por el watchdog',
+                   lambda: supervisor.colgados if supervisor is not None else None, 'counter')
+registro.calculada('chess_motores_reserva', 'Procesos de reserva ya arrancados', lambda: _estadistica_pool('reserva'))
+registro.calculada('chess_motores_en_uso', 'Motores buscando ahora mismo', lambda: _estadistica_pool('en_uso'))
+registro.calculada('chess_cola_motor_pendientes', 'Trabajos del motor en cola',
+                   lambda: planificador.estadisticas()['pendientes'] if planificador is not None else None)
+registro.calculada('chess_cola_motor_rechazados_total', 'Trabajos rechazados por cola llena',
+                   lambda: planificador.estadisticas()['rechazados'] if planificador is not None else None, 'counter')
+registro.calculada('chess_cache_aciertos_total', 'Aciertos de la caché de jugadas', lambda: cache_jugadas.aciertos, 'counter')
+registro.calculada('chess_cache_fallos_total', 'Fallos de la caché de jugadas', lambda: cache_jugadas.fallos, 'counter')
+registro.calculada('chess_libro_aciertos_total', 'Jugadas servidas por el libro de aperturas', lambda: libro.aciertos, 'counter')
+registro.calculada('chess_tablas_consultas_total', 'Consultas a las tablas de finales', lambda: tablas.consultas, 'counter')
+registro.calculada('chess_tablas_aciertos_total', 'Jugadas servidas por las tablas de finales', lambda: tablas.aciertos, 'counter')
+registro.calculada('chess_tablas_consulta_segundos_total', 'Tiempo total de las consultas a las tablas de finales', lambda: tablas.tiempo_total, 'counter')
+registro.calculada('chess_ponder_aciertos_total', 'Ponderhits (el humano jugó la respuesta esperada)',
+                   lambda: ponder.aciertos if ponder is not None else None, 'counter')
+registro.calculada('chess_ponder_fallos_total', 'Búsquedas de ponder descartadas por otra respuesta',
+                   lambda: ponder.fallos if ponder is not None else None, 'counter')
+registro.calculada('chess_ponder_cedidas_total', 'Búsquedas de ponder paradas para liberar un motor',
+                   lambda: ponder.cedidas if ponder is not None else None, 'counter')
+registro.calculada('chess_ponder_tasa_aciertos', 'Fracción de ponderhits entre las búsquedas resueltas',
+                   lambda: ponder.estadisticas()['tasa_aciertos'] if ponder is not None else None)
+registro.calculada('chess_motor_consumo_segundos_total', 'Segundos de motor cargados a las cuentas de partidas y clientes',
+                   lambda: cuentas.segundos_total, 'counter')
+registro.calculada('chess_cuota_cliente_rechazos_total', 'Jugadas rechazadas por cuota de motor del cliente agotada',
+                   lambda: cuentas.rechazos_cliente, 'counter')
+registro.calculada('chess_cuota_partida_rechazos_total', 'Jugadas rechazadas por cuota de motor de la partida agotada',
+                   lambda: cuentas.rechazos_partida, 'counter')
+registro.calculada('chess_partidas_activas', 'Partidas en el almacén', lambda: len(partidas))
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Métricas en formato de texto Prometheus"""
+    return Response(registro.exponer(), mimetype=metricas.CONTENT_TYPE)
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Verifica que el servidor y motor estén funcionando con más detalles"""
     motor_activo = engine is not None
     estado_motor = "healthy" if motor_activo else "degraded"
     
-    # Verificar que el motor responde
+    # Verificar que el motor responde (sin esperar a las búsquedas en curso):
+    # con el supervisor basta su última revisión, sin hablar con ningún motor
     motor_responsive = False
-    if motor_activo:
-        try:
-            with motor_lock:
-                # Test rápido del motor
-                board = chess.Board()
-                engine.ping()
-            motor_responsive = True
-        except:
-            motor_responsive = False
+    if supervisor is not None:
+        motor_responsive = supervisor.sano()
+        if not motor_responsive:
+            estado_motor = "degraded"
+    elif motor_activo:
+        ping = engine.ping()
+        # None: todos los motores están ocupados buscando, luego responden
+        motor_responsive = ping is not False
+        if not motor_responsive:
             estado_motor = "degraded"
     
     return jsonify({
@@ -529,7 +981,17 @@ def health_check():
         'motor_activo': motor_activo,
         'motor_responsive': motor_responsive,
         'partidas_activas': len(partidas),
-        'partidas_terminadas': sum(1 for p in partidas.values() if p['board'].is_game_over()),
+        'partidas_terminadas': sum(1 for _, p in partidas.activas() if resultado_de(p) != '*'),
+        'almacen_partidas': partidas.estadisticas(),
+        'pool_motores': engine.estadisticas() if motor_activo else None,
+        'cola_motor': planificador.estadisticas() if planificador is not None else None,
+        'ponder': ponder.estadisticas() if ponder is not None else None,
+        'supervisor': supervisor.estadisticas() if supervisor is not None else None,
+        'cache_jugadas': cache_jugadas.estadisticas(),
+        'libro_aperturas': libro.estadisticas(),
+        'tablas_finales': tablas.estadisticas(),
+        'cuentas_motor': cuentas.estadisticas(),
+        'analisis_activos': len(analisis_activos),
         'timestamp': time.time(),
         'version': '1.1'
     })
@@ -592,9 +1054,6 @@ def internal_error(error):
 
 if __name__ == '__main__':
     if engine:
-        # Iniciar limpieza automática
-        iniciar_limpieza_periodica()
-        
         print("🚀 Servidor de Chess API iniciado!")
         print("📡 Disponible en: http://localhost:5000")
         print("🔧 Motor configurado desde: {}".format(CFISH_PATH))
@@ -0,0 +1,950 @@
+"""Variante asíncrona (ASGI) de `server_api.py` con la misma API REST.
+
+Los motores se manejan con el protocolo asíncrono de python-chess
+(`chess.engine.popen_uci`) dentro de un único bucle de eventos: cada
+búsqueda, long-poll o stream SSE es una corrutina en espera, no un hilo
+bloqueado, así que un proceso puede mantener miles de peticiones abiertas.
+Requiere Starlette y un servidor ASGI (dependencias opcionales):
+
+    pip install starlette uvicorn
+    uvicorn server_asgi:app --host 0.0.0.0 --port 5000
+"""
+import chess
+import chess.engine
+import asyncio
+import json
+import math
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.datastructures import Headers
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import FileResponse, HTMLResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+from starlette.staticfiles import StaticFiles
+
+from pool_motores import PoolAgotadoError
+from pool_motores_async import PoolMotoresAsync
+from supervisor_motores import SupervisorMotoresAsync
+from cache_jugadas import CacheJugadas
+from libro_aperturas import LibroAperturas
+from tablas_finales import TablasFinales
+from notificaciones import NotificadorPartidasAsync
+from tablero_json import tablero_a_json_compacto
+from estado_partida import estado_de, evento_partida, resultado_de
+from almacen_partidas import crear_almacen
+from partida import Partida
+from gestion_tiempo import TIEMPO_BASE, jugada_unica, limite_jugada, dificultad_valida
+from cuentas_motor import CuentasMotor, CuotaAgotadaError
+from analisis import (ParametrosInvalidosError, LineasAnalisis, RegistroAnalisis, limite_acotado,
+                      limite_desde_parametros, multipv_desde_parametros)
+from serializacion import codificar
+import metricas
+
+# Métricas Prometheus (expuestas en /metrics)
+registro = metricas.Registro()
+m_peticiones = registro.histograma('chess_peticion_segundos', 'Latencia por ruta', etiquetas=('ruta', 'metodo', 'codigo'))
+m_busqueda = registro.histograma('chess_motor_busqueda_segundos', 'Duración de las búsquedas del motor')
+m_espera_motor = registro.histograma('chess_motor_espera_segundos', 'Espera hasta obtener un motor libre')
+m_tablero = registro.histograma('chess_tablero_json_segundos', 'Serialización del tablero', etiquetas=('formato',))
+m_partidas = registro.contador('chess_partidas_creadas_total', 'Partidas creadas')
+m_jugadas = registro.contador('chess_jugadas_total', 'Jugadas realizadas', etiquetas=('jugador', 'origen'))
+m_analisis = registro.contador('chess_analisis_total', 'Análisis en streaming terminados', etiquetas=('fin',))
+m_codificacion = registro.histograma('chess_respuesta_codificacion_segundos', 'Codificación de las respuestas de la API',
+                                     buckets=metricas.BUCKETS_CODIFICACION, etiquetas=('formato', 'compresion'))
+m_bytes = registro.contador('chess_respuesta_bytes_total', 'Bytes enviados en las respuestas de la API', etiquetas=('formato', 'compresion'))
+
+# Configuración del motor (mismas variables de entorno que server_api.py)
+CFISH_PATH = os.environ.get("STOCKFISH_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "engines/Cfish_Linux", "Cfish 060821 x64 general"))
+DOCS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "docs")
+
+# Configuración de límites. Las partidas sin uso durante PARTIDAS_INACTIVIDAD
+# segundos se desalojan de memoria (se compactan o, con el almacén
+# 'niveles', pasan a disco) y se recargan en el siguiente acceso
+MAX_PARTIDAS = int(os.environ.get("MAX_PARTIDAS", "50000"))
+MAX_TIEMPO_PARTIDA = 24 * 60 * 60  # 24 horas
+INACTIVIDAD_PARTIDA = float(os.environ.get("PARTIDAS_INACTIVIDAD", "600"))
+INTERVALO_LIMPIEZA = 60
+
+# Pool de motores: número de procesos y memoria de hash total a repartir
+NUM_MOTORES = int(os.environ.get("MOTORES_POOL", "0")) or None  # None = núcleos / 2
+HASH_TOTAL_MB = int(os.environ.get("MOTOR_HASH_TOTAL_MB", "512"))
+TIMEOUT_MOTOR = 30  # segundos máximos esperando un motor libre
+
+# Supervisor del pool: procesos de reserva ya arrancados, máximo al que se
+# amplía el pool si hay jugadas esperando motor, plazo tras el que una
+# búsqueda se considera colgada y segundos entre revisiones
+MOTORES_RESERVA = int(os.environ.get("MOTORES_RESERVA", "1"))
+MOTORES_MAX = int(os.environ.get("MOTORES_MAX", "0")) or None  # None = sin ampliación
+PLAZO_BUSQUEDA = 30
+INTERVALO_SUPERVISOR = 5
+
+# Caché de jugadas del motor por posición (TTL en segundos, 0 = sin caducidad)
+CACHE_MAX_ENTRADAS = int(os.environ.get("CACHE_JUGADAS_MAX", "10000"))
+CACHE_TTL = float(os.environ.get("CACHE_JUGADAS_TTL", "0"))
+
+# Libro de aperturas Polyglot (.bin) consultado antes que el motor
+LIBRO_PATH = os.environ.get("LIBRO_APERTURAS")
+LIBRO_MAX_PLY = int(os.environ.get("LIBRO_MAX_PLY", "20"))
+
+# Tablas de finales Syzygy (directorios separados por ':'), consultadas antes
+# que el motor con pocas piezas; TABLAS_MAX_FDS = ficheros abiertos a la vez
+TABLAS_PATH = os.environ.get("TABLAS_FINALES")
+TABLAS_MAX_FDS = int(os.environ.get("TABLAS_MAX_FDS", "128"))
+
+# Jugadas del motor pendientes como máximo antes de rechazar con 503
+MAX_COLA_MOTOR = int(os.environ.get("MAX_COLA_MOTOR", "200"))
+
+# Presupuesto de búsqueda en nodos (0 = tiempo adaptativo) y cuentas de
+# segundos de motor por cliente y por partida (0 = sin límite)
+MOTOR_NODOS = int(os.environ.get("MOTOR_NODOS", "0"))
+CUOTA_MOTOR_CLIENTE = float(os.environ.get("CUOTA_MOTOR_CLIENTE", "0"))
+CUOTA_MOTOR_VENTANA = float(os.environ.get("CUOTA_MOTOR_VENTANA", "3600"))
+CUOTA_MOTOR_PARTIDA = float(os.environ.get("CUOTA_MOTOR_PARTIDA", "0"))
+CLIENTE_CABECERA = os.environ.get("CLIENTE_CABECERA")
+
+# Long-poll y SSE: espera máxima por petición y latido del stream (segundos)
+MAX_ESPERA_LONG_POLL = 30
+LATIDO_SSE = 15
+
+# Análisis en streaming: segundos máximos de cada análisis
+ANALISIS_TIEMPO_MAX = float(os.environ.get("ANALISIS_TIEMPO_MAX", "20"))
+
+# Respuestas: JSON (orjson) o MessagePack según `Accept`, comprimidas con
+# brotli o gzip según `Accept-Encoding` a partir de estos bytes (0 = nunca)
+COMPRESION_MIN_BYTES = int(os.environ.get("COMPRESION_MIN_BYTES", "1024"))
+
+# Almacén de partidas: 'memoria' (por defecto) o 'sqlite:///ruta/partidas.db'
+ALMACEN_PARTIDAS = os.environ.get("ALMACEN_PARTIDAS", "memoria")
+
+# Estado global del juego. Todo se ejecuta en el hilo del bucle de eventos,
+# así que no hace falta lock para las partidas.
+partidas = crear_almacen(ALMACEN_PARTIDAS)
+cache_jugadas = CacheJugadas(CACHE_MAX_ENTRADAS, CACHE_TTL)
+libro = LibroAperturas(LIBRO_PATH, LIBRO_MAX_PLY)
+tablas = TablasFinales(TABLAS_PATH, TABLAS_MAX_FDS)
+notificador = NotificadorPartidasAsync()
+cuentas = CuentasMotor(CUOTA_MOTOR_CLIENTE, CUOTA_MOTOR_VENTANA, CUOTA_MOTOR_PARTIDA)
+analisis_activos = RegistroAnalisis()  # clave: partida_id o ('fen', cliente)
+tareas_motor = {}  # partida_id -> tarea asyncio con la jugada del motor en curso
+engine = None  # PoolMotoresAsync, se inicia en el arranque de la aplicación
+supervisor = None  # SupervisorMotoresAsync del pool: ping, watchdog y reserva
+
+async def inicializar_motor():
+    """Inicializa el pool asíncrono de motores con manejo robusto de errores"""
+    try:
+        pool = PoolMotoresAsync(CFISH_PATH, num_motores=NUM_MOTORES, hash_total_mb=HASH_TOTAL_MB,
+                                reserva=MOTORES_RESERVA, max_motores=MOTORES_MAX, plazo_busqueda=PLAZO_BUSQUEDA)
+        if not await pool.iniciar():
+            print(f"❌ No se pudo iniciar ningún motor desde: {CFISH_PATH}")
+            return None
+
+        print(f"✅ Pool de motores asíncrono inicializado: {pool.estadisticas()['motores']} procesos")
+        return pool
+
+    except Exception as e:
+        print(f"❌ Error crítico iniciando motor: {e}")
+        return None
+
+async def cerrar_motor():
+    """Cancela las búsquedas en curso y cierra los motores"""
+    global engine, supervisor
+    for tarea in list(tareas_motor.values()):
+        tarea.cancel()
+    if supervisor is not None:
+        await supervisor.detener()
+        supervisor = None
+    if engine:
+        try:
+            await engine.cerrar()
+            print("✅ Motores de chess cerrados correctamente")
+        except Exception as e:
+            print(f"⚠️ Error cerrando motores: {e}")
+        finally:
+            engine = None
+
+def cancelar_motor(partida_id):
+    """Cancela la jugada del motor y el análisis pendientes de una partida reiniciada o eliminada"""
+    tarea = tareas_motor.pop(partida_id, None)
+    if tarea is not None:
+        tarea.cancel()
+    analisis_activos.cancelar(partida_id)
+
+def limpiar_partidas_antiguas():
+    """Elimina las partidas caducadas y desaloja de memoria las inactivas.
+
+    Trabaja con listas de ids que devuelve el almacén (no itera el
+    diccionario mientras otras peticiones lo modifican) y sin cargar las
+    partidas que están en disco.
+    """
+    partidas_a_eliminar = set(partidas.antiguas(time.time() - MAX_TIEMPO_PARTIDA))
+    if len(partidas) > MAX_PARTIDAS:
+        partidas_a_eliminar.update(partida_id for partida_id, partida in partidas.activas()
+                                   if resultado_de(partida) != '*')
+
+    for partida_id in partidas_a_eliminar:
+        try:
+            del partidas[partida_id]
+        except KeyError:
+            continue  # ya eliminada por otra petición
+        cancelar_motor(partida_id)
+        notificador.olvidar(partida_id)
+        print(f"🧹 Partida {partida_id} eliminada por limpieza automática")
+
+    # Sin uso desde hace INACTIVIDAD_PARTIDA segundos no tienen long-polls ni
+    # streams esperando (consultan la partida en cada latido): se suelta
+    # también su condición del notificador
+    desalojadas = partidas.desalojar(INACTIVIDAD_PARTIDA)
+    for partida_id in desalojadas:
+        notificador.olvidar(partida_id)
+    if desalojadas:
+        print(f"💤 {len(desalojadas)} partidas inactivas desalojadas de memoria")
+
+async def limpiar_periodicamente():
+    while True:
+        await asyncio.sleep(INTERVALO_LIMPIEZA)
+        try:
+            limpiar_partidas_antiguas()
+        except Exception as e:
+            print(f"❌ Error en la limpieza de partidas: {e}")
+
+@asynccontextmanager
+async def ciclo_vida(app):
+    """Arranca los motores, su supervisor y la limpieza periódica; los cierra al apagar"""
+    global engine, supervisor
+    engine = await inicializar_motor()
+    if engine is not None:
+        # Supervisor fuera del camino de las peticiones
+        supervisor = SupervisorMotoresAsync(engine, INTERVALO_SUPERVISOR)
+        await supervisor.iniciar()
+    limpieza = asyncio.create_task(limpiar_periodicamente())
+    try:
+        yield
+    finally:
+        limpieza.cancel()
+        await cerrar_motor()
+        partidas.cerrar()
+
+class RespuestaAPI(Response):
+    """Respuesta de la API en el formato negociado con la petición.
+
+    Equivalente a `serializacion.ProveedorJSON` de `server_api.py`: los datos
+    se codifican al enviarse, cuando ya se conocen las cabeceras `Accept` y
+    `Accept-Encoding` de la petición.
+    """
+
+    def __init__(self, content, status_code=200, headers=None, background=None):
+        self.datos = content
+        super().__init__(None, status_code, headers, None, background)
+
+    async def __call__(self, scope, receive, send):
+        cabeceras = Headers(scope=scope)
+        inicio = time.perf_counter()
+        self.body, tipo, compresion, formato = codificar(self.datos, cabeceras.get('accept'),
+                                                         cabeceras.get('accept-encoding'), COMPRESION_MIN_BYTES)
+        m_codificacion.observar(time.perf_counter() - inicio, formato=formato, compresion=compresion or 'ninguna')
+        m_bytes.inc(len(self.body), formato=formato, compresion=compresion or 'ninguna')
+
+        self.headers['content-type'] = tipo
+        self.headers['content-length'] = str(len(self.body))
+        if compresion:
+            self.headers['content-encoding'] = compresion
+        self.headers.add_vary_header('Accept')
+        self.headers.add_vary_header('Accept-Encoding')
+        await super().__call__(scope, receive, send)
+
+def error(mensaje, codigo, **extra):
+    return RespuestaAPI({'success': False, 'error': mensaje, **extra}, status_code=codigo)
+
+def tablero_respuesta(request, partida):
+    """Tablero en el formato pedido: completo (por defecto) o `?formato=compacto`.
+
+    En formato compacto `?desde=<ply>` envía solo las casillas cambiadas
+    desde esa jugada.
+    """
+    estado = estado_de(partida)
+    if request.query_params.get('formato') != 'compacto':
+        with m_tablero.medir(formato='completo'):
+            return estado.tablero()
+
+    desde = request.query_params.get('desde')
+    try:
+        desde_ply = int(desde) if desde is not None else None
+    except ValueError:
+        desde_ply = None
+    with m_tablero.medir(formato='compacto'):
+        return tablero_a_json_compacto(partida.board, desde_ply, estado.resumen())
+
+def cliente_peticion(request):
+    """Cliente al que se cargan las búsquedas de sus partidas (cabecera CLIENTE_CABECERA o IP)"""
+    if CLIENTE_CABECERA and request.headers.get(CLIENTE_CABECERA):
+        return request.headers[CLIENTE_CABECERA]
+    return request.client.host if request.client else None
+
+async def nueva_partida(request):
+    """Crea una nueva partida contra Cfish"""
+    try:
+        # Limpieza automática antes de crear nueva partida
+        if len(partidas) >= MAX_PARTIDAS:
+            limpiar_partidas_antiguas()
+
+        # Dificultad opcional: 'facil', 'normal' (por defecto) o 'dificil'
+        try:
+            data = await request.json()
+        except ValueError:
+            data = None
+        dificultad = dificultad_valida(data.get('dificultad') if isinstance(data, dict) else None)
+
+        partida_id = str(uuid.uuid4())
+        partidas[partida_id] = Partida(jugador_color='white', dificultad=dificultad,  # Humano juega con blancas
+                                       cliente=cliente_peticion(request))
+        m_partidas.inc()
+
+        print(f"🎮 Nueva partida creada: {partida_id} (dificultad {dificultad})")
+
+        return RespuestaAPI({
+            'success': True,
+            'partida_id': partida_id,
+            'dificultad': dificultad,
+            'tablero': tablero_respuesta(request, partidas[partida_id]),
+            'mensaje': 'Partida creada. Eres las blancas!'
+        })
+
+    except Exception as e:
+        print(f"❌ Error en nueva_partida: {e}")
+        return error('Error interno del servidor', 500)
+
+async def obtener_estado(request):
+    """Obtiene el estado actual de una partida con información extendida"""
+    partida_id = request.path_params['partida_id']
+    try:
+        if partida_id not in partidas:
+            return error('Partida no encontrada', 404)
+
+        partida = partidas[partida_id]
+        board = partida.board
+        derivado = estado_de(partida)
+
+        estado = {
+            'success': True,
+            'partida_id': partida_id,
+            'tablero': tablero_respuesta(request, partida),
+            'historial': partida.historial(10),  # Últimos 10 movimientos
+            'es_turno_humano': board.turn == chess.WHITE,
+            'juego_terminado': derivado.terminado,
+            'movimientos_totales': partida.num_entradas,
+            'consumo_motor': cuentas.consumo(partida),
+            'motor_activo': engine is not None
+        }
+
+        if derivado.terminado:
+            outcome = derivado.outcome
+            estado['resultado'] = derivado.resultado
+            estado['terminacion'] = str(outcome.termination) if outcome else 'unknown'
+            estado['ganador'] = 'blancas' if outcome and outcome.winner == chess.WHITE else \
+                              'negras' if outcome and outcome.winner == chess.BLACK else 'tablas'
+
+        return RespuestaAPI(estado)
+
+    except Exception as e:
+        print(f"❌ Error en obtener_estado: {e}")
+        return error('Error interno del servidor', 500)
+
+async def jugar_movimiento(request):
+    """Ejecuta un movimiento del jugador humano y lanza la respuesta del motor"""
+    partida_id = request.path_params['partida_id']
+    try:
+        # Validar partida
+        if partida_id not in partidas:
+            return error('Partida no encontrada', 404)
+
+        # Validar datos de entrada
+        try:
+            data = await request.json()
+        except ValueError:
+            data = None
+        if not isinstance(data, dict) or 'movimiento' not in data:
+            return error('Movimiento no proporcionado', 400)
+
+        movimiento_uci = str(data.get('movimiento', '')).strip().lower()
+
+        # Validar formato básico
+        if len(movimiento_uci) < 4 or len(movimiento_uci) > 5:
+            return error('Formato de movimiento inválido', 400)
+
+        # La partida puede haberse eliminado mientras se leía el cuerpo
+        partida = partidas.get(partida_id)
+        if partida is None:
+            return error('Partida no encontrada', 404)
+        board = partida.board
+        derivado = estado_de(partida)
+
+        # Verificar que el juego no ha terminado
+        if derivado.terminado:
+            return error('La partida ha terminado', 400, resultado=derivado.resultado)
+
+        # Verificar que es turno del humano
+        if board.turn != chess.WHITE:
+            return error('No es tu turno', 400, es_turno_humano=False)
+
+        # Validar movimiento
+        try:
+            move = chess.Move.from_uci(movimiento_uci)
+            if not derivado.es_legal(move):
+                return error('Movimiento ilegal', 400, jugadas_legales=derivado.jugadas_legales)
+        except ValueError as ve:
+            return error(f'Formato de movimiento inválido: {str(ve)}', 400)
+
+        # Si la partida o su cliente han agotado su cuota de motor, o ya hay
+        # demasiadas jugadas del motor pendientes, se rechaza antes de mover
+        # para que el cliente pueda reintentarla
+        if engine is not None:
+            try:
+                cuentas.comprobar(partida.cliente, partida)
+            except CuotaAgotadaError as e:
+                print(f"💸 Cuota de motor agotada ({e.ambito}), jugada rechazada en partida {partida_id}")
+                respuesta = error(str(e), 429, cuota=e.ambito, retry_after=e.retry_after)
+                if e.retry_after is not None:
+                    respuesta.headers['Retry-After'] = str(e.retry_after)
+                return respuesta
+        if engine is not None and len(tareas_motor) >= MAX_COLA_MOTOR:
+            retry_after = max(1, math.ceil(len(tareas_motor) * TIEMPO_BASE / engine.estadisticas()['motores']))
+            print(f"⏳ Cola del motor llena, jugada rechazada en partida {partida_id}")
+            respuesta = error('Servidor ocupado, reintenta en unos segundos', 503, retry_after=retry_after)
+            respuesta.headers['Retry-After'] = str(retry_after)
+            return respuesta
+
+        # Ejecutar movimiento humano (la SAN se calcula antes de mover)
+        notacion_san = board.san(move)
+        partida.jugar(move, 'humano')
+        analisis_activos.cancelar(partida_id)  # el de la posición anterior ya no sirve
+        # Guardada antes de lanzar la respuesta del motor, con su índice
+        partidas.registrar_entrada(partida_id, *partida.ultima_entrada_numerada())
+
+        motor_encolado = False
+        if not derivado.terminado and engine is not None:
+            tareas_motor[partida_id] = asyncio.create_task(jugar_motor(partida_id, partida))
+            motor_encolado = True
+
+        notificador.notificar(partida_id)
+        m_jugadas.inc(jugador='humano', origen='humano')
+        print(f"👤 Jugador jugó: {movimiento_uci} ({notacion_san}) en partida {partida_id}")
+
+        # Preparar respuesta
+        respuesta = {
+            'success': True,
+            'movimiento_ejecutado': movimiento_uci,
+            'notacion': notacion_san,
+            'tablero': tablero_respuesta(request, partida),
+            'juego_terminado': derivado.terminado,
+            'es_turno_humano': False  # Ahora es turno del motor
+        }
+
+        # Manejar fin del juego
+        if derivado.terminado:
+            resultado = derivado.resultado
+            respuesta['resultado'] = resultado
+            respuesta['mensaje'] = f'Partida terminada: {resultado}'
+            print(f"🏁 Partida {partida_id} terminada: {resultado}")
+        elif motor_encolado:
+            respuesta['motor_pensando'] = True
+            respuesta['mensaje'] = 'Cfish está pensando...'
+        else:
+            respuesta['error'] = 'Motor no disponible'
+            respuesta['motor_pensando'] = False
+
+        return RespuestaAPI(respuesta)
+
+    except Exception as e:
+        print(f"❌ Error en jugar_movimiento: {e}")
+        return error('Error interno del servidor', 500)
+
+def carga_motor():
+    """Jugadas del motor pendientes por proceso (acorta las búsquedas con mucha cola)"""
+    if engine is None or not engine.disponible():
+        return 0.0
+    motores = engine.estadisticas()['motores']
+    return max(0, len(tareas_motor) - motores) / motores
+
+async def jugar_motor(partida_id, partida):
+    """Jugada del motor como corrutina: jugada única, libro, tablas de finales, caché o búsqueda en el pool"""
+    board = partida.board
+
+    try:
+        if estado_de(partida).terminado or board.turn == chess.WHITE or engine is None:
+            return
+
+        print(f"🤖 Motor pensando en partida {partida_id}...")
+
+        origen, move_directo = 'unica', jugada_unica(board)
+        if move_directo is None:
+            origen, move_directo = 'libro', libro.elegir_jugada(board)
+        if move_directo is None:
+            origen, move_directo = 'tablas', tablas.elegir_jugada(board)
+        if move_directo is not None:
+            result = chess.engine.PlayResult(move_directo, None)
+        else:
+            origen = 'cache'
+            limit = limite_jugada(board, partida.dificultad, carga_motor(), nodos_base=MOTOR_NODOS)
+            result = cache_jugadas.obtener(board, limit)
+        if result is None:
+            origen = 'motor'
+            inicio_espera = time.perf_counter()
+            async with engine.usar(timeout=TIMEOUT_MOTOR) as motor:
+                m_espera_motor.observar(time.perf_counter() - inicio_espera)
+                inicio_busqueda = time.perf_counter()
+                try:
+                    with m_busqueda.medir():
+                        result = await motor.play(board, limit)
+                finally:
+                    # La búsqueda se carga a la partida y a su cliente
+                    consumo = time.perf_counter() - inicio_busqueda
+                    cuentas.cargar(partida.cliente, partida, consumo)
+                    partidas.registrar_consumo(partida_id, partida, consumo)
+            if result.move is not None:
+                cache_jugadas.guardar(board, limit, result)
+
+        if result.move is None:
+            print(f"⚠️ Motor no devolvió movimiento en partida {partida_id}")
+            return
+
+        move = result.move
+
+        # Verificar que el movimiento es legal
+        if not estado_de(partida).es_legal(move):
+            print(f"❌ Movimiento ilegal del motor: {move.uci()}")
+            return
+
+        # Descartar el resultado si la partida se reinició o eliminó mientras
+        # el motor pensaba
+        if partidas.get(partida_id) is not partida:
+            print(f"🗑️ Resultado descartado: partida {partida_id} reiniciada o eliminada")
+            return
+
+        # Ejecutar movimiento
+        notacion_san = board.san(move)
+        partida.jugar(move, 'motor')
+        partidas.registrar_entrada(partida_id, *partida.ultima_entrada_numerada())
+        analisis_activos.cancelar(partida_id)
+
+        notificador.notificar(partida_id)
+        m_jugadas.inc(jugador='motor', origen=origen)
+        print(f"🤖 Motor jugó: {move.uci()} ({notacion_san}) en partida {partida_id}")
+
+    except asyncio.CancelledError:
+        print(f"🗑️ Búsqueda cancelada: partida {partida_id} reiniciada o eliminada")
+        raise
+    except PoolAgotadoError:
+        print(f"⏳ Ningún motor libre a tiempo para la partida {partida_id}")
+    except chess.engine.EngineTerminatedError:
+        print(f"❌ Motor terminado inesperadamente en partida {partida_id}")
+    except Exception as e:
+        print(f"❌ Error del motor en partida {partida_id}: {e}")
+    finally:
+        if tareas_motor.get(partida_id) is asyncio.current_task():
+            del tareas_motor[partida_id]
+
+async def esperar_cambio(partida_id, partida, desde_ply, timeout):
+    """Espera hasta que la partida pase de `desde_ply` o sea reiniciada/eliminada"""
+    return await notificador.esperar(
+        partida_id,
+        lambda: partidas.get(partida_id) is not partida or partida.num_jugadas != desde_ply,
+        timeout
+    )
+
+async def esperar_jugada(request):
+    """Long-poll: responde en cuanto la partida supera la jugada `desde` o vence el timeout"""
+    partida_id = request.path_params['partida_id']
+    try:
+        if partida_id not in partidas:
+            return error('Partida no encontrada', 404)
+
+        partida = partidas[partida_id]
+        try:
+            desde_ply = int(request.query_params.get('desde', partida.num_jugadas))
+            timeout = min(float(request.query_params.get('timeout', MAX_ESPERA_LONG_POLL)), MAX_ESPERA_LONG_POLL)
+        except ValueError:
+            return error('Parámetros desde/timeout inválidos', 400)
+
+        cambio = await esperar_cambio(partida_id, partida, desde_ply, timeout)
+
+        partida = partidas.get(partida_id)
+        if partida is None:
+            return error('Partida no encontrada', 404)
+
+        evento = evento_partida(partida_id, partida)
+        evento['success'] = True
+        evento['cambio'] = cambio
+        return RespuestaAPI(evento)
+
+    except Exception as e:
+        print(f"❌ Error en esperar_jugada: {e}")
+        return error('Error interno del servidor', 500)
+
+async def eventos_partida(request):
+    """Stream Server-Sent Events con cada movimiento de la partida"""
+    partida_id = request.path_params['partida_id']
+    if partida_id not in partidas:
+        return error('Partida no encontrada', 404)
+
+    async def generar():
+        partida = partidas.get(partida_id)
+        ply = None
+        while partida is not None:
+            if ply is not None and not await esperar_cambio(partida_id, partida, ply, LATIDO_SSE):
+                yield ': latido\n\n'
+                continue
+
+            partida = partidas.get(partida_id)
+            if partida is None:
+                yield 'event: eliminada\ndata: {}\n\n'
+                return
+
+            evento = evento_partida(partida_id, partida)
+            ply = evento['ply']
+            yield f"event: jugada\ndata: {json.dumps(evento)}\n\n"
+            if evento['juego_terminado']:
+                return
+
+    return StreamingResponse(
+        generar(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def respuesta_analisis(request, clave, board, cliente, partida=None):
+    """Stream SSE con la evaluación de `board` según profundiza el motor.
+
+    Mismos eventos que en `server_api.py`: `info` por profundidad con las
+    líneas MultiPV, y `fin` con la mejor jugada o `cancelado`. Si el cliente
+    se desconecta, Starlette cancela el generador y el motor vuelve al pool.
+    """
+    try:
+        limite = limite_acotado(limite_desde_parametros(request.query_params, ANALISIS_TIEMPO_MAX),
+                                ANALISIS_TIEMPO_MAX)
+        multipv = multipv_desde_parametros(request.query_params)
+    except ParametrosInvalidosError as e:
+        return error(str(e), 400)
+    if board.is_game_over():
+        return error('La partida ha terminado', 400, resultado=board.result())
+    if engine is None:
+        return error('Análisis no disponible', 503)
+    try:
+        cuentas.comprobar(cliente, partida)
+    except CuotaAgotadaError as e:
+        respuesta = error(str(e), 429, cuota=e.ambito, retry_after=e.retry_after)
+        if e.retry_after is not None:
+            respuesta.headers['Retry-After'] = str(e.retry_after)
+        return respuesta
+
+    async def generar():
+        lineas = LineasAnalisis(board, multipv)
+        cancelado = False
+        fin = 'desconectado'
+        inicio = None
+        try:
+            async with engine.usar(timeout=TIMEOUT_MOTOR) as motor:
+                inicio = time.perf_counter()
+                with await motor.analysis(board, limite, multipv=multipv) as analisis:
+                    def parar():
+                        nonlocal cancelado
+                        cancelado = True
+                        analisis.stop()
+                    token = analisis_activos.registrar(clave, parar)
+                    try:
+                        async for info in analisis:
+                            actualizacion = lineas.anadir(info)
+                            if actualizacion is not None:
+                                yield f"event: info\ndata: {json.dumps(actualizacion)}\n\n"
+                        mejor = (await analisis.wait()).move
+                    finally:
+                        analisis_activos.quitar(clave, token)
+            if cancelado:
+                fin = 'cancelado'
+                yield 'event: cancelado\ndata: {}\n\n'
+            else:
+                fin = 'completo'
+                final = lineas.actualizacion()
+                final['mejor'] = mejor.uci() if mejor else None
+                yield f"event: fin\ndata: {json.dumps(final)}\n\n"
+        except PoolAgotadoError:
+            fin = 'sin_motor'
+            yield f"event: error\ndata: {json.dumps({'error': 'Ningún motor libre, reintenta en unos segundos'})}\n\n"
+        except chess.engine.EngineError as e:
+            fin = 'error'
+            print(f"❌ Error del motor analizando {board.fen()}: {e}")
+            yield f"event: error\ndata: {json.dumps({'error': 'Error del motor'})}\n\n"
+        finally:
+            if inicio is not None:
+                consumo = time.perf_counter() - inicio
+                cuentas.cargar(cliente, partida, consumo)
+                if partida is not None:
+                    partidas.registrar_consumo(clave, partida, consumo)
+            m_analisis.inc(fin=fin)
+
+    return StreamingResponse(
+        generar(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+async def analizar_partida(request):
+    """Análisis en streaming de la posición actual de una partida (?multipv=&depth=&nodes=&time=)"""
+    partida_id = request.path_params['partida_id']
+    partida = partidas.get(partida_id)
+    if partida is None:
+        return error('Partida no encontrada', 404)
+    return respuesta_analisis(request, partida_id, partida.board.copy(), partida.cliente, partida)
+
+async def analizar_fen(request):
+    """Análisis en streaming de una posición cualquiera (?fen=...&multipv=...)"""
+    fen = request.query_params.get('fen', '').strip()
+    if not fen:
+        return error('FEN no proporcionado', 400)
+    try:
+        board = chess.Board(fen)
+    except ValueError:
+        return error('FEN inválido', 400)
+    cliente = cliente_peticion(request)
+    return respuesta_analisis(request, ('fen', cliente), board, cliente)
+
+async def obtener_jugadas_legales(request):
+    """Obtiene todas las jugadas legales para una posición"""
+    partida_id = request.path_params['partida_id']
+    try:
+        if partida_id not in partidas:
+            return error('Partida no encontrada', 404)
+
+        board = partidas[partida_id].board
+        derivado = estado_de(partidas[partida_id])
+        jugadas = [] if derivado.terminado else derivado.jugadas_legales
+
+        return RespuestaAPI({
+            'success': True,
+            'jugadas_legales': jugadas,
+            'es_turno_humano': board.turn == chess.WHITE,
+            'total_jugadas': len(jugadas),
+            'juego_terminado': derivado.terminado
+        })
+
+    except Exception as e:
+        print(f"❌ Error en obtener_jugadas_legales: {e}")
+        return error('Error interno del servidor', 500)
+
+async def rendirse(request):
+    """El jugador se rinde"""
+    partida_id = request.path_params['partida_id']
+    try:
+        if partida_id not in partidas:
+            return error('Partida no encontrada', 404)
+
+        partida = partidas[partida_id]
+        partida.registrar_evento('El jugador se rindió')
+        partidas.registrar_entrada(partida_id, *partida.ultima_entrada_numerada())
+
+        return RespuestaAPI({
+            'success': True,
+            'mensaje': 'Te has rendido',
+            'resultado': '0-1'
+        })
+
+    except Exception as e:
+        print(f"❌ Error en rendirse: {e}")
+        return error('Error interno del servidor', 500)
+
+async def listar_partidas(request):
+    """Lista todas las partidas activas"""
+    try:
+        partidas_lista = []
+        # Solo las partidas en memoria: las inactivas no se cargan para listarlas
+        for pid, partida in partidas.activas():
+            resultado = resultado_de(partida)  # sin reconstruir el tablero de las compactadas
+            partidas_lista.append({
+                'partida_id': pid,
+                'creado': partida.creado,
+                'movimientos': partida.num_entradas,
+                'terminada': resultado != '*',
+                'resultado': resultado if resultado != '*' else 'en_progreso',
+                'ultimo_movimiento': partida.ultima_entrada()
+            })
+
+        return RespuestaAPI({
+            'success': True,
+            'partidas': sorted(partidas_lista, key=lambda x: x['creado'], reverse=True),
+            'total': len(partidas_lista),
+            'inactivas': len(partidas) - len(partidas_lista),
+            'limite': MAX_PARTIDAS
+        })
+
+    except Exception as e:
+        print(f"❌ Error en listar_partidas: {e}")
+        return error('Error interno del servidor', 500)
+
+async def reiniciar_partida(request):
+    """Reinicia una partida existente"""
+    partida_id = request.path_params['partida_id']
+    try:
+        if partida_id not in partidas:
+            return error('Partida no encontrada', 404)
+
+        # La búsqueda pendiente de la partida anterior ya no vale
+        cancelar_motor(partida_id)
+
+        anterior = partidas[partida_id]
+        partidas[partida_id] = Partida(
+            jugador_color='white', dificultad=anterior.dificultad, cliente=anterior.cliente
+        )
+
+        notificador.notificar(partida_id)
+
+        return RespuestaAPI({
+            'success': True,
+            'mensaje': 'Partida reiniciada',
+            'tablero': tablero_respuesta(request, partidas[partida_id])
+        })
+
+    except Exception as e:
+        print(f"❌ Error en reiniciar_partida: {e}")
+        return error('Error interno del servidor', 500)
+
+async def info_api(request):
+    """Información sobre la API"""
+    return RespuestaAPI({
+        'name': 'Chess Cfish API',
+        'version': '1.1',
+        'engine': 'Cfish',
+        'servidor': 'asgi',
+        'motor_activo': engine is not None,
+        'partidas_activas': len(partidas),
+        'limite_partidas': MAX_PARTIDAS,
+        'endpoints': {
+            'nueva_partida': 'POST /api/nueva-partida',
+            'estado': 'GET /api/estado/<partida_id>',
+            'jugar': 'POST /api/jugar/<partida_id>',
+            'jugadas_legales': 'GET /api/jugadas-legales/<partida_id>',
+            'esperar': 'GET /api/esperar/<partida_id>?desde=<ply>&timeout=<s>',
+            'eventos': 'GET /api/eventos/<partida_id> (SSE)',
+            'analizar': 'GET /api/analizar/<partida_id>?multipv=<n>&depth=<d> (SSE)',
+            'analizar_fen': 'GET /api/analizar?fen=<fen>&multipv=<n> (SSE)',
+            'rendirse': 'POST /api/rendirse/<partida_id>',
+            'partidas': 'GET /api/partidas',
+            'reiniciar': 'POST /api/reiniciar/<partida_id>',
+            'health': 'GET /api/health',
+            'metrics': 'GET /metrics',
+            'info': 'GET /api/info'
+        }
+    })
+
+def _estadistica_pool(campo):
+    return engine.estadisticas()[campo] if engine is not None else None
+
+registro.calculada('chess_motor_reinicios_total', 'Reinicios de procesos del motor', lambda: _estadistica_pool('reinicios'), 'counter')
+registro.calculada('chess_motor_colgados_total', 'Búsquedas cortadas por el watchdog',
+                   lambda: supervisor.colgados if supervisor is not None else None, 'counter')
+registro.calculada('chess_motores_reserva', 'Procesos de reserva ya arrancados', lambda: _estadistica_pool('reserva'))
+registro.calculada('chess_motores_en_uso', 'Motores buscando ahora mismo', lambda: _estadistica_pool('en_uso'))
+registro.calculada('chess_cola_motor_pendientes', 'Jugadas del motor pendientes', lambda: len(tareas_motor))
+registro.calculada('chess_cache_aciertos_total', 'Aciertos de la caché de jugadas', lambda: cache_jugadas.aciertos, 'counter')
+registro.calculada('chess_cache_fallos_total', 'Fallos de la caché de jugadas', lambda: cache_jugadas.fallos, 'counter')
+registro.calculada('chess_libro_aciertos_total', 'Jugadas servidas por el libro de aperturas', lambda: libro.aciertos, 'counter')
+registro.calculada('chess_tablas_consultas_total', 'Consultas a las tablas de finales', lambda: tablas.consultas, 'counter')
+registro.calculada('chess_tablas_aciertos_total', 'Jugadas servidas por las tablas de finales', lambda: tablas.aciertos, 'counter')
+registro.calculada('chess_tablas_consulta_segundos_total', 'Tiempo total de las consultas a las tablas de finales', lambda: tablas.tiempo_total, 'counter')
+registro.calculada('chess_motor_consumo_segundos_total', 'Segundos de motor cargados a las cuentas de partidas y clientes',
+                   lambda: cuentas.segundos_total, 'counter')
+registro.calculada('chess_cuota_cliente_rechazos_total', 'Jugadas rechazadas por cuota de motor del cliente agotada',
+                   lambda: cuentas.rechazos_cliente, 'counter')
+registro.calculada('chess_cuota_partida_rechazos_total', 'Jugadas rechazadas por cuota de motor de la partida agotada',
+                   lambda: cuentas.rechazos_partida, 'counter')
+registro.calculada('chess_partidas_activas', 'Partidas en el almacén', lambda: len(partidas))
+
+async def metrics(request):
+    """Métricas en formato de texto Prometheus"""
+    return Response(registro.exponer(), media_type=metricas.CONTENT_TYPE)
+
+async def health_check(request):
+    """Verifica que el servidor y motor estén funcionando"""
+    motor_activo = engine is not None
+    estado_motor = "healthy" if motor_activo else "degraded"
+
+    # Verificar que el motor responde con la última revisión del supervisor,
+    # sin hablar con ningún motor
+    motor_responsive = False
+    if supervisor is not None:
+        motor_responsive = supervisor.sano()
+        if not motor_responsive:
+            estado_motor = "degraded"
+
+    return RespuestaAPI({
+        'status': estado_motor,
+        'motor_activo': motor_activo,
+        'motor_responsive': motor_responsive,
+        'partidas_activas': len(partidas),
+        'partidas_terminadas': sum(1 for _, p in partidas.activas() if resultado_de(p) != '*'),
+        'almacen_partidas': partidas.estadisticas(),
+        'pool_motores': engine.estadisticas() if motor_activo else None,
+        'jugadas_motor_pendientes': len(tareas_motor),
+        'supervisor': supervisor.estadisticas() if supervisor is not None else None,
+        'cache_jugadas': cache_jugadas.estadisticas(),
+        'libro_aperturas': libro.estadisticas(),
+        'tablas_finales': tablas.estadisticas(),
+        'cuentas_motor': cuentas.estadisticas(),
+        'analisis_activos': len(analisis_activos),
+        'timestamp': time.time(),
+        'version': '1.1'
+    })
+
+async def index(request):
+    """Sirve el manual HTML"""
+    manual = os.path.join(DOCS_PATH, 'manual.html')
+    if os.path.exists(manual):
+        return FileResponse(manual)
+    return HTMLResponse("<h1>♟️ Chess Cfish API</h1><p>Ver <a href=\"/api/info\">/api/info</a></p>")
+
+async def no_encontrado(request, exc):
+    return error('Endpoint no encontrado', 404)
+
+async def metodo_no_permitido(request, exc):
+    return error('Método no permitido', 405)
+
+async def error_interno(request, exc):
+    return error('Error interno del servidor', 500)
+
+app = Starlette(
+    routes=[
+        Route('/api/nueva-partida', nueva_partida, methods=['POST']),
+        Route('/api/estado/{partida_id}', obtener_estado, methods=['GET']),
+        Route('/api/jugar/{partida_id}', jugar_movimiento, methods=['POST']),
+        Route('/api/esperar/{partida_id}', esperar_jugada, methods=['GET']),
+        Route('/api/eventos/{partida_id}', eventos_partida, methods=['GET']),
+        Route('/api/analizar/{partida_id}', analizar_partida, methods=['GET']),
+        Route('/api/analizar', analizar_fen, methods=['GET']),
+        Route('/api/jugadas-legales/{partida_id}', obtener_jugadas_legales, methods=['GET']),
+        Route('/api/rendirse/{partida_id}', rendirse, methods=['POST']),
+        Route('/api/partidas', listar_partidas, methods=['GET']),
+        Route('/api/reiniciar/{partida_id}', reiniciar_partida, methods=['POST']),
+        Route('/api/info', info_api, methods=['GET']),
+        Route('/api/health', health_check, methods=['GET']),
+        Route('/metrics', metrics, methods=['GET']),
+        Route('/', index),
+        Mount('/docs', StaticFiles(directory=DOCS_PATH, check_dir=False)),
+    ],
+    middleware=[
+        Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*']),  # Permitir requests desde web/Android
+        Middleware(metricas.InstrumentarASGI, histograma=m_peticiones),
+    ],
+    exception_handlers={404: no_encontrado, 405: metodo_no_permitido, 500: error_interno},
+    lifespan=ciclo_vida,
+)
+
+if __name__ == '__main__':
+    import uvicorn
+
+    print("🚀 Servidor de Chess API (ASGI) iniciado!")
+    print("📡 Disponible en: http://localhost:5000")
+    print("🔧 Motor configurado desde: {}".format(CFISH_PATH))
+    uvicorn.run(app, host='0.0.0.0', port=5000)
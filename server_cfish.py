@@ -1,6 +1,7 @@
 import chess
 import chess.engine
 import os
+from gestion_tiempo import jugada_unica, limite_jugada
 
 # Configuración correcta
 CFISH_PATH = os.environ.get("STOCKFISH_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "engines/Cfish_Linux", "Cfish 060821 x64 general"))
@@ -52,12 +53,11 @@ def jugar_vs_cfish():
                 # Motor Cfish
                 print("🤖 Cfish pensando...")
                 try:
-                    # Usar un tiempo razonable para la búsqueda
-                    result = engine.play(
-                        board, 
-                        chess.engine.Limit(time=2.0)
-                    )
-                    move = result.move
+                    # Tiempo de búsqueda según la posición; sin buscar si solo hay una jugada
+                    move = jugada_unica(board)
+                    if move is None:
+                        result = engine.play(board, limite_jugada(board))
+                        move = result.move
                     print(f"✅ Cfish juega: {move.uci()}")
                     
                 except Exception as e:
@@ -2,81 +2,260 @@ import chess
 import chess.engine
 import os
 import atexit
+import json
 import logging
-from flask import Flask, request, jsonify
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
+from pool_motores import PoolMotores
+from supervisor_motores import SupervisorMotores
+from analisis import (ParametrosInvalidosError, limite_acotado, limite_desde_parametros, multipv_desde_parametros,
+                      info_a_dict, posiciones_desde_pgn)
+from cache_jugadas import CacheJugadas
+from libro_aperturas import LibroAperturas
+from tablas_finales import TablasFinales
+from gestion_tiempo import jugada_unica, limite_jugada
+from cuentas_motor import CuentasMotor, CuotaAgotadaError
+from serializacion import ProveedorJSON
+import metricas
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 # --- Clase para encapsular la lógica de Stockfish ---
 class StockfishEngine:
-    """Una clase para gestionar la instancia del motor Stockfish."""
-    def __init__(self, path):
+    """Una clase para gestionar la instancia del motor Stockfish.
+
+    El proceso vive en un `PoolMotores` de un solo motor con procesos de
+    reserva ya arrancados, y un `SupervisorMotores` lo vigila (ping, plazo
+    de búsqueda) para reemplazarlo sin esperar a que falle una petición.
+    Con `nodos_base` las búsquedas tienen un presupuesto de nodos en lugar
+    de tiempo, y con `cuentas` su duración se carga al cliente que la pide.
+    """
+    def __init__(self, path, cache=None, libro=None, m_busqueda=None, reserva=1, plazo_busqueda=30, tablas=None,
+                 nodos_base=None, cuentas=None):
         self.path = path
-        self.engine = None
+        self.pool = None
+        self.supervisor = None
+        self.cache = cache
+        self.libro = libro
+        self.tablas = tablas
+        self.nodos_base = nodos_base
+        self.cuentas = cuentas
+        self.m_busqueda = m_busqueda
+        self.reserva = reserva
+        self.plazo_busqueda = plazo_busqueda
+        self.llamadas_motor = 0
+        self._reinicios = 0
         self.initialize()
 
     def initialize(self):
         """Inicializa o reinicializa el motor de ajedrez."""
-        if self.engine:
-            try:
-                self.engine.quit()
-            except chess.engine.EngineTerminatedError:
-                logging.warning("El motor ya estaba terminado antes de intentar cerrarlo.")
+        if self.pool is not None:
+            self._reinicios += 1
+            self.close()
         
         try:
             logging.info(f"Inicializando Stockfish desde: {self.path}")
-            self.engine = chess.engine.SimpleEngine.popen_uci(self.path)
-            self.engine.configure({"Skill Level": 10})  # Nivel máximo
+            pool = PoolMotores(
+                self.path, num_motores=1, hash_total_mb=16,
+                opciones={"Skill Level": 10, "Threads": 1},
+                reserva=self.reserva, plazo_busqueda=self.plazo_busqueda
+            )
+            if not pool.iniciar():
+                logging.error("Error crítico inicializando Stockfish: no arrancó ningún proceso.")
+                return False
+            self.pool = pool
+            self.supervisor = SupervisorMotores(pool)
+            self.supervisor.iniciar()
             logging.info("Stockfish inicializado correctamente.")
             return True
         except Exception as e:
             logging.error(f"Error crítico inicializando Stockfish: {e}")
-            self.engine = None
             return False
 
-    def get_best_move(self, board, time_limit=2.0):
-        """Calcula la mejor jugada para una posición dada."""
+    @property
+    def reinicios(self):
+        """Reinicios manuales más los procesos reemplazados por el supervisor"""
+        return self._reinicios + (self.pool.estadisticas()["reinicios"] if self.pool is not None else 0)
+
+    def get_best_move(self, board, time_limit=None, dificultad=None, cliente=None):
+        """Calcula la mejor jugada para una posición dada.
+
+        Sin `time_limit` la búsqueda tiene un presupuesto de nodos según la
+        posición y la dificultad o, sin `nodos_base`, un tiempo adaptado
+        también a las búsquedas que esperan el motor.
+        """
         if not self.is_ready():
             logging.error("Intento de obtener jugada pero el motor no está listo.")
             raise chess.engine.EngineTerminatedError("El motor no está inicializado.")
         
+        # Con una sola jugada legal no hay nada que buscar
+        move = jugada_unica(board)
+        if move is not None:
+            return move
+
+        if self.libro is not None:
+            move = self.libro.elegir_jugada(board)
+            if move is not None:
+                return move
+
+        # Con pocas piezas las tablas de finales dan la jugada exacta
+        if self.tablas is not None:
+            move = self.tablas.elegir_jugada(board)
+            if move is not None:
+                return move
+
+        if time_limit is not None:
+            limit = chess.engine.Limit(time=time_limit)
+        else:
+            limit = limite_jugada(board, dificultad, carga=self.pool.estadisticas()["en_espera"],
+                                  nodos_base=self.nodos_base)
+        if self.cache is not None:
+            move = self.cache.obtener(board, limit)
+            if move is not None:
+                return move
+
         try:
-            result = self.engine.play(board, chess.engine.Limit(time=time_limit))
+            # Un único proceso UCI: las búsquedas concurrentes esperan su turno
+            with self.pool.usar() as motor:
+                self.llamadas_motor += 1
+                inicio = time.perf_counter()
+                try:
+                    result = motor.play(board, limit)
+                finally:
+                    duracion = time.perf_counter() - inicio
+                    if self.cuentas is not None:
+                        self.cuentas.cargar(cliente, None, duracion)
+                if self.m_busqueda is not None:
+                    self.m_busqueda.observar(duracion)
+            if self.cache is not None and result.move is not None:
+                self.cache.guardar(board, limit, result.move)
             return result.move
         except chess.engine.EngineTerminatedError as e:
+            # El pool ya lo ha sustituido por un proceso de reserva
             logging.error(f"El motor se ha terminado inesperadamente: {e}")
-            # Intentar reinicializar para la próxima solicitud
-            self.initialize()
             raise  # Relanzar la excepción para que el endpoint la maneje
 
     def is_ready(self):
         """Verifica si el motor ha sido inicializado."""
-        # En versiones antiguas de python-chess, no hay una forma fiable de 
-        # verificar si el proceso está vivo sin causar un error. 
-        # Simplemente comprobamos si el objeto fue creado.
-        return self.engine is not None
+        return self.pool is not None and self.pool.disponible()
+
+    def is_responsive(self):
+        """Resultado de la última revisión del supervisor (no habla con el motor)"""
+        return self.supervisor is not None and self.supervisor.sano()
 
     def close(self):
         """Cierra el motor de ajedrez de forma segura."""
-        if self.engine:
+        if self.pool is not None:
             logging.info("Cerrando Stockfish...")
-            self.engine.quit()
+            self.supervisor.detener()
+            self._reinicios += self.pool.estadisticas()["reinicios"]
+            self.pool.cerrar()
+            self.pool = None
+            self.supervisor = None
 
 # --- Configuración de la aplicación Flask ---
 app = Flask(__name__)
 CORS(app) # Configuración de CORS simplificada y permisiva para desarrollo
 
+# Métricas Prometheus (expuestas en /metrics)
+registro = metricas.Registro()
+m_peticiones = registro.histograma("chess_peticion_segundos", "Latencia por ruta", etiquetas=("ruta", "metodo", "codigo"))
+m_busqueda = registro.histograma("chess_motor_busqueda_segundos", "Duración de las búsquedas del motor")
+m_codificacion = registro.histograma("chess_respuesta_codificacion_segundos", "Codificación de las respuestas de la API",
+                                     buckets=metricas.BUCKETS_CODIFICACION, etiquetas=("formato", "compresion"))
+m_bytes = registro.contador("chess_respuesta_bytes_total", "Bytes enviados en las respuestas de la API", etiquetas=("formato", "compresion"))
+metricas.instrumentar_rutas(app, m_peticiones)
+
+# Respuestas JSON (orjson) o MessagePack según `Accept`, comprimidas con
+# brotli o gzip según `Accept-Encoding` a partir de estos bytes (0 = nunca)
+app.json = ProveedorJSON(app, int(os.environ.get("COMPRESION_MIN_BYTES", "1024")), m_codificacion, m_bytes)
+
 # La ruta a Stockfish se puede configurar con la variable de entorno STOCKFISH_PATH
 STOCKFISH_PATH = os.environ.get("STOCKFISH_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "engines/stockfish", "stockfish-ubuntu-x86-64-avx2"))
 
+# Caché de jugadas por posición (TTL en segundos, 0 = sin caducidad)
+cache_jugadas = CacheJugadas(
+    int(os.environ.get("CACHE_JUGADAS_MAX", "10000")),
+    float(os.environ.get("CACHE_JUGADAS_TTL", "0"))
+)
+
+# Libro de aperturas Polyglot (.bin) opcional, consultado antes que el motor
+libro = LibroAperturas(
+    os.environ.get("LIBRO_APERTURAS"),
+    int(os.environ.get("LIBRO_MAX_PLY", "20"))
+)
+
+# Tablas de finales Syzygy opcionales (directorios separados por ':')
+tablas = TablasFinales(
+    os.environ.get("TABLAS_FINALES"),
+    int(os.environ.get("TABLAS_MAX_FDS", "128"))
+)
+
+# Presupuesto de búsqueda en nodos (0 = tiempo adaptativo) y cuenta de
+# segundos de motor por cliente (IP o cabecera CLIENTE_CABECERA), recargada
+# a lo largo de la ventana (0 = sin límite)
+cuentas = CuentasMotor(
+    float(os.environ.get("CUOTA_MOTOR_CLIENTE", "0")),
+    float(os.environ.get("CUOTA_MOTOR_VENTANA", "3600"))
+)
+CLIENTE_CABECERA = os.environ.get("CLIENTE_CABECERA")
+
 # Crear una instancia única del motor
-stockfish_engine = StockfishEngine(STOCKFISH_PATH)
+stockfish_engine = StockfishEngine(STOCKFISH_PATH, cache=cache_jugadas, libro=libro, m_busqueda=m_busqueda,
+                                   reserva=int(os.environ.get("MOTORES_RESERVA", "1")), tablas=tablas,
+                                   nodos_base=int(os.environ.get("MOTOR_NODOS", "0")), cuentas=cuentas)
 
 # Registrar el cierre del motor al salir de la aplicación
 atexit.register(stockfish_engine.close)
 
+# Pool de motores para análisis por lotes, creado en la primera petición.
+# Cada posición se analiza como mucho ANALISIS_TIEMPO_MAX segundos (también
+# si se pide solo depth o nodes); el supervisor mata las búsquedas que pasan
+# de PLAZO_ANALISIS
+MAX_POSICIONES_LOTE = int(os.environ.get("MAX_POSICIONES_LOTE", "10000"))
+ANALISIS_MOTORES = int(os.environ.get("ANALISIS_MOTORES", "0")) or None
+ANALISIS_TIEMPO_MAX = float(os.environ.get("ANALISIS_TIEMPO_MAX", "20"))
+PLAZO_ANALISIS = ANALISIS_TIEMPO_MAX + 10
+pool_analisis = None
+supervisor_analisis = None
+pool_analisis_lock = threading.Lock()
+
+def obtener_pool_analisis():
+    """Arranca (una sola vez) el pool de motores dedicado al análisis por lotes"""
+    global pool_analisis, supervisor_analisis
+    with pool_analisis_lock:
+        if pool_analisis is None:
+            pool = PoolMotores(STOCKFISH_PATH, num_motores=ANALISIS_MOTORES, plazo_busqueda=PLAZO_ANALISIS)
+            if not pool.iniciar():
+                raise chess.engine.EngineTerminatedError("No se pudo iniciar el pool de análisis.")
+            supervisor = SupervisorMotores(pool)
+            supervisor.iniciar()
+            pool_analisis, supervisor_analisis = pool, supervisor
+            atexit.register(pool.cerrar)
+            atexit.register(supervisor.detener)
+        return pool_analisis
+
+
+registro.calculada("chess_motor_llamadas_total", "Búsquedas enviadas al motor", lambda: stockfish_engine.llamadas_motor, "counter")
+registro.calculada("chess_motor_reinicios_total", "Reinicios del motor", lambda: stockfish_engine.reinicios, "counter")
+registro.calculada("chess_motor_colgados_total", "Búsquedas cortadas por el watchdog",
+                   lambda: stockfish_engine.supervisor.colgados if stockfish_engine.supervisor else None, "counter")
+registro.calculada("chess_cache_aciertos_total", "Aciertos de la caché de jugadas", lambda: cache_jugadas.aciertos, "counter")
+registro.calculada("chess_cache_fallos_total", "Fallos de la caché de jugadas", lambda: cache_jugadas.fallos, "counter")
+registro.calculada("chess_libro_aciertos_total", "Jugadas servidas por el libro de aperturas", lambda: libro.aciertos, "counter")
+registro.calculada("chess_tablas_consultas_total", "Consultas a las tablas de finales", lambda: tablas.consultas, "counter")
+registro.calculada("chess_tablas_aciertos_total", "Jugadas servidas por las tablas de finales", lambda: tablas.aciertos, "counter")
+registro.calculada("chess_tablas_consulta_segundos_total", "Tiempo total de las consultas a las tablas de finales", lambda: tablas.tiempo_total, "counter")
+registro.calculada("chess_motor_consumo_segundos_total", "Segundos de motor cargados a las cuentas de los clientes",
+                   lambda: cuentas.segundos_total, "counter")
+registro.calculada("chess_cuota_cliente_rechazos_total", "Peticiones rechazadas por cuota de motor del cliente agotada",
+                   lambda: cuentas.rechazos_cliente, "counter")
+registro.calculada("chess_analisis_busquedas_total", "Posiciones analizadas por lotes",
+                   lambda: pool_analisis.estadisticas()["busquedas"] if pool_analisis is not None else None, "counter")
 
 # --- Endpoints de la API ---
 @app.route("/")
@@ -88,11 +267,24 @@ def health():
     """Endpoint para verificar el estado del servidor y del motor."""
     engine_ready = stockfish_engine.is_ready()
     status = {
-        "status": "healthy" if engine_ready else "unhealthy",
-        "engine_initialized": engine_ready
+        "status": "healthy" if engine_ready and stockfish_engine.is_responsive() else "unhealthy",
+        "engine_initialized": engine_ready,
+        "engine_responsive": stockfish_engine.is_responsive(),
+        "engine_pool": stockfish_engine.pool.estadisticas() if engine_ready else None,
+        "supervisor": stockfish_engine.supervisor.estadisticas() if engine_ready else None,
+        "cache": cache_jugadas.estadisticas(),
+        "libro": libro.estadisticas(),
+        "tablas_finales": tablas.estadisticas(),
+        "cuentas_motor": cuentas.estadisticas(),
+        "engine_calls": stockfish_engine.llamadas_motor
     }
     return jsonify(status), 200 if engine_ready else 503
 
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Métricas en formato de texto Prometheus."""
+    return Response(registro.exponer(), mimetype=metricas.CONTENT_TYPE)
+
 @app.route("/restart_engine", methods=["POST"])
 def restart_engine():
     """Endpoint para forzar el reinicio del motor Stockfish."""
@@ -103,10 +295,23 @@ def restart_engine():
     else:
         return jsonify({"success": False, "message": "Error al reiniciar el motor."}), 500
 
+def cliente_peticion():
+    """Cliente al que se cargan las búsquedas (cabecera CLIENTE_CABECERA o IP)"""
+    if CLIENTE_CABECERA and request.headers.get(CLIENTE_CABECERA):
+        return request.headers[CLIENTE_CABECERA]
+    return request.remote_addr
+
+def cuota_agotada(e):
+    """Respuesta 429 con Retry-After para un cliente sin saldo de motor"""
+    respuesta = jsonify({"error": str(e), "retry_after": e.retry_after})
+    respuesta.headers["Retry-After"] = str(e.retry_after)
+    return respuesta, 429
+
 @app.route("/make_move", methods=["POST"])
 def make_move():
     """
     Recibe una posición FEN, calcula la mejor jugada y la devuelve.
+    Acepta una `dificultad` opcional ('facil', 'normal' o 'dificil').
     """
     data = request.get_json()
     if not data or "fen" not in data:
@@ -121,9 +326,16 @@ def make_move():
     if board.is_game_over():
         return jsonify({"status": "El juego ha terminado.", "best_move": None}), 200
 
+    # Sin saldo de motor la petición no llega al motor
+    cliente = cliente_peticion()
+    try:
+        cuentas.comprobar(cliente)
+    except CuotaAgotadaError as e:
+        return cuota_agotada(e)
+
     try:
         logging.info(f"Calculando jugada para FEN: {fen}")
-        best_move = stockfish_engine.get_best_move(board)
+        best_move = stockfish_engine.get_best_move(board, dificultad=data.get("dificultad"), cliente=cliente)
         logging.info(f"Mejor jugada calculada: {best_move.uci()}")
         return jsonify({"best_move": best_move.uci()})
 
@@ -133,6 +345,117 @@ def make_move():
         logging.error(f"Error inesperado en make_move: {e}")
         return jsonify({"error": f"Error interno del servidor: {str(e)}"}), 500
 
+def origen_lote(data):
+    """'pgn' (texto no vacío) o 'fens' (lista) según lo que traiga la petición; None si no es válida"""
+    if not isinstance(data, dict):
+        return None
+    if isinstance(data.get("pgn"), str) and data["pgn"].strip():
+        return "pgn"
+    if isinstance(data.get("fens"), list):
+        return "fens"
+    return None
+
+def posiciones_lote(data, origen):
+    """Genera (etiqueta, tablero o None) desde una lista de FENs o un PGN"""
+    if origen == "pgn":
+        for partida, ply, board in posiciones_desde_pgn(data["pgn"]):
+            yield {"game": partida, "ply": ply, "fen": board.fen()}, board
+        return
+    for fen in data["fens"]:
+        try:
+            yield {"fen": fen}, chess.Board(fen)
+        except (TypeError, ValueError):
+            yield {"fen": fen}, None
+
+def analizar_posicion(pool, indice, etiqueta, board, limit, multipv, cliente=None):
+    """Analiza una posición con un motor libre del pool y devuelve una línea NDJSON"""
+    resultado = {"index": indice}
+    resultado.update(etiqueta)
+    if board is None:
+        resultado["error"] = "FEN inválido."
+        return resultado
+    if board.is_game_over():
+        resultado["game_over"] = True
+        resultado["result"] = board.result()
+        return resultado
+
+    try:
+        with pool.usar() as motor:
+            inicio = time.perf_counter()
+            try:
+                infos = motor.analyse(board, limit, multipv=multipv)
+            finally:
+                cuentas.cargar(cliente, None, time.perf_counter() - inicio)
+        lineas = [info_a_dict(info) for info in infos]
+        resultado["best_move"] = lineas[0]["pv"][0] if lineas and lineas[0].get("pv") else None
+        resultado["lines"] = lineas
+    except Exception as e:
+        logging.error(f"Error analizando {etiqueta}: {e}")
+        resultado["error"] = str(e)
+    return resultado
+
+@app.route("/analyze_batch", methods=["POST"])
+def analyze_batch():
+    """
+    Analiza muchas posiciones (lista de FENs o PGN) repartiéndolas entre los
+    motores del pool y devuelve los resultados como NDJSON según terminan.
+    """
+    data = request.get_json(silent=True)
+    origen = origen_lote(data)
+    if origen is None:
+        return jsonify({"error": "Se requiere 'fens' (lista) o 'pgn' (texto no vacío)."}), 400
+
+    try:
+        limit = limite_acotado(limite_desde_parametros(data), ANALISIS_TIEMPO_MAX)
+        multipv = multipv_desde_parametros(data)
+    except ParametrosInvalidosError as e:
+        return jsonify({"error": str(e)}), 400
+
+    cliente = cliente_peticion()
+    try:
+        cuentas.comprobar(cliente)
+    except CuotaAgotadaError as e:
+        return cuota_agotada(e)
+
+    try:
+        pool = obtener_pool_analisis()
+    except chess.engine.EngineTerminatedError:
+        return jsonify({"error": "El motor de ajedrez no está disponible."}), 503
+
+    workers = pool.estadisticas()["motores"]
+
+    def generar():
+        pendientes = set()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            try:
+                for indice, (etiqueta, board) in enumerate(posiciones_lote(data, origen)):
+                    if indice >= MAX_POSICIONES_LOTE:
+                        yield json.dumps({"error": f"Límite de {MAX_POSICIONES_LOTE} posiciones alcanzado."}) + "\n"
+                        break
+                    # El cliente agota su cuota a mitad del lote: no se encargan más posiciones
+                    try:
+                        cuentas.comprobar(cliente)
+                    except CuotaAgotadaError as e:
+                        yield json.dumps({"error": str(e), "retry_after": e.retry_after}) + "\n"
+                        break
+                    pendientes.add(executor.submit(analizar_posicion, pool, indice, etiqueta, board, limit, multipv,
+                                                   cliente))
+                    # Acotar las posiciones en vuelo para no cargar el PGN entero en memoria
+                    if len(pendientes) >= 2 * workers:
+                        hechos, pendientes = wait(pendientes, return_when=FIRST_COMPLETED)
+                        for futuro in hechos:
+                            yield json.dumps(futuro.result()) + "\n"
+                while pendientes:
+                    hechos, pendientes = wait(pendientes, return_when=FIRST_COMPLETED)
+                    for futuro in hechos:
+                        yield json.dumps(futuro.result()) + "\n"
+            finally:
+                # Cliente desconectado: no llegar al motor con lo que falta
+                for futuro in pendientes:
+                    futuro.cancel()
+
+    return Response(generar(), mimetype="application/x-ndjson")
+
 # --- Ejecución del servidor ---
 if __name__ == "__main__":
     # El modo debug no es recomendable para producción
@@ -0,0 +1,174 @@
+import asyncio
+import threading
+import time
+import logging
+
+
+class SupervisorMotores:
+    """Vigila un `PoolMotores` desde un hilo propio, fuera del camino de las peticiones.
+
+    En cada revisión:
+    - mata los motores cuya búsqueda supera su plazo (watchdog), para que
+      se reemplacen como cualquier motor caído;
+    - hace ping a los motores libres y reemplaza los caídos o colgados;
+    - repone los procesos de reserva (arranque en frío aquí, no en una petición);
+    - amplía el pool con un proceso de reserva si hay peticiones esperando motor.
+
+    El resultado de la última revisión alimenta el health check, que así no
+    tiene que hablar con ningún motor.
+    """
+
+    def __init__(self, pool, intervalo=5.0):
+        self.pool = pool
+        self.intervalo = intervalo
+        self._parar = threading.Event()
+        self._hilo = None
+
+        # Estado de la última revisión y contadores acumulados
+        self.ultima_revision = None
+        self.ultimos_fallos = 0
+        self.pings = 0
+        self.caidos = 0
+        self.colgados = 0
+        self.ampliaciones = 0
+
+    def iniciar(self):
+        """Primera revisión inmediata (el health check la necesita) y luego periódicas"""
+        self.revisar()
+        self._parar.clear()
+        self._hilo = threading.Thread(target=self._bucle, name="supervisor-motores", daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        self._parar.set()
+
+    def _bucle(self):
+        while not self._parar.wait(self.intervalo):
+            try:
+                self.revisar()
+            except Exception as e:
+                logging.error(f"Error en la revisión de motores: {e}")
+
+    def revisar(self):
+        """Una pasada de watchdog, pings, reserva y ampliación"""
+        fallos = 0
+
+        for motor in self.pool.vencidos():
+            logging.warning("Búsqueda colgada: se mata el proceso para reemplazarlo")
+            self.colgados += 1
+            fallos += 1
+            self.pool.matar(motor)
+
+        # Cada motor libre vuelve al final de la cola, así que se revisan
+        # todos sin repetir ninguno
+        for _ in range(self.pool.estadisticas()['libres']):
+            motor = self.pool.intentar_obtener(plazo=self.intervalo)
+            if motor is None:
+                break
+            try:
+                motor.ping()
+                self.pings += 1
+            except Exception as e:
+                logging.warning(f"Motor sin respuesta al ping, se reemplaza: {e}")
+                self.caidos += 1
+                fallos += 1
+                self.pool.reemplazar(motor)
+            else:
+                self.pool.devolver(motor)
+
+        while self.pool.reponer_reserva():
+            pass
+
+        if self.pool.estadisticas()['en_espera'] > 0 and self.pool.ampliar():
+            self.ampliaciones += 1
+            self.pool.reponer_reserva()
+
+        self.ultimos_fallos = fallos
+        self.ultima_revision = time.time()
+
+    def sano(self):
+        """Hay motores, la última revisión es reciente y no encontró fallos"""
+        return (self.pool.disponible() and self.ultima_revision is not None and
+                time.time() - self.ultima_revision < 3 * self.intervalo and
+                self.ultimos_fallos == 0)
+
+    def estadisticas(self):
+        return {
+            'intervalo': self.intervalo,
+            'ultima_revision': self.ultima_revision,
+            'ultimos_fallos': self.ultimos_fallos,
+            'pings': self.pings,
+            'caidos': self.caidos,
+            'colgados': self.colgados,
+            'ampliaciones': self.ampliaciones,
+        }
+
+
+class SupervisorMotoresAsync(SupervisorMotores):
+    """Equivalente de `SupervisorMotores` para `PoolMotoresAsync`.
+
+    Las revisiones se hacen en una tarea del bucle de eventos en lugar de
+    un hilo; `iniciar`, `detener` y `revisar` son corrutinas.
+    """
+
+    def __init__(self, pool, intervalo=5.0):
+        super().__init__(pool, intervalo)
+        self._tarea = None
+
+    async def iniciar(self):
+        """Primera revisión inmediata (el health check la necesita) y luego periódicas"""
+        await self.revisar()
+        self._tarea = asyncio.create_task(self._bucle())
+
+    async def detener(self):
+        if self._tarea is None:
+            return
+        self._tarea.cancel()
+        try:
+            await self._tarea
+        except asyncio.CancelledError:
+            pass
+        self._tarea = None
+
+    async def _bucle(self):
+        while True:
+            await asyncio.sleep(self.intervalo)
+            try:
+                await self.revisar()
+            except Exception as e:
+                logging.error(f"Error en la revisión de motores: {e}")
+
+    async def revisar(self):
+        """Una pasada de watchdog, pings, reserva y ampliación"""
+        fallos = 0
+
+        for motor in self.pool.vencidos():
+            logging.warning("Búsqueda colgada: se mata el proceso para reemplazarlo")
+            self.colgados += 1
+            fallos += 1
+            self.pool.matar(motor)
+
+        for _ in range(self.pool.estadisticas()['libres']):
+            motor = self.pool.intentar_obtener(plazo=self.intervalo)
+            if motor is None:
+                break
+            try:
+                await asyncio.wait_for(motor.ping(), self.intervalo)
+                self.pings += 1
+            except Exception as e:
+                logging.warning(f"Motor sin respuesta al ping, se reemplaza: {e}")
+                self.caidos += 1
+                fallos += 1
+                await self.pool.reemplazar(motor)
+            else:
+                self.pool.devolver(motor)
+
+        while await self.pool.reponer_reserva():
+            pass
+
+        if self.pool.estadisticas()['en_espera'] > 0 and self.pool.ampliar():
+            self.ampliaciones += 1
+            await self.pool.reponer_reserva()
+
+        self.ultimos_fallos = fallos
+        self.ultima_revision = time.time()
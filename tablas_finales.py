@@ -0,0 +1,119 @@
+import chess
+import chess.syzygy
+import os
+import threading
+import time
+import logging
+
+
+class TablasFinales:
+    """Tablas de finales Syzygy locales consultadas antes que el motor.
+
+    Con pocas piezas la posición tiene una respuesta exacta: se elige la
+    jugada que conserva el mejor resultado (WDL) y, entre las ganadoras, la
+    que antes pone a cero el contador de 50 jugadas (DTZ); perdiendo, la que
+    más lo alarga. Una consulta cuesta microsegundos de CPU en lugar de una
+    búsqueda del motor. `chess.syzygy` mantiene abiertos como mucho
+    `max_fds` ficheros de tablas (LRU) y los mapea en memoria.
+    """
+
+    def __init__(self, ruta=None, max_fds=128):
+        self.ruta = ruta
+        self.max_fds = max_fds
+        self.max_piezas = 0
+        self._tablas = None
+        self._lock = threading.Lock()
+        self._lock_consulta = threading.Lock()  # el LRU de ficheros de chess.syzygy no es thread-safe
+
+        # Métricas
+        self.consultas = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.tiempo_total = 0.0
+        self.tiempo_max = 0.0
+
+        if ruta:
+            directorios = [d for d in ruta.split(os.pathsep) if os.path.isdir(d)]
+            if directorios:
+                self._tablas = chess.syzygy.Tablebase(max_fds=max_fds)
+                for directorio in directorios:
+                    self._tablas.add_directory(directorio)
+                # Nombres como 'KRPvKR': piezas = letras sin la 'v'
+                self.max_piezas = max((len(nombre) - 1 for nombre in self._tablas.wdl), default=0)
+                logging.info(f"Tablas de finales cargadas: {len(self._tablas.wdl)} tablas "
+                             f"(hasta {self.max_piezas} piezas) desde {ruta}")
+            else:
+                logging.warning(f"Tablas de finales no encontradas: {ruta}")
+
+    def disponible(self):
+        """Indica si hay tablas cargadas"""
+        return self._tablas is not None and self.max_piezas > 0
+
+    def cubre(self, board):
+        """La posición tiene pocas piezas y ningún enroque (las tablas no los contemplan)"""
+        return (self.disponible() and
+                chess.popcount(board.occupied) <= self.max_piezas and
+                not board.castling_rights)
+
+    def _clave_jugada(self, board, move):
+        """Orden de preferencia de una jugada según las tablas (mayor es mejor)"""
+        board.push(move)
+        try:
+            if board.is_checkmate():
+                return (3, 0, 0)
+            wdl = -self._tablas.probe_wdl(board)
+            dtz = self._tablas.probe_dtz(board) if wdl else 0
+        finally:
+            board.pop()
+        if wdl > 0:
+            # Ganando: primero las que ponen a cero el contador, luego el menor DTZ
+            return (wdl, board.is_zeroing(move), -abs(dtz))
+        if wdl < 0:
+            # Perdiendo: resistir lo máximo posible
+            return (wdl, not board.is_zeroing(move), abs(dtz))
+        return (wdl, 0, 0)
+
+    def elegir_jugada(self, board):
+        """Jugada óptima según las tablas, o None fuera de su alcance"""
+        if not self.cubre(board):
+            return None
+
+        inicio = time.perf_counter()
+        tablero = board.copy(stack=False)
+        try:
+            with self._lock_consulta:
+                move = max(tablero.legal_moves, key=lambda m: self._clave_jugada(tablero, m), default=None)
+        except KeyError:
+            # Falta la tabla de alguna de las posiciones resultantes
+            move = None
+        duracion = time.perf_counter() - inicio
+
+        with self._lock:
+            self.consultas += 1
+            self.tiempo_total += duracion
+            self.tiempo_max = max(self.tiempo_max, duracion)
+            if move is None:
+                self.fallos += 1
+            else:
+                self.aciertos += 1
+        return move
+
+    def estadisticas(self):
+        """Consultas, aciertos y latencia de las tablas de finales"""
+        with self._lock:
+            return {
+                'activo': self.disponible(),
+                'max_piezas': self.max_piezas,
+                'max_fds': self.max_fds,
+                'consultas': self.consultas,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'latencia_media_us': round(1e6 * self.tiempo_total / self.consultas, 1) if self.consultas else 0.0,
+                'latencia_max_us': round(1e6 * self.tiempo_max, 1),
+            }
+
+    def cerrar(self):
+        """Cierra los ficheros de tablas abiertos"""
+        if self._tablas is not None:
+            self._tablas.close()
+            self._tablas = None
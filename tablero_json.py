@@ -0,0 +1,118 @@
+import chess
+
+# Partes estáticas del tablero calculadas una sola vez al importar
+UNICODE_PIEZAS = {
+    'R': '♖', 'N': '♘', 'B': '♗', 'Q': '♕', 'K': '♔', 'P': '♙',
+    'r': '♜', 'n': '♞', 'b': '♝', 'q': '♛', 'k': '♚', 'p': '♟'
+}
+
+PIEZAS_INFO = {
+    simbolo: {
+        'tipo': simbolo.lower(),
+        'color': 'white' if simbolo.isupper() else 'black',
+        'simbolo': simbolo,
+        'unicode': unicode
+    }
+    for simbolo, unicode in UNICODE_PIEZAS.items()
+}
+
+# Casillas en el orden del frontend (de arriba a abajo, de a-h)
+CASILLAS = [
+    (chess.square(col, fila), {
+        'casilla': chess.square_name(chess.square(col, fila)),
+        'fila': 8 - fila,  # 1-8
+        'columna': chr(97 + col),  # a-h
+        'color_casilla': 'light' if (fila + col) % 2 == 0 else 'dark'
+    })
+    for fila in range(7, -1, -1)
+    for col in range(8)
+]
+
+
+def obtener_unicode_pieza(simbolo):
+    """Devuelve el símbolo Unicode para la pieza"""
+    return UNICODE_PIEZAS.get(simbolo, simbolo)
+
+
+_CALCULAR = object()
+
+
+def estado_juego(board, jugadas_legales=None, outcome=_CALCULAR):
+    """Indicadores de turno, jaque y fin de partida comunes a todos los formatos.
+
+    Acepta las jugadas legales (UCI) y el `outcome` ya calculados para no
+    volver a generarlos.
+    """
+    if outcome is _CALCULAR:
+        outcome = board.outcome()
+    if jugadas_legales is None:
+        jugadas_legales = [move.uci() for move in board.legal_moves]
+    return {
+        'fen': board.fen(),
+        'es_turno_blancas': board.turn == chess.WHITE,
+        'jugadas_legales': jugadas_legales,
+        'es_jaque': board.is_check(),
+        'es_jaque_mate': outcome is not None and outcome.termination == chess.Termination.CHECKMATE,
+        'es_tablas': (outcome is not None and outcome.termination == chess.Termination.STALEMATE) or
+                     board.is_insufficient_material() or board.is_fifty_moves() or board.is_repetition(),
+        'resultado': outcome.result() if outcome else None
+    }
+
+
+def tablero_a_json(board, resumen=None):
+    """Convierte un tablero de chess a formato JSON para el frontend"""
+    piezas = board.piece_map()
+    tablero_json = []
+    for square, casilla in CASILLAS:
+        pieza = piezas.get(square)
+        tablero_json.append(dict(casilla, pieza=PIEZAS_INFO[pieza.symbol()] if pieza else None))
+
+    respuesta = {'posiciones': tablero_json}
+    respuesta.update(resumen or estado_juego(board))
+    return respuesta
+
+
+def casillas_cambiadas(board, desde_ply):
+    """Casillas que cambiaron desde la jugada `desde_ply` ({casilla: símbolo o None}).
+
+    Devuelve None si `desde_ply` no pertenece a la historia del tablero.
+    """
+    ply = len(board.move_stack)
+    if desde_ply < 0 or desde_ply > ply:
+        return None
+
+    anterior = board.copy()
+    for _ in range(ply - desde_ply):
+        anterior.pop()
+
+    antes = anterior.piece_map()
+    ahora = board.piece_map()
+    cambios = {}
+    for square in antes.keys() | ahora.keys():
+        pieza = ahora.get(square)
+        if antes.get(square) != pieza:
+            cambios[chess.square_name(square)] = pieza.symbol() if pieza else None
+    return cambios
+
+
+def tablero_a_json_compacto(board, desde_ply=None, resumen=None):
+    """Formato compacto: FEN, última jugada y, si se pide, casillas cambiadas.
+
+    Con `desde_ply` se envía solo la diferencia respecto a esa jugada; si el
+    cliente está desincronizado se marca `completo` para que use la FEN.
+    """
+    ply = len(board.move_stack)
+    respuesta = {
+        'formato': 'compacto',
+        'ply': ply,
+        'ultimo_movimiento': board.peek().uci() if ply else None
+    }
+    respuesta.update(resumen or estado_juego(board))
+
+    if desde_ply is not None:
+        cambios = casillas_cambiadas(board, desde_ply)
+        respuesta['desde'] = desde_ply
+        respuesta['completo'] = cambios is None
+        if cambios is not None:
+            respuesta['cambios'] = cambios
+    return respuesta
@@ -0,0 +1,67 @@
+import os
+import sys
+import time
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+MOTOR_FALSO = os.path.join(RAIZ, 'bench', 'motor_falso.py')
+
+
+def _importar_servidor(nombre, entorno):
+    """Importa un servidor con el motor UCI falso y el entorno dado, y lo restaura después"""
+    anterior = {clave: os.environ.get(clave) for clave in entorno}
+    os.environ.update(entorno)
+    try:
+        return __import__(nombre)
+    finally:
+        for clave, valor in anterior.items():
+            if valor is None:
+                os.environ.pop(clave, None)
+            else:
+                os.environ[clave] = valor
+
+
+@pytest.fixture(scope='session')
+def servidor_api(tmp_path_factory):
+    """`server_api` con el motor falso y partidas en SQLite"""
+    ruta = tmp_path_factory.mktemp('almacen') / 'partidas.db'
+    modulo = _importar_servidor('server_api', {
+        'STOCKFISH_PATH': MOTOR_FALSO,
+        'MOTORES_POOL': '1',
+        'MOTORES_RESERVA': '0',
+        'MOTOR_FALSO_MS': '10',
+        'ALMACEN_PARTIDAS': f'sqlite:///{ruta}',
+    })
+    yield modulo
+    modulo.cerrar_motor()
+
+
+@pytest.fixture(scope='session')
+def servidor_stockfish():
+    """`server_stockfish` con el motor falso"""
+    modulo = _importar_servidor('server_stockfish', {
+        'STOCKFISH_PATH': MOTOR_FALSO,
+        'ANALISIS_MOTORES': '1',
+        'MOTORES_RESERVA': '0',
+        'MOTOR_FALSO_MS': '10',
+    })
+    yield modulo
+    # Los hilos de python-chess no son daemon: el pool de análisis se
+    # cierra aquí porque atexit llega después de esperarlos
+    if modulo.supervisor_analisis is not None:
+        modulo.supervisor_analisis.detener()
+    if modulo.pool_analisis is not None:
+        modulo.pool_analisis.cerrar()
+    modulo.stockfish_engine.close()
+
+
+def esperar(condicion, timeout=10):
+    """Espera hasta que `condicion()` sea cierta (trabajos del motor en segundo plano)"""
+    limite = time.monotonic() + timeout
+    while not condicion():
+        if time.monotonic() > limite:
+            raise AssertionError("condición no alcanzada a tiempo")
+        time.sleep(0.01)
@@ -0,0 +1,118 @@
+import chess
+
+from almacen_partidas import AlmacenNiveles, AlmacenSQLite
+from notificaciones import NotificadorPartidas
+from partida import Partida
+from conftest import esperar
+
+
+def test_historial_sqlite_conserva_el_orden_si_el_motor_se_guarda_antes(tmp_path):
+    ruta = str(tmp_path / 'partidas.db')
+    almacen = AlmacenSQLite(ruta)
+    partida = Partida()
+    almacen['p'] = partida
+
+    partida.jugar(chess.Move.from_uci('e2e4'), 'humano')
+    humano = partida.ultima_entrada_numerada()
+    partida.jugar(chess.Move.from_uci('e7e5'), 'motor')
+    motor = partida.ultima_entrada_numerada()
+
+    # El hilo del motor registra su jugada antes que la petición del humano
+    almacen.registrar_entrada('p', *motor)
+    almacen.registrar_entrada('p', *humano)
+    almacen.cerrar()
+
+    otro = AlmacenSQLite(ruta)
+    historial = otro['p'].historial()
+    otro.cerrar()
+    assert [(e['jugador'], e['movimiento']) for e in historial] == [('humano', 'e2e4'), ('motor', 'e7e5')]
+
+
+def test_anular_entrada_borra_la_jugada_deshecha(tmp_path):
+    ruta = str(tmp_path / 'partidas.db')
+    almacen = AlmacenSQLite(ruta)
+    partida = Partida()
+    almacen['p'] = partida
+    partida.jugar(chess.Move.from_uci('d2d4'), 'humano')
+    n, entrada = partida.ultima_entrada_numerada()
+    almacen.registrar_entrada('p', n, entrada)
+    partida.deshacer()
+    almacen.anular_entrada('p', n)
+    almacen.cerrar()
+
+    otro = AlmacenSQLite(ruta)
+    assert otro['p'].historial() == []
+    otro.cerrar()
+
+
+def test_jugada_humana_y_respuesta_del_motor_persisten(servidor_api):
+    cliente = servidor_api.app.test_client()
+    partida_id = cliente.post('/api/nueva-partida').get_json()['partida_id']
+    assert cliente.post(f'/api/jugar/{partida_id}', json={'movimiento': 'e2e4'}).status_code == 200
+    esperar(lambda: servidor_api.partidas[partida_id].num_jugadas == 2)
+    servidor_api.partidas.vaciar()
+
+    otro = AlmacenSQLite(servidor_api.partidas.ruta)
+    historial = otro[partida_id].historial()
+    otro.cerrar()
+    assert [e['jugador'] for e in historial] == ['humano', 'motor']
+    assert historial[0]['movimiento'] == 'e2e4'
+
+
+def test_niveles_conserva_la_fila_al_cargar_para_otros_workers(tmp_path):
+    ruta = str(tmp_path / 'inactivas.db')
+    uno, otro = AlmacenNiveles(ruta), AlmacenNiveles(ruta)
+    partida = Partida()
+    partida.jugar(chess.Move.from_uci('e2e4'), 'humano')
+    uno['p'] = partida
+    assert uno.desalojar(0) == ['p']
+
+    # Cargar la partida en un worker no la quita del disco para el otro
+    assert uno['p'].num_jugadas == 1
+    assert 'p' in otro and otro['p'].num_jugadas == 1
+
+    # La jugada hecha en memoria llega al disco al desalojar (upsert)
+    uno['p'].jugar(chess.Move.from_uci('e7e5'), 'motor')
+    uno.desalojar(0)
+    assert AlmacenNiveles(ruta)['p'].num_jugadas == 2
+    uno.cerrar()
+    otro.cerrar()
+
+
+def test_niveles_no_cuenta_dos_veces_las_partidas_cargadas(tmp_path):
+    almacen = AlmacenNiveles(str(tmp_path / 'inactivas.db'))
+    almacen['a'] = Partida()
+    almacen['b'] = Partida()
+    almacen.desalojar(0)
+    almacen['a']  # vuelve a memoria y sigue en disco
+
+    assert len(almacen) == 2
+    assert sorted(almacen) == ['a', 'b']
+    assert sorted(almacen.antiguas(float('inf'))) == ['a', 'b']
+    estadisticas = almacen.estadisticas()
+    assert (estadisticas['partidas'], estadisticas['en_memoria'], estadisticas['en_disco']) == (2, 1, 1)
+
+    del almacen['a']
+    assert 'a' not in almacen and len(almacen) == 1
+    almacen.cerrar()
+
+
+def test_notificador_no_guarda_condiciones_sin_esperas():
+    notificador = NotificadorPartidas()
+    notificador.notificar('p')
+    assert notificador._condiciones == {}
+    assert notificador.esperar('p', lambda: True, 0)
+    notificador.olvidar('p')
+    assert notificador._condiciones == {}
+
+
+def test_limpieza_suelta_la_condicion_de_las_partidas_desalojadas(servidor_api, monkeypatch):
+    cliente = servidor_api.app.test_client()
+    partida_id = cliente.post('/api/nueva-partida').get_json()['partida_id']
+    assert cliente.get(f'/api/esperar/{partida_id}?timeout=0').status_code == 200
+    assert partida_id in servidor_api.notificador._condiciones
+
+    monkeypatch.setattr(servidor_api, 'INACTIVIDAD_PARTIDA', 0)
+    servidor_api.limpiar_partidas_antiguas()
+    assert partida_id not in servidor_api.notificador._condiciones
+    assert partida_id in servidor_api.partidas
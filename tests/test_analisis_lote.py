@@ -0,0 +1,53 @@
+import json
+import math
+
+import pytest
+
+from analisis import ParametrosInvalidosError, limite_desde_parametros
+
+FEN = 'rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1'
+
+
+@pytest.mark.parametrize('cuerpo', [
+    '{"pgn": ""}',
+    '{"pgn": "   "}',
+    '{"fens": "no es una lista"}',
+    '["%s"]' % FEN,
+    '"%s"' % FEN,
+    '{}',
+])
+def test_cuerpos_invalidos_dan_400_antes_del_stream(servidor_stockfish, cuerpo):
+    cliente = servidor_stockfish.app.test_client()
+    respuesta = cliente.post('/analyze_batch', data=cuerpo, content_type='application/json')
+    assert respuesta.status_code == 400
+    assert 'error' in respuesta.get_json()
+
+
+@pytest.mark.parametrize('limites', ['"time": Infinity', '"time": NaN', '"depth": 1e400', '"nodes": -5'])
+def test_limites_no_finitos_o_negativos_dan_400(servidor_stockfish, limites):
+    cliente = servidor_stockfish.app.test_client()
+    cuerpo = '{"fens": ["%s"], %s}' % (FEN, limites)
+    assert cliente.post('/analyze_batch', data=cuerpo, content_type='application/json').status_code == 400
+
+
+def test_lote_de_fens_devuelve_una_linea_por_posicion(servidor_stockfish):
+    cliente = servidor_stockfish.app.test_client()
+    respuesta = cliente.post('/analyze_batch', json={'fens': [FEN, 'no es un fen'], 'depth': 10 ** 9})
+    assert respuesta.status_code == 200
+    lineas = sorted((json.loads(linea) for linea in respuesta.data.decode().splitlines()), key=lambda l: l['index'])
+    assert lineas[0]['best_move'] is not None
+    assert lineas[1]['error'] == 'FEN inválido.'
+
+
+def test_lote_de_pgn(servidor_stockfish):
+    cliente = servidor_stockfish.app.test_client()
+    respuesta = cliente.post('/analyze_batch', json={'pgn': '1. e4 e5 2. Nf3 *', 'time': 0.05})
+    assert respuesta.status_code == 200
+    assert len(respuesta.data.decode().splitlines()) >= 3
+
+
+def test_limite_acotado_por_defecto():
+    limite = limite_desde_parametros({})
+    assert math.isfinite(limite.time) and limite.depth is None and limite.nodes is None
+    with pytest.raises(ParametrosInvalidosError):
+        limite_desde_parametros({'time': float('inf')})
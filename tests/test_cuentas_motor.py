@@ -0,0 +1,32 @@
+import pytest
+
+from cuentas_motor import CuentasMotor, CuotaAgotadaError
+from partida import Partida
+
+
+@pytest.mark.parametrize('ventana', [0, -60, float('nan'), float('inf')])
+def test_ventana_no_positiva_se_rechaza(ventana):
+    with pytest.raises(ValueError):
+        CuentasMotor(cuota_cliente=10, ventana=ventana)
+
+
+def test_cuota_cliente_se_agota_y_se_recarga():
+    cuentas = CuentasMotor(cuota_cliente=1.0, ventana=10.0)
+    cuentas.comprobar('c')
+    cuentas.cargar('c', None, 3.0)
+    with pytest.raises(CuotaAgotadaError) as error:
+        cuentas.comprobar('c')
+    # Saldo -2 s recargando 0.1 s por segundo
+    assert error.value.ambito == 'cliente' and error.value.retry_after == 20
+    assert not cuentas.disponible('c')
+    assert cuentas.disponible('otro')
+
+
+def test_cuota_partida():
+    cuentas = CuentasMotor(cuota_partida=1.0)
+    partida = Partida()
+    cuentas.comprobar('c', partida)
+    cuentas.cargar('c', partida, 1.5)
+    with pytest.raises(CuotaAgotadaError) as error:
+        cuentas.comprobar('c', partida)
+    assert error.value.ambito == 'partida' and error.value.retry_after is None
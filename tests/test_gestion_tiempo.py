@@ -0,0 +1,39 @@
+import chess
+import pytest
+
+from gestion_tiempo import DIFICULTAD_DEFECTO, dificultad_valida, limite_jugada
+
+
+@pytest.mark.parametrize('dificultad, esperada', [
+    ('facil', 'facil'),
+    ('  DIFICIL ', 'dificil'),
+    ('imposible', DIFICULTAD_DEFECTO),
+    (None, DIFICULTAD_DEFECTO),
+    ('', DIFICULTAD_DEFECTO),
+    (5, DIFICULTAD_DEFECTO),
+    (['facil'], DIFICULTAD_DEFECTO),
+    ({'nivel': 'facil'}, DIFICULTAD_DEFECTO),
+])
+def test_dificultad_valida(dificultad, esperada):
+    assert dificultad_valida(dificultad) == esperada
+
+
+def test_limite_jugada_con_dificultad_no_texto():
+    assert limite_jugada(chess.Board(), 5) == limite_jugada(chess.Board(), DIFICULTAD_DEFECTO)
+
+
+def test_nueva_partida_con_dificultad_no_texto(servidor_api):
+    cliente = servidor_api.app.test_client()
+    respuesta = cliente.post('/api/nueva-partida', json={'dificultad': 5})
+    assert respuesta.status_code == 200
+    assert respuesta.get_json()['dificultad'] == DIFICULTAD_DEFECTO
+
+    respuesta = cliente.post('/api/nueva-partida', json=['facil'])
+    assert respuesta.status_code == 200
+
+
+def test_make_move_con_dificultad_no_texto(servidor_stockfish):
+    cliente = servidor_stockfish.app.test_client()
+    respuesta = cliente.post('/make_move', json={'fen': chess.STARTING_FEN, 'dificultad': ['x']})
+    assert respuesta.status_code == 200
+    assert chess.Move.from_uci(respuesta.get_json()['best_move']) in chess.Board().legal_moves
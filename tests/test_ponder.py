@@ -0,0 +1,54 @@
+import chess
+import pytest
+
+from conftest import MOTOR_FALSO, esperar
+from pool_motores import PoolMotores
+from ponder import GestorPonder
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    # Búsquedas largas: el ponder sigue activo hasta que se para
+    monkeypatch.setenv('MOTOR_FALSO_MS', '5000')
+    pool = PoolMotores(MOTOR_FALSO, num_motores=1)
+    assert pool.iniciar() == 1
+    yield pool
+    pool.cerrar()
+
+
+def test_ponderhit_conserva_la_busqueda_y_carga_su_duracion(pool):
+    cargas = []
+    ponder = GestorPonder(pool, tiempo_max=5, cargar=lambda *args: cargas.append(args))
+    board = chess.Board()
+    esperada = chess.Move.from_uci('e2e4')
+    assert ponder.iniciar('p', board, esperada, partida='partida')
+    assert pool.estadisticas()['libres'] == 0
+
+    assert ponder.resolver('p', esperada)
+    board.push(esperada)
+    busqueda = ponder.tomar('p', board)
+    assert busqueda is not None
+    assert busqueda.resultado(0).move in board.legal_moves
+
+    # El motor vuelve al pool y la búsqueda se carga a la partida
+    esperar(lambda: pool.estadisticas()['libres'] == 1)
+    assert len(cargas) == 1 and cargas[0][:2] == ('p', 'partida') and cargas[0][2] > 0
+    assert ponder.estadisticas()['aciertos'] == 1
+
+
+def test_fallo_de_ponder_para_la_busqueda_y_libera_el_motor(pool):
+    ponder = GestorPonder(pool, tiempo_max=5)
+    assert ponder.iniciar('p', chess.Board(), chess.Move.from_uci('e2e4'))
+    assert not ponder.resolver('p', chess.Move.from_uci('d2d4'))
+    assert pool.estadisticas()['libres'] == 1
+    assert ponder.tomar('p', chess.Board()) is None
+
+
+def test_ceder_libera_el_motor_para_otra_partida(pool):
+    ponder = GestorPonder(pool, tiempo_max=5)
+    assert ponder.iniciar('p', chess.Board(), chess.Move.from_uci('e2e4'))
+    # Sin motor libre no se empieza otro ponder
+    assert not ponder.iniciar('q', chess.Board(), chess.Move.from_uci('d2d4'))
+    assert ponder.ceder()
+    assert pool.estadisticas()['libres'] == 1
+    assert ponder.estadisticas()['cedidas'] == 1
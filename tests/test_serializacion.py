@@ -0,0 +1,57 @@
+import gzip
+import json
+
+import pytest
+
+import serializacion
+
+msgpack = pytest.importorskip('msgpack')
+
+
+@pytest.mark.parametrize('accept, formato', [
+    (None, 'json'),
+    ('*/*', 'json'),
+    ('application/json', 'json'),
+    ('application/msgpack', 'msgpack'),
+    ('application/x-msgpack, application/json;q=0.5', 'msgpack'),
+    ('application/json, application/msgpack;q=0.5', 'json'),
+    ('application/msgpack;q=0', 'json'),
+])
+def test_negociar_formato(accept, formato):
+    assert serializacion.negociar(accept, None)[0] == formato
+
+
+@pytest.mark.parametrize('accept_encoding, compresion', [
+    (None, None),
+    ('identity', None),
+    ('gzip', 'gzip'),
+    ('gzip;q=0', None),
+    ('*', 'gzip'),
+])
+def test_negociar_compresion_gzip(accept_encoding, compresion):
+    assert serializacion.negociar(None, accept_encoding)[1] == compresion
+
+
+def test_negociar_prefiere_brotli_si_esta_instalado():
+    esperada = 'br' if serializacion.brotli is not None else 'gzip'
+    assert serializacion.negociar(None, 'gzip, br')[1] == esperada
+
+
+def test_codificar_comprime_solo_a_partir_del_umbral():
+    pequeno = {'a': 1}
+    grande = {'jugadas': ['e2e4'] * 500}
+    cuerpo, tipo, compresion, formato = serializacion.codificar(pequeno, None, 'gzip')
+    assert (tipo, compresion, formato) == ('application/json', None, 'json')
+    assert json.loads(cuerpo) == pequeno
+
+    cuerpo, _, compresion, _ = serializacion.codificar(grande, None, 'gzip')
+    assert compresion == 'gzip' and json.loads(gzip.decompress(cuerpo)) == grande
+
+
+def test_respuesta_flask_en_msgpack(servidor_api):
+    cliente = servidor_api.app.test_client()
+    respuesta = cliente.get('/api/info', headers={'Accept': 'application/msgpack'})
+    assert respuesta.status_code == 200
+    assert respuesta.mimetype == 'application/msgpack'
+    assert 'Accept' in respuesta.headers['Vary']
+    assert msgpack.unpackb(respuesta.data)['motor_activo'] is True
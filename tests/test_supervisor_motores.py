@@ -0,0 +1,69 @@
+import asyncio
+
+import chess
+import chess.engine
+import pytest
+
+from conftest import MOTOR_FALSO
+from pool_motores_async import PoolMotoresAsync
+from supervisor_motores import SupervisorMotoresAsync
+
+
+@pytest.fixture
+def motor_lento(monkeypatch):
+    # Búsquedas de 5 s: el watchdog las corta mucho antes
+    monkeypatch.setenv('MOTOR_FALSO_MS', '5000')
+
+
+def test_supervisor_async_mata_la_busqueda_colgada(motor_lento):
+    async def prueba():
+        pool = PoolMotoresAsync(MOTOR_FALSO, num_motores=1, reserva=1, plazo_busqueda=0.1)
+        assert await pool.iniciar() == 1
+        supervisor = SupervisorMotoresAsync(pool, intervalo=60)
+        await supervisor.iniciar()
+        assert supervisor.sano()
+        try:
+            async def buscar():
+                async with pool.usar() as motor:
+                    await motor.play(chess.Board(), chess.engine.Limit(time=5))
+
+            busqueda = asyncio.create_task(buscar())
+            await asyncio.sleep(0.3)
+            await supervisor.revisar()
+            with pytest.raises(chess.engine.EngineTerminatedError):
+                await asyncio.wait_for(busqueda, 5)
+
+            # El proceso de reserva sustituye al colgado y el supervisor repone la reserva
+            assert supervisor.colgados == 1 and not supervisor.sano()
+            estadisticas = pool.estadisticas()
+            assert estadisticas['motores'] == 1 and estadisticas['libres'] == 1
+            assert estadisticas['reinicios'] == 1
+            await supervisor.revisar()
+            assert pool.estadisticas()['reserva'] == 1 and supervisor.sano()
+        finally:
+            await supervisor.detener()
+            await pool.cerrar()
+
+    asyncio.run(prueba())
+
+
+def test_supervisor_async_amplia_el_pool_con_peticiones_esperando():
+    async def prueba():
+        pool = PoolMotoresAsync(MOTOR_FALSO, num_motores=1, reserva=1, max_motores=2)
+        await pool.iniciar()
+        supervisor = SupervisorMotoresAsync(pool, intervalo=60)
+        try:
+            ocupado = await pool.obtener()
+            esperando = asyncio.create_task(pool.obtener(timeout=5))
+            await asyncio.sleep(0.05)
+            await supervisor.revisar()
+            assert supervisor.ampliaciones == 1
+            segundo = await asyncio.wait_for(esperando, 1)
+            assert segundo is not ocupado
+            assert pool.estadisticas()['motores'] == 2
+            pool.devolver(ocupado)
+            pool.devolver(segundo)
+        finally:
+            await pool.cerrar()
+
+    asyncio.run(prueba())
@@ -0,0 +1,487 @@
+"""Enfrentamientos motor contra motor en paralelo.
+
+Compara dos configuraciones (builds de Cfish/Stockfish, Hash/Threads,
+límites de tiempo) jugando muchas partidas a la vez en un pool de procesos,
+cada uno con sus dos motores arrancados. Cada apertura del fichero se juega
+dos veces cambiando los colores; las partidas se escriben en el PGN según
+terminan y al final (o cada `--progreso` partidas) se muestran la diferencia
+de Elo con su margen al 95 %, el LLR del SPRT y los nodos por segundo de
+cada configuración. Con `--sprt` el enfrentamiento se detiene en cuanto el
+test acepta una de las dos hipótesis:
+
+    python3 torneo_motores.py --motor nombre=cfish,ruta=engines/Cfish_Linux/cfish \\
+        --motor nombre=sf,ruta=/usr/games/stockfish,Hash=64 \\
+        --aperturas aperturas.epd --partidas 2000 --tc 10+0.1 -o torneo.pgn
+    python3 torneo_motores.py --motor nombre=t1,Threads=1 --motor nombre=t2,Threads=2 \\
+        --nodes 20000 --sprt 0 5
+
+Cada `--motor` es una lista `clave=valor` separada por comas: `nombre`,
+`ruta` (por defecto la de `server_cfish.py`), el límite propio (`tc`,
+`time`, `nodes`, `depth`) y cualquier otra clave se envía como opción UCI.
+"""
+import chess
+import chess.engine
+import chess.pgn
+import argparse
+import datetime
+import math
+import os
+import sys
+import time
+import logging
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import util
+
+from analisis import ParametrosInvalidosError, leer_partidas, limite_desde_parametros
+from pool_motores import calcular_recursos
+from server_cfish import CFISH_PATH
+
+MAX_JUGADAS = 200  # jugadas completas tras la apertura antes de dar tablas
+
+
+# --- Configuraciones y aperturas ---
+
+def _valor_opcion(valor):
+    """Convierte los valores numéricos y booleanos de una opción UCI"""
+    if valor.lower() in ("true", "false"):
+        return valor.lower() == "true"
+    try:
+        return int(valor)
+    except ValueError:
+        return valor
+
+
+def leer_control_tiempo(texto):
+    """'10+0.1' → (10.0, 0.1): segundos por partida e incremento por jugada"""
+    base, _, incremento = texto.partition("+")
+    try:
+        base, incremento = float(base), float(incremento or 0)
+    except ValueError:
+        raise ParametrosInvalidosError(f"Control de tiempo no válido: {texto} (usa 'segundos+incremento')")
+    if base <= 0 or incremento < 0:
+        raise ParametrosInvalidosError(f"Control de tiempo no válido: {texto}")
+    return base, incremento
+
+
+def leer_configuracion(texto, defecto):
+    """Configuración de un motor a partir de 'nombre=x,ruta=y,Hash=64,...'"""
+    configuracion = {'nombre': None, 'ruta': CFISH_PATH, 'tc': None, 'limite': None, 'opciones': dict(defecto)}
+    limite = {}
+    for parte in filter(None, (p.strip() for p in texto.split(","))):
+        clave, igual, valor = parte.partition("=")
+        if not igual:
+            raise ParametrosInvalidosError(f"Se esperaba clave=valor en '{parte}'")
+        clave, valor = clave.strip(), valor.strip()
+        if clave in ("nombre", "ruta"):
+            configuracion[clave] = valor
+        elif clave == "tc":
+            configuracion['tc'] = leer_control_tiempo(valor)
+        elif clave in ("time", "nodes", "depth"):
+            limite[clave] = valor
+        else:
+            configuracion['opciones'][clave] = _valor_opcion(valor)
+    if limite:
+        configuracion['limite'] = limite_desde_parametros(limite)
+    configuracion['nombre'] = configuracion['nombre'] or os.path.basename(configuracion['ruta'])
+    return configuracion
+
+
+def leer_aperturas(ruta):
+    """Posiciones iniciales: (FEN raíz, jugadas UCI) de un PGN o de un fichero EPD/FEN"""
+    if ruta is None:
+        return [(chess.STARTING_FEN, [])]
+    aperturas = []
+    with open(ruta, encoding="utf-8", errors="replace") as fichero:
+        if ruta.lower().endswith(".pgn"):
+            for game in leer_partidas(fichero):
+                jugadas = [move.uci() for move in game.mainline_moves()]
+                aperturas.append((game.board().fen(), jugadas))
+        else:
+            for linea in fichero:
+                linea = linea.strip()
+                if not linea or linea.startswith("#"):
+                    continue
+                try:
+                    board = chess.Board(linea)
+                except ValueError:
+                    board, _ = chess.Board.from_epd(linea)
+                aperturas.append((board.fen(), []))
+    if not aperturas:
+        raise ParametrosInvalidosError(f"No hay aperturas en {ruta}")
+    return aperturas
+
+
+# --- Procesos del pool: los dos motores en cada proceso ---
+
+_motores = {}
+_configuraciones = {}
+
+
+def _lanzar_motor(configuracion):
+    ruta = os.path.abspath(configuracion['ruta'])
+    # Desde el directorio del motor, para que encuentre su red NNUE (como server_cfish.py)
+    motor = chess.engine.SimpleEngine.popen_uci([ruta], cwd=os.path.dirname(ruta))
+    motor.configure({k: v for k, v in configuracion['opciones'].items()
+                     if k in motor.options and not motor.options[k].is_managed()})
+    return motor
+
+
+def _cerrar_motores():
+    for motor in _motores.values():
+        try:
+            motor.quit()
+        except Exception:
+            pass
+
+
+def _iniciar_proceso(configuraciones):
+    """Inicializador de cada proceso: arranca un motor por configuración"""
+    for configuracion in configuraciones:
+        _configuraciones[configuracion['nombre']] = configuracion
+        _motores[configuracion['nombre']] = _lanzar_motor(configuracion)
+    util.Finalize(None, _cerrar_motores, exitpriority=16)
+
+
+def _limite(configuracion, relojes, color):
+    """Límite de la jugada: reloj de partida (tc) o límite fijo por jugada"""
+    if configuracion['tc'] is None:
+        return configuracion['limite']
+    _, incremento = configuracion['tc']
+    return chess.engine.Limit(white_clock=max(0.0, relojes[chess.WHITE]),
+                              black_clock=max(0.0, relojes[chess.BLACK]),
+                              white_inc=incremento, black_inc=incremento)
+
+
+def _jugar_partida(numero, fen, apertura, blancas, negras, max_jugadas=MAX_JUGADAS):
+    """Juega una partida completa entre dos motores del proceso.
+
+    Devuelve un diccionario con el resultado, la terminación, las jugadas
+    tras la apertura y los nodos/tiempo de búsqueda de cada configuración.
+    """
+    board = chess.Board(fen)
+    for uci in apertura:
+        board.push_uci(uci)
+    nombres = {chess.WHITE: blancas, chess.BLACK: negras}
+    relojes = {color: (_configuraciones[nombre]['tc'] or (0.0, 0.0))[0] for color, nombre in nombres.items()}
+    busqueda = {nombre: {'nodos': 0, 'segundos': 0.0, 'jugadas': 0} for nombre in (blancas, negras)}
+    jugadas = []
+    resultado, terminacion = None, None
+
+    while resultado is None:
+        final = board.outcome(claim_draw=True)
+        if final is not None:
+            resultado, terminacion = final.result(), final.termination.name.lower()
+            break
+        if len(jugadas) >= 2 * max_jugadas:
+            resultado, terminacion = "1/2-1/2", "adjudicada"
+            break
+
+        color = board.turn
+        nombre = nombres[color]
+        configuracion = _configuraciones[nombre]
+        inicio = time.monotonic()
+        try:
+            # game=numero: ucinewgame al empezar cada partida
+            jugada = _motores[nombre].play(board, _limite(configuracion, relojes, color),
+                                           game=numero, info=chess.engine.INFO_BASIC)
+        except (chess.engine.EngineTerminatedError, chess.engine.EngineError) as e:
+            logging.warning(f"Motor {nombre} caído en la partida {numero}: {e}")
+            _motores[nombre] = _lanzar_motor(configuracion)
+            resultado, terminacion = ("0-1" if color == chess.WHITE else "1-0"), "fallo del motor"
+            break
+        duracion = time.monotonic() - inicio
+
+        estadisticas = busqueda[nombre]
+        estadisticas['jugadas'] += 1
+        estadisticas['segundos'] += duracion
+        estadisticas['nodos'] += jugada.info.get('nodes', 0)
+
+        if configuracion['tc'] is not None:
+            relojes[color] -= duracion
+            if relojes[color] < 0:
+                # Sin material para dar mate el rival solo puede hacer tablas
+                gana = "0-1" if color == chess.WHITE else "1-0"
+                resultado = "1/2-1/2" if board.has_insufficient_material(not color) else gana
+                terminacion = "tiempo"
+                break
+            relojes[color] += configuracion['tc'][1]
+
+        if jugada.resigned or jugada.move is None:
+            resultado, terminacion = ("0-1" if color == chess.WHITE else "1-0"), "abandono"
+            break
+        board.push(jugada.move)
+        jugadas.append(jugada.move.uci())
+
+    return {
+        'numero': numero,
+        'blancas': blancas,
+        'negras': negras,
+        'fen': fen,
+        'apertura': apertura,
+        'jugadas': jugadas,
+        'resultado': resultado,
+        'terminacion': terminacion,
+        'busqueda': busqueda,
+    }
+
+
+# --- Estadística del enfrentamiento ---
+
+def puntuacion_a_elo(puntuacion):
+    """Diferencia de Elo (logística) que corresponde a una puntuación esperada"""
+    puntuacion = min(max(puntuacion, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / puntuacion - 1)
+
+
+def elo_a_puntuacion(elo):
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+class Marcador:
+    """Victorias, tablas y derrotas de la primera configuración frente a la segunda"""
+
+    def __init__(self):
+        self.victorias = 0
+        self.tablas = 0
+        self.derrotas = 0
+
+    @property
+    def partidas(self):
+        return self.victorias + self.tablas + self.derrotas
+
+    def anotar(self, puntos):
+        if puntos == 1:
+            self.victorias += 1
+        elif puntos == 0:
+            self.derrotas += 1
+        else:
+            self.tablas += 1
+
+    def puntuacion(self):
+        return (self.victorias + self.tablas / 2) / self.partidas if self.partidas else 0.5
+
+    def varianza(self):
+        """Varianza de la puntuación de una partida (modelo trinomial)"""
+        if not self.partidas:
+            return 0.0
+        s = self.puntuacion()
+        return (self.victorias * (1 - s) ** 2 + self.tablas * (0.5 - s) ** 2
+                + self.derrotas * s ** 2) / self.partidas
+
+    def elo(self):
+        """(diferencia de Elo, margen al 95 %)"""
+        if not self.partidas:
+            return 0.0, 0.0
+        s = self.puntuacion()
+        error = math.sqrt(self.varianza() / self.partidas)
+        margen = (puntuacion_a_elo(s + 1.96 * error) - puntuacion_a_elo(s - 1.96 * error)) / 2
+        return puntuacion_a_elo(s), margen
+
+    def llr(self, elo0, elo1):
+        """Log-verosimilitud de H1 (elo1) frente a H0 (elo0), aproximación normal del GSPRT"""
+        varianza = self.varianza()
+        if not self.partidas or varianza == 0:
+            return 0.0
+        s0, s1 = elo_a_puntuacion(elo0), elo_a_puntuacion(elo1)
+        return self.partidas * (s1 - s0) * (2 * self.puntuacion() - s0 - s1) / (2 * varianza)
+
+
+def limites_sprt(alfa, beta):
+    """Cotas del LLR: por debajo se acepta H0, por encima H1"""
+    return math.log(beta / (1 - alfa)), math.log((1 - beta) / alfa)
+
+
+# --- Proceso principal ---
+
+class Torneo:
+    """Reparte las partidas entre el pool y recoge resultados según terminan.
+
+    Como mucho `ventana` partidas están encargadas a la vez, así que un
+    enfrentamiento de miles de partidas no llena la cola del pool y se puede
+    detener (SPRT concluido o Ctrl+C) sin jugar las pendientes.
+    """
+
+    def __init__(self, configuraciones, aperturas, num_partidas=None, procesos=None,
+                 ventana=None, max_jugadas=MAX_JUGADAS, sprt=None):
+        self.configuraciones = configuraciones
+        self.aperturas = aperturas
+        self.num_partidas = num_partidas or 2 * len(aperturas)
+        self.procesos = procesos or os.cpu_count() or 1
+        self.ventana = ventana or 2 * self.procesos
+        self.max_jugadas = max_jugadas
+        self.sprt = sprt  # (elo0, elo1, alfa, beta) o None
+        self.marcador = Marcador()
+        self.busqueda = {c['nombre']: {'nodos': 0, 'segundos': 0.0, 'jugadas': 0} for c in configuraciones}
+        self.terminaciones = {}
+        self.decision = None
+        self.inicio = None
+
+    def _encargo(self, numero):
+        """Apertura y colores de la partida `numero`: cada apertura dos veces con los colores cambiados"""
+        fen, apertura = self.aperturas[(numero // 2) % len(self.aperturas)]
+        a, b = (c['nombre'] for c in self.configuraciones)
+        blancas, negras = (a, b) if numero % 2 == 0 else (b, a)
+        return numero, fen, apertura, blancas, negras, self.max_jugadas
+
+    def _pgn(self, partida):
+        board = chess.Board(partida['fen'])
+        for uci in partida['apertura'] + partida['jugadas']:
+            board.push_uci(uci)
+        game = chess.pgn.Game.from_board(board)
+        game.headers["Event"] = "Torneo de motores"
+        game.headers["Date"] = datetime.date.today().strftime("%Y.%m.%d")
+        game.headers["Round"] = str(partida['numero'] + 1)
+        game.headers["White"] = partida['blancas']
+        game.headers["Black"] = partida['negras']
+        game.headers["Result"] = partida['resultado']
+        game.headers["Termination"] = partida['terminacion']
+        if partida['apertura']:
+            game.headers["PlyCount"] = str(len(partida['apertura']) + len(partida['jugadas']))
+        return game
+
+    def _registrar(self, partida):
+        puntos_blancas = {"1-0": 1, "0-1": 0}.get(partida['resultado'], 0.5)
+        primera = self.configuraciones[0]['nombre']
+        self.marcador.anotar(puntos_blancas if partida['blancas'] == primera else 1 - puntos_blancas)
+        for nombre, estadisticas in partida['busqueda'].items():
+            for campo, valor in estadisticas.items():
+                self.busqueda[nombre][campo] += valor
+        self.terminaciones[partida['terminacion']] = self.terminaciones.get(partida['terminacion'], 0) + 1
+
+        if self.sprt is not None:
+            elo0, elo1, alfa, beta = self.sprt
+            inferior, superior = limites_sprt(alfa, beta)
+            llr = self.marcador.llr(elo0, elo1)
+            if llr <= inferior:
+                self.decision = "H0"
+            elif llr >= superior:
+                self.decision = "H1"
+
+    def jugar(self, salida, progreso=0):
+        """Juega el enfrentamiento escribiendo cada partida en `salida` al terminar"""
+        self.inicio = time.monotonic()
+        siguiente = 0
+        en_vuelo = set()
+        executor = ProcessPoolExecutor(self.procesos, initializer=_iniciar_proceso,
+                                       initargs=(self.configuraciones,))
+        try:
+            while (siguiente < self.num_partidas or en_vuelo) and self.decision is None:
+                while siguiente < self.num_partidas and len(en_vuelo) < self.ventana:
+                    en_vuelo.add(executor.submit(_jugar_partida, *self._encargo(siguiente)))
+                    siguiente += 1
+                terminadas, en_vuelo = wait(en_vuelo, return_when=FIRST_COMPLETED)
+                for futuro in terminadas:
+                    partida = futuro.result()
+                    self._registrar(partida)
+                    print(self._pgn(partida), file=salida, end="\n\n")
+                    salida.flush()
+                    if progreso and self.marcador.partidas % progreso == 0:
+                        self.mostrar_estadisticas()
+        except KeyboardInterrupt:
+            print("\n⏹️ Enfrentamiento interrumpido", file=sys.stderr)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+        return self.estadisticas()
+
+    def estadisticas(self):
+        duracion = time.monotonic() - self.inicio if self.inicio is not None else 0.0
+        elo, margen = self.marcador.elo()
+        resultado = {
+            'partidas': self.marcador.partidas,
+            'victorias': self.marcador.victorias,
+            'tablas': self.marcador.tablas,
+            'derrotas': self.marcador.derrotas,
+            'puntuacion': round(self.marcador.puntuacion(), 4),
+            'elo': round(elo, 1),
+            'margen_elo': round(margen, 1),
+            'terminaciones': dict(self.terminaciones),
+            'segundos': round(duracion, 2),
+            'motores': {
+                nombre: {
+                    'jugadas': e['jugadas'],
+                    'nodos': e['nodos'],
+                    'nps': round(e['nodos'] / e['segundos']) if e['segundos'] else 0,
+                    'segundos_jugada': round(e['segundos'] / e['jugadas'], 3) if e['jugadas'] else 0.0,
+                }
+                for nombre, e in self.busqueda.items()
+            },
+        }
+        if self.sprt is not None:
+            elo0, elo1, alfa, beta = self.sprt
+            inferior, superior = limites_sprt(alfa, beta)
+            resultado['sprt'] = {
+                'elo0': elo0, 'elo1': elo1,
+                'llr': round(self.marcador.llr(elo0, elo1), 3),
+                'limites': [round(inferior, 3), round(superior, 3)],
+                'decision': self.decision,
+            }
+        return resultado
+
+    def mostrar_estadisticas(self):
+        e = self.estadisticas()
+        a, b = (c['nombre'] for c in self.configuraciones)
+        print(f"♟️  {a} vs {b}: {e['partidas']} partidas (+{e['victorias']} ={e['tablas']} -{e['derrotas']}), "
+              f"Elo {e['elo']:+.1f} ± {e['margen_elo']:.1f}", file=sys.stderr)
+        if 'sprt' in e:
+            s = e['sprt']
+            print(f"   SPRT [{s['elo0']}, {s['elo1']}]: LLR {s['llr']} ({s['limites'][0]}, {s['limites'][1]})"
+                  + (f" → {s['decision']} aceptada" if s['decision'] else ""), file=sys.stderr)
+        for nombre, m in e['motores'].items():
+            print(f"   {nombre}: {m['nps']} nps, {m['segundos_jugada']} s/jugada", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Enfrenta dos configuraciones de motor UCI en paralelo")
+    parser.add_argument("--motor", action="append", required=True,
+                        help="Configuración 'nombre=x,ruta=y,Hash=64,Threads=1,tc=10+0.1' (dos veces)")
+    parser.add_argument("--aperturas", default=None, help="Fichero EPD/FEN (una posición por línea) o PGN")
+    parser.add_argument("--partidas", type=int, default=None, help="Partidas a jugar (por defecto dos por apertura)")
+    parser.add_argument("-o", "--salida", default="-", help="PGN de las partidas ('-' para la salida estándar)")
+    parser.add_argument("--procesos", type=int, default=None, help="Partidas simultáneas (por defecto, una por núcleo)")
+    parser.add_argument("--hash", type=int, default=512, help="MB de hash a repartir si la configuración no da Hash")
+    parser.add_argument("--tc", default=None, help="Reloj por partida 'segundos+incremento'")
+    parser.add_argument("--depth", type=int, default=None)
+    parser.add_argument("--nodes", type=int, default=None)
+    parser.add_argument("--time", type=float, default=None, help="Segundos por jugada (0.1 si no se da ningún límite)")
+    parser.add_argument("--max-jugadas", type=int, default=MAX_JUGADAS, help="Jugadas tras la apertura antes de dar tablas")
+    parser.add_argument("--sprt", nargs=2, type=float, metavar=("ELO0", "ELO1"), default=None,
+                        help="Detener al aceptar H0 (elo0) o H1 (elo1)")
+    parser.add_argument("--alfa", type=float, default=0.05)
+    parser.add_argument("--beta", type=float, default=0.05)
+    parser.add_argument("--progreso", type=int, default=100, help="Mostrar estadísticas cada N partidas (0 = nunca)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    if len(args.motor) != 2:
+        parser.error("Indica exactamente dos --motor")
+    procesos = args.procesos or os.cpu_count() or 1
+    try:
+        # Por proceso solo busca un motor a la vez: los dos comparten núcleos y hash
+        defecto = calcular_recursos(procesos, args.hash)
+        configuraciones = [leer_configuracion(texto, defecto) for texto in args.motor]
+        tc = leer_control_tiempo(args.tc) if args.tc else None
+        limite = limite_desde_parametros({'depth': args.depth, 'nodes': args.nodes, 'time': args.time})
+        aperturas = leer_aperturas(args.aperturas)
+    except (ParametrosInvalidosError, OSError) as e:
+        parser.error(str(e))
+    for configuracion in configuraciones:
+        if configuracion['tc'] is None and configuracion['limite'] is None:
+            configuracion['tc'], configuracion['limite'] = tc, limite
+        if not os.path.exists(configuracion['ruta']):
+            parser.error(f"Archivo del motor no encontrado: {configuracion['ruta']}")
+    if configuraciones[0]['nombre'] == configuraciones[1]['nombre']:
+        parser.error("Las dos configuraciones necesitan nombres distintos (nombre=...)")
+
+    sprt = (args.sprt[0], args.sprt[1], args.alfa, args.beta) if args.sprt else None
+    torneo = Torneo(configuraciones, aperturas, args.partidas, procesos, max_jugadas=args.max_jugadas, sprt=sprt)
+    salida = sys.stdout if args.salida == "-" else open(args.salida, "w", encoding="utf-8")
+    try:
+        torneo.jugar(salida, args.progreso)
+    finally:
+        if salida is not sys.stdout:
+            salida.close()
+    torneo.mostrar_estadisticas()
+
+
+if __name__ == "__main__":
+    main()